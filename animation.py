@@ -0,0 +1,130 @@
+"""After()-driven animation queue for the Tk demos.
+
+An animation is a generator that draws one frame per next() call. Animator
+advances the running animations from root.after() callbacks, one frame
+every frame_ms, so nothing sleeps on the main thread and the window keeps
+handling events while pieces move.
+
+play() queues a group of animations that run side by side (a placement, or
+the removals of every stack an attacker cleared) and a callback to run
+when the whole group has finished; groups run one after another in the
+order they were queued. With instant set, animations are dropped and only
+their callbacks run, so a caller that redraws the final state in the
+callback gets the same board without the frames.
+"""
+from collections import deque
+
+FRAME_MS = 50
+
+
+class Animator:
+    """Queue of animation groups played from the Tk event loop."""
+
+    def __init__(self, root, frame_ms=FRAME_MS):
+        self.root = root
+        self.frame_ms = frame_ms
+        self.instant = False
+        self.queue = deque()
+        self.running = None  # (animations, on_done) of the group being played
+        self.job = None
+        self.idle_callbacks = []
+
+    @property
+    def busy(self):
+        """True while an animation group is running or queued."""
+        return self.running is not None or bool(self.queue)
+
+    def play(self, animations, on_done=None):
+        """Queue animations to run together; on_done runs after their last frame.
+
+        The first frame is drawn from the event loop, after the caller has
+        finished updating the board.
+        """
+        animations = list(animations)
+        if self.instant and not self.busy:
+            for animation in animations:
+                animation.close()
+            if on_done:
+                on_done()
+            return
+        self.queue.append((animations, on_done))
+        if self.job is None:
+            self.job = self.root.after(0, self._tick)
+
+    def when_idle(self, callback):
+        """Run callback now if nothing is animating, else once the queue has drained."""
+        if self.busy:
+            self.idle_callbacks.append(callback)
+        else:
+            callback()
+
+    def set_instant(self, instant):
+        """Turn instant mode on or off; turning it on finishes everything queued at once."""
+        self.instant = instant
+        if instant:
+            self.finish()
+
+    def finish(self):
+        """Stop every queued animation and run their callbacks in order."""
+        if self.job is not None:
+            self.root.after_cancel(self.job)
+            self.job = None
+        while self.busy:
+            self._end_group()
+        self._run_idle_callbacks()
+
+    def cancel(self):
+        """Drop every queued animation and pending callback, e.g. on restart."""
+        if self.job is not None:
+            self.root.after_cancel(self.job)
+            self.job = None
+        groups = ([self.running] if self.running else []) + list(self.queue)
+        self.running = None
+        self.queue.clear()
+        self.idle_callbacks = []
+        for animations, _ in groups:
+            for animation in animations:
+                animation.close()
+
+    def _end_group(self):
+        """Close the running group (or the next queued one) and run its callback."""
+        if self.running is None:
+            self.running = self.queue.popleft()
+        animations, on_done = self.running
+        self.running = None
+        for animation in animations:
+            animation.close()
+        if on_done:
+            on_done()
+
+    def _run_idle_callbacks(self):
+        callbacks, self.idle_callbacks = self.idle_callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def _tick(self):
+        """Draw the next frame of the running group, starting the next group when it ends."""
+        self.job = None
+        if self.running is None:
+            if not self.queue:
+                self._run_idle_callbacks()
+                return
+            self.running = self.queue.popleft()
+        animations, on_done = self.running
+        active = []
+        for animation in animations:
+            try:
+                next(animation)
+                active.append(animation)
+            except StopIteration:
+                pass
+        if active:
+            self.running = (active, on_done)
+            self.job = self.root.after(self.frame_ms, self._tick)
+            return
+        self.running = None
+        if on_done:
+            on_done()
+        # on_done may have queued more animations, which schedules a tick
+        if self.job is None:
+            self.job = self.root.after(0, self._tick)
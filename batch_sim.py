@@ -0,0 +1,158 @@
+"""Batch self-play of ruleset-1 games with NumPy.
+
+B games are held as one (B, n, n) int8 array of signed counts and advanced
+together one ply at a time: saturation, blocking, legal moves and the
+attacker clearing are whole-array comparisons and neighbor shifts, and the
+policies pick one move per game with a single argmax over scored cells.
+Finished games stay in the array but are masked out.
+
+Policies are functions (simulator, legal) -> flat cell index per game, see
+POLICIES. "heuristic" is the strategy demo's one-ply rule (empty cells with
+the largest k, else own stacks with the smallest k, ties broken at random).
+
+Run "python3 batch_sim.py --size 6 --games 100000" for win rates, game
+lengths and the games/minute rate. Requires numpy.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from engine import make_thresholds
+
+BatchResult = namedtuple("BatchResult", ["winners", "lengths", "moves"])
+
+
+def neighbor_any(mask):
+    """Return, for a (B, n, n) bool array, the cells orthogonally adjacent to a True cell."""
+    out = np.zeros_like(mask)
+    out[:, 1:, :] |= mask[:, :-1, :]
+    out[:, :-1, :] |= mask[:, 1:, :]
+    out[:, :, 1:] |= mask[:, :, :-1]
+    out[:, :, :-1] |= mask[:, :, 1:]
+    return out
+
+
+def random_policy(sim, legal):
+    """Pick a uniformly random legal cell in every game."""
+    score = sim.rng.random(legal.shape, dtype=np.float32)
+    score[~legal] = -1.0
+    return score.reshape(len(legal), -1).argmax(axis=1)
+
+
+def heuristic_policy(sim, legal):
+    """Pick an empty cell with the largest k, else an own stack with the smallest k."""
+    k = sim.k.astype(np.float32)
+    empty = legal & (sim.pieces == 0)
+    # Every empty score beats every own-stack score, and both beat illegal cells
+    score = np.where(empty, 16.0 + k, np.where(legal, 8.0 - k, -2.0)).astype(np.float32)
+    # Random tie-break smaller than the gap between two thresholds
+    score += sim.rng.random(legal.shape, dtype=np.float32) * 0.5
+    return score.reshape(len(legal), -1).argmax(axis=1)
+
+
+POLICIES = {
+    "random": random_policy,
+    "heuristic": heuristic_policy,
+}
+
+
+class BatchSimulator:
+    """B ruleset-1 games on n x n boards, all started empty with White to move.
+
+    player holds +1 (White) or -1 (Black) per game, winners the same
+    encoding once a game is over (0 while it is running) and lengths the
+    number of moves played.
+    """
+
+    def __init__(self, n, games, seed=None):
+        self.n = n
+        self.k = np.array(make_thresholds(n), dtype=np.int8)
+        self.rng = np.random.default_rng(seed)
+        self.pieces = np.zeros((games, n, n), dtype=np.int8)
+        self.player = np.ones(games, dtype=np.int8)
+        self.active = np.ones(games, dtype=bool)
+        self.winners = np.zeros(games, dtype=np.int8)
+        self.lengths = np.zeros(games, dtype=np.int32)
+
+    def legal_masks(self):
+        """Return the (B, n, n) mask of legal cells for the player to move in each running game."""
+        saturated = np.abs(self.pieces) == self.k
+        live = ~saturated & ~neighbor_any(saturated)
+        own_or_empty = self.pieces * self.player[:, None, None] >= 0
+        return live & own_or_empty & self.active[:, None, None]
+
+    def step(self, white, black):
+        """Play one move in every running game. Returns the flat cells played (-1 where none).
+
+        A game whose player to move has no legal move ends with the other
+        player as winner.
+        """
+        n = self.n
+        legal = self.legal_masks()
+        has_move = legal.reshape(len(legal), -1).any(axis=1)
+        finished = self.active & ~has_move
+        self.winners[finished] = -self.player[finished]
+        self.active &= has_move
+        cells = np.full(len(legal), -1, dtype=np.int64)
+        games = np.nonzero(self.active)[0]
+        if not len(games):
+            return cells
+        if white is black:
+            choice = white(self, legal)
+        else:
+            choice = np.where(self.player == 1, white(self, legal), black(self, legal))
+        cells[games] = choice[games]
+        i, j = np.divmod(choice[games], n)
+        self.pieces[games, i, j] += self.player[games]
+        saturating = np.abs(self.pieces[games, i, j]) == self.k[i, j]
+        if saturating.any():
+            attackers = np.zeros(self.pieces.shape, dtype=bool)
+            attackers[games[saturating], i[saturating], j[saturating]] = True
+            self.pieces[neighbor_any(attackers)] = 0
+        self.lengths[games] += 1
+        self.player[games] = -self.player[games]
+        return cells
+
+    def run(self, white="heuristic", black="heuristic", record_moves=False):
+        """Play every game to the end. Returns a BatchResult.
+
+        moves is a (plies, B) array of the flat cells played, -1 after a
+        game ended, if record_moves is set, else None.
+        """
+        white = POLICIES[white]
+        black = POLICIES[black]
+        moves = []
+        while self.active.any():
+            cells = self.step(white, black)
+            if record_moves and (cells >= 0).any():
+                moves.append(cells)
+        moves = np.array(moves, dtype=np.int64).reshape(-1, len(self.pieces)) if record_moves else None
+        return BatchResult(self.winners, self.lengths, moves)
+
+
+def simulate(n, games, white="heuristic", black="heuristic", seed=None, record_moves=False):
+    """Play games on empty n x n boards to the end. Returns a BatchResult."""
+    return BatchSimulator(n, games, seed).run(white, black, record_moves)
+
+
+def main():
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description="Batch self-play of ruleset-1 games.")
+    parser.add_argument("--size", type=int, default=6, help="board size n")
+    parser.add_argument("--games", type=int, default=100000, help="number of games")
+    parser.add_argument("--white", choices=sorted(POLICIES), default="heuristic", help="White's policy")
+    parser.add_argument("--black", choices=sorted(POLICIES), default="heuristic", help="Black's policy")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    result = simulate(args.size, args.games, args.white, args.black, args.seed)
+    elapsed = time.perf_counter() - start
+    white_rate = float(np.mean(result.winners == 1))
+    print(f"{args.size}x{args.size}, {args.white} vs {args.black}: White wins {white_rate:.3f}, "
+          f"mean length {result.lengths.mean():.1f}, {args.games} games in {elapsed:.2f}s "
+          f"({args.games / elapsed * 60:.0f} games/min)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""Benchmark suite for the engines, with JSON baselines.
+
+Every case is a rate measured on a fixed sample of positions:
+    movegen     legal-move lists generated per second
+    apply       moves applied (and taken back) per second
+    legal       legal-move detections (has_legal_moves) per second
+    successors  successor boards generated per second
+    games       random games played from the empty board per second
+    solve       positions solved per second (small boards only)
+
+Rulesets:
+    ruleset1   engine.Board, the model of ruleset1_demo.py
+    ruleset2   the engine2 grid functions of ruleset2_demo.py (apply and
+               solve use engine2.GreenBoard and solver2)
+    strategy   strategy_demo.py's AI side: BitBoard moves, the heuristic's
+               ordering of the successors and games between its one-ply
+               heuristic AIs (no solve case; ruleset1 covers solver.py)
+
+Positions are sampled from random games with a fixed seed, so runs measure
+the same work, and each random game is one of SAMPLE_SIZE fixed seeds. A
+case repeats its sample for min_time seconds in all and keeps its best
+round (see measure).
+
+    python3 bench.py --output baseline.json
+    python3 bench.py --compare baseline.json --threshold 0.15
+
+--compare runs the cases stored in the baseline and reports every rate that
+fell by more than threshold (a fraction); the exit status is 1 if any did.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from itertools import cycle
+
+import engine
+import engine2
+import solver
+import solver2
+import strategies
+from bitboard import BitBoard, iter_bits
+from tournament import parse_sizes
+
+VERSION = 1
+SEED = 0
+SAMPLE_SIZE = 32
+MIN_TIME = 0.2
+ROUNDS = 5
+THRESHOLD = 0.2
+RULESETS = ("ruleset1", "ruleset2", "strategy")
+CASES = ("movegen", "apply", "legal", "successors", "games", "solve")
+# Largest board each ruleset's solver benchmark runs on
+SOLVE_MAX_SIZE = {"ruleset1": 3, "ruleset2": 3}
+
+
+def measure(run, min_time=MIN_TIME, rounds=ROUNDS):
+    """Return the best ops/s of rounds rounds, each calling run() until min_time / rounds has passed.
+
+    run returns the number of operations it did. The best round is the one
+    least disturbed by the rest of the machine.
+    """
+    best = 0.0
+    for _ in range(rounds):
+        ops = 0
+        start = time.perf_counter()
+        while True:
+            ops += run()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time / rounds:
+                break
+        best = max(best, ops / elapsed)
+    return best
+
+
+def ruleset1_positions(n, rng, count=SAMPLE_SIZE):
+    """Return count (pieces, player) grids reached by random ruleset-1 games, every game stage alike."""
+    positions = []
+    while len(positions) < count:
+        board = engine.Board.empty(n)
+        while True:
+            positions.append(([row[:] for row in board.pieces], board.player))
+            moves = board.get_possible_moves()
+            if not moves:
+                break
+            board.make_move(*rng.choice(moves))
+    return rng.sample(positions, count)
+
+
+def ruleset2_positions(n, rng, count=SAMPLE_SIZE):
+    """Return count (pieces, green_pieces, player) grids reached by random ruleset-2 games."""
+    positions = []
+    while len(positions) < count:
+        position = engine2.initial_position(n)
+        while True:
+            positions.append(position)
+            moves = engine2.get_all_moves(position.pieces, position.green_pieces, position.player)
+            if not moves:
+                break
+            position = engine2.apply_move(position, rng.choice(moves))
+    return [(*position.to_lists(), position.player) for position in rng.sample(positions, count)]
+
+
+def late(positions):
+    """Return the positions with the fewest empty cells, half of them, for the solver cases."""
+    return sorted(positions, key=lambda position: sum(row.count(0) for row in position[0]))[:len(positions) // 2]
+
+
+def ruleset1_cases(n, rng):
+    positions = ruleset1_positions(n, rng)
+    boards = [engine.Board(pieces, player) for pieces, player in positions]
+
+    def movegen():
+        for board in boards:
+            board.get_possible_moves()
+        return len(boards)
+
+    def apply():
+        ops = 0
+        for board in boards:
+            for i, j in board.get_possible_moves():
+                board.make_move(i, j)
+                board.unmake_move()
+                ops += 1
+        return ops
+
+    def legal():
+        for board in boards:
+            board.has_legal_moves()
+        return len(boards)
+
+    def successors():
+        ops = 0
+        for pieces, player in positions:
+            for _ in engine.iter_successors(pieces, player):
+                ops += 1
+        return ops
+
+    seeds = cycle(range(SAMPLE_SIZE))
+
+    def games():
+        rng = random.Random(next(seeds))
+        board = engine.Board.empty(n)
+        while True:
+            moves = board.get_possible_moves()
+            if not moves:
+                return 1
+            board.make_move(*rng.choice(moves))
+
+    def solve():
+        for pieces, player in late(positions):
+            solver.Solver().solve(pieces, player)
+        return len(positions) // 2
+
+    return {"movegen": movegen, "apply": apply, "legal": legal, "successors": successors,
+            "games": games, "solve": solve}
+
+
+def ruleset2_cases(n, rng):
+    positions = ruleset2_positions(n, rng)
+
+    def movegen():
+        for pieces, green_pieces, player in positions:
+            engine2.get_all_moves(pieces, green_pieces, player)
+        return len(positions)
+
+    def apply():
+        ops = 0
+        for pieces, green_pieces, player in positions:
+            board = engine2.GreenBoard(pieces, green_pieces, player)
+            for b, piece_type in board.legal_moves():
+                board.make_move(b, piece_type)
+                board.unmake_move()
+                ops += 1
+        return ops
+
+    def legal():
+        for pieces, green_pieces, player in positions:
+            engine2.has_legal_moves(pieces, green_pieces, player)
+        return len(positions)
+
+    def successors():
+        ops = 0
+        for pieces, green_pieces, player in positions:
+            for _ in engine2.iter_successors(pieces, green_pieces, player):
+                ops += 1
+        return ops
+
+    seeds = cycle(range(SAMPLE_SIZE))
+
+    def games():
+        rng = random.Random(next(seeds))
+        pieces = [[0] * n for _ in range(n)]
+        green_pieces = [[0] * n for _ in range(n)]
+        player = "White"
+        while True:
+            moves = engine2.get_all_moves(pieces, green_pieces, player)
+            if not moves:
+                return 1
+            i, j, piece_type = rng.choice(moves)
+            engine2.place_piece(pieces, green_pieces, i, j, player, piece_type)
+            player = engine.other_player(player)
+
+    def solve():
+        for pieces, green_pieces, player in late(positions):
+            solver2.Solver().solve(pieces, green_pieces, player)
+        return len(positions) // 2
+
+    return {"movegen": movegen, "apply": apply, "legal": legal, "successors": successors,
+            "games": games, "solve": solve}
+
+
+def strategy_cases(n, rng):
+    positions = ruleset1_positions(n, rng)
+    boards = [(BitBoard.from_grid(pieces), player) for pieces, player in positions]
+
+    def movegen():
+        for board, player in boards:
+            board.get_possible_moves(player)
+        return len(boards)
+
+    def apply():
+        ops = 0
+        for board, player in boards:
+            for b in iter_bits(board.legal_mask(player)):
+                board.make_move(b, player)
+                board.unmake_move()
+                ops += 1
+        return ops
+
+    def legal():
+        for board, player in boards:
+            board.has_legal_moves(player)
+        return len(boards)
+
+    def successors():
+        # The AI's view of the successors: the heuristic order of the moves
+        ops = 0
+        for board, player in boards:
+            ops += len(strategies.heuristic_order(board, player))
+        return ops
+
+    seeds = cycle(range(SAMPLE_SIZE))
+
+    def games():
+        rng = random.Random(next(seeds))
+        board = BitBoard(n)
+        player = "White"
+        while True:
+            b = strategies.heuristic_move(board, player, rng)
+            if b is None:
+                return 1
+            board.make_move(b, player)
+            player = engine.other_player(player)
+
+    return {"movegen": movegen, "apply": apply, "legal": legal, "successors": successors,
+            "games": games}
+
+
+RULESET_CASES = {"ruleset1": ruleset1_cases, "ruleset2": ruleset2_cases, "strategy": strategy_cases}
+
+
+def case_name(ruleset, case, n):
+    return f"{ruleset}/{case}/{n}"
+
+
+def run(rulesets=RULESETS, sizes=range(2, 11), cases=CASES, min_time=MIN_TIME, seed=SEED, log=None):
+    """Run the selected cases. Returns {case_name: ops per second}."""
+    results = {}
+    for ruleset in rulesets:
+        for n in sizes:
+            rng = random.Random(f"{seed}-{ruleset}-{n}")
+            functions = RULESET_CASES[ruleset](n, rng)
+            for case in cases:
+                if case not in functions or case == "solve" and n > SOLVE_MAX_SIZE[ruleset]:
+                    continue
+                name = case_name(ruleset, case, n)
+                results[name] = measure(functions[case], min_time)
+                if log:
+                    print(f"{name:<24} {results[name]:12.1f}/s", file=log, flush=True)
+    return results
+
+
+def baseline(results, min_time=MIN_TIME, seed=SEED):
+    """Return the JSON document stored for a set of results."""
+    return {"version": VERSION, "python": platform.python_version(), "machine": platform.machine(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "min_time": min_time, "seed": seed,
+            "results": results}
+
+
+def compare(old, new, threshold=THRESHOLD):
+    """Compare two {case_name: rate} dicts.
+
+    Returns [(name, old rate, new rate, relative change, regressed)] for the
+    cases in both; a case regressed if its rate fell by more than threshold.
+    """
+    rows = []
+    for name, old_rate in old.items():
+        if name in new:
+            change = new[name] / old_rate - 1 if old_rate else 0.0
+            rows.append((name, old_rate, new[name], change, change < -threshold))
+    return rows
+
+
+def parse_case_name(name):
+    ruleset, case, n = name.split("/")
+    return ruleset, case, int(n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ruleset engines.")
+    parser.add_argument("--rulesets", nargs="+", choices=RULESETS, default=list(RULESETS))
+    parser.add_argument("--sizes", default="2-10", help='board sizes, e.g. "2-10" or "3,5"')
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--min-time", type=float, default=MIN_TIME, help="seconds per case")
+    parser.add_argument("--seed", type=int, default=SEED, help="seed of the sampled positions")
+    parser.add_argument("--output", help="write the results as a JSON baseline to this file")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="rerun the cases of this baseline and flag regressions")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="relative slowdown counted as a regression (default 0.2)")
+    args = parser.parse_args()
+    sizes = parse_sizes(args.sizes)
+    if not all(2 <= n <= 10 for n in sizes):
+        parser.error("board sizes must be between 2 and 10")
+
+    old = None
+    if args.compare:
+        with open(args.compare) as f:
+            stored = json.load(f)
+        if stored.get("version") != VERSION:
+            parser.error(f"{args.compare} is not a version {VERSION} baseline")
+        old = stored["results"]
+        wanted = [parse_case_name(name) for name in old]
+        # Only what the baseline holds is rerun, with its own settings
+        args.rulesets = [r for r in RULESETS if any(w[0] == r for w in wanted)]
+        args.cases = [c for c in CASES if any(w[1] == c for w in wanted)]
+        sizes = sorted({w[2] for w in wanted})
+        args.min_time = stored.get("min_time", args.min_time)
+        args.seed = stored.get("seed", args.seed)
+
+    start = time.perf_counter()
+    results = run(args.rulesets, sizes, args.cases, args.min_time, args.seed, log=sys.stderr)
+    print(f"{len(results)} cases in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(baseline(results, args.min_time, args.seed), f, indent=1, sort_keys=True)
+            f.write("\n")
+    if old is None:
+        return 0
+    rows = compare(old, results, args.threshold)
+    print(f"{'case':<24}{'baseline':>12}{'now':>12}{'change':>9}")
+    for name, old_rate, new_rate, change, regressed in rows:
+        print(f"{name:<24}{old_rate:12.1f}{new_rate:12.1f}{change:+9.1%}" + ("  REGRESSION" if regressed else ""))
+    regressions = sum(row[4] for row in rows)
+    print(f"{regressions} of {len(rows)} cases slower by more than {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
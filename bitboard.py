@@ -0,0 +1,251 @@
+"""Bitboard representation of ruleset-1 positions.
+
+Cell (i,j) is bit i*n + j. For each player there is one occupancy bitboard
+per stack height (white[c] holds the cells with exactly c White pieces), and
+one extra bitboard marks the saturated stacks (attackers). Neighbor masks and
+column masks are computed once per board size, so blocking, legal-move
+generation and the attacker clearing are a few integer AND/OR/shift
+operations instead of per-cell neighbor scans.
+"""
+from functools import lru_cache
+
+from engine import make_thresholds, make_neighbors, Position
+
+MAX_HEIGHT = 4
+
+
+class BitboardTables:
+    """Per-size constants: full-board mask, column masks, thresholds and neighbor masks."""
+
+    def __init__(self, n):
+        self.n = n
+        self.size = n * n
+        self.full = (1 << self.size) - 1
+        first_col = 0
+        last_col = 0
+        for i in range(n):
+            first_col |= 1 << (i * n)
+            last_col |= 1 << (i * n + n - 1)
+        self.not_first_col = self.full & ~first_col
+        self.not_last_col = self.full & ~last_col
+        thresholds = make_thresholds(n)
+        neighbors = make_neighbors(n)
+        self.k = [thresholds[b // n][b % n] for b in range(self.size)]
+        self.neighbor_mask = []
+        for b in range(self.size):
+            mask = 0
+            for ni, nj in neighbors[b // n][b % n]:
+                mask |= 1 << (ni * n + nj)
+            self.neighbor_mask.append(mask)
+        # Cells grouped by threshold, e.g. k_masks[2] is the four corners
+        self.k_masks = {}
+        for b, k in enumerate(self.k):
+            self.k_masks[k] = self.k_masks.get(k, 0) | (1 << b)
+
+    def spread(self, mask):
+        """Return the cells orthogonally adjacent to any cell in mask."""
+        n = self.n
+        return (((mask << 1) & self.not_first_col) |
+                ((mask >> 1) & self.not_last_col) |
+                ((mask << n) | (mask >> n))) & self.full
+
+
+@lru_cache(maxsize=None)
+def get_tables(n):
+    """Return the shared BitboardTables for an n x n board."""
+    return BitboardTables(n)
+
+
+def iter_bits(mask):
+    """Yield the indices of the set bits of mask in increasing order."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class BitBoard:
+    """Mutable ruleset-1 board stored as per-height occupancy bitboards."""
+    __slots__ = ("tables", "white", "black", "saturated", "history")
+
+    def __init__(self, n):
+        self.tables = get_tables(n)
+        # Index 0 is unused so that white[c] is the bitboard of height c
+        self.white = [0] * (MAX_HEIGHT + 1)
+        self.black = [0] * (MAX_HEIGHT + 1)
+        self.saturated = 0
+        self.history = []
+
+    @property
+    def n(self):
+        return self.tables.n
+
+    @classmethod
+    def from_grid(cls, pieces):
+        """Build a BitBoard from a grid of signed counts."""
+        n = len(pieces)
+        board = cls(n)
+        tables = board.tables
+        for i in range(n):
+            for j in range(n):
+                count = pieces[i][j]
+                if count == 0:
+                    continue
+                bit = 1 << (i * n + j)
+                if count > 0:
+                    board.white[count] |= bit
+                else:
+                    board.black[-count] |= bit
+                if abs(count) == tables.k[i * n + j]:
+                    board.saturated |= bit
+        return board
+
+    def to_grid(self):
+        """Return the board as a list-of-lists grid of signed counts."""
+        n = self.tables.n
+        grid = [[0] * n for _ in range(n)]
+        for c in range(1, MAX_HEIGHT + 1):
+            for b in iter_bits(self.white[c]):
+                grid[b // n][b % n] = c
+            for b in iter_bits(self.black[c]):
+                grid[b // n][b % n] = -c
+        return grid
+
+    def to_position(self, player):
+        """Return an immutable engine.Position for this board."""
+        return Position(tuple(tuple(row) for row in self.to_grid()), player)
+
+    def copy(self):
+        board = BitBoard.__new__(BitBoard)
+        board.tables = self.tables
+        board.white = self.white[:]
+        board.black = self.black[:]
+        board.saturated = self.saturated
+        board.history = []
+        return board
+
+    def occupancy(self, player):
+        """Return the cells holding at least one piece of player."""
+        stacks = self.white if player == "White" else self.black
+        return stacks[1] | stacks[2] | stacks[3] | stacks[4]
+
+    def count_at(self, b):
+        """Return the signed count of cell index b."""
+        bit = 1 << b
+        for c in range(1, MAX_HEIGHT + 1):
+            if self.white[c] & bit:
+                return c
+            if self.black[c] & bit:
+                return -c
+        return 0
+
+    def blocked_mask(self):
+        """Return the cells adjacent to an attacker."""
+        return self.tables.spread(self.saturated)
+
+    def legal_mask(self, player):
+        """Return the cells where player may place a piece."""
+        tables = self.tables
+        other = self.occupancy("Black" if player == "White" else "White")
+        return tables.full & ~other & ~self.saturated & ~tables.spread(self.saturated)
+
+    def live_mask(self):
+        """Return the cells that are neither attackers nor blocked."""
+        tables = self.tables
+        return tables.full & ~self.saturated & ~tables.spread(self.saturated)
+
+    def key(self):
+        """Pack the board into one integer, ignoring content that cannot matter.
+
+        Stacks on blocked cells can never be played again and only get
+        cleared, and attackers only block regardless of color, so both are
+        reduced to the saturated mask. Boards that differ only there share a
+        key.
+        """
+        size = self.tables.size
+        live = self.live_mask()
+        key = self.saturated
+        for h in range(1, MAX_HEIGHT):
+            key = (key << size) | (self.white[h] & live)
+            key = (key << size) | (self.black[h] & live)
+        return key
+
+    def get_possible_moves(self, player):
+        """Return list of (i,j) coordinates for valid moves."""
+        n = self.tables.n
+        return [(b // n, b % n) for b in iter_bits(self.legal_mask(player))]
+
+    def has_legal_moves(self, player):
+        return self.legal_mask(player) != 0
+
+    def place(self, b, player):
+        """Place a piece for player on cell index b, without legality checks.
+
+        Returns the mask of neighbors cleared by the attacker effect.
+        """
+        stacks = self.white if player == "White" else self.black
+        bit = 1 << b
+        c = 0
+        for h in range(1, MAX_HEIGHT + 1):
+            if stacks[h] & bit:
+                stacks[h] ^= bit
+                c = h
+                break
+        stacks[c + 1] |= bit
+        if c + 1 != self.tables.k[b]:
+            return 0
+        self.saturated |= bit
+        keep = ~self.tables.neighbor_mask[b]
+        cleared = 0
+        for h in range(1, MAX_HEIGHT + 1):
+            cleared |= (self.white[h] | self.black[h]) & ~keep
+            self.white[h] &= keep
+            self.black[h] &= keep
+        return cleared
+
+    def apply_move(self, move, player):
+        """Return a new BitBoard after player places at move=(i,j)."""
+        i, j = move
+        board = self.copy()
+        board.place(i * self.tables.n + j, player)
+        return board
+
+    def make_move(self, b, player):
+        """Play cell index b for player in place and push a delta undo record.
+
+        Returns the mask of neighbors cleared by the attacker effect.
+        """
+        stacks = self.white if player == "White" else self.black
+        bit = 1 << b
+        c = 0
+        for h in range(1, MAX_HEIGHT + 1):
+            if stacks[h] & bit:
+                c = h
+                break
+        if c + 1 != self.tables.k[b]:
+            if c:
+                stacks[c] ^= bit
+            stacks[c + 1] |= bit
+            self.history.append((b, player, c, None))
+            return 0
+        # Only the neighbor bits of each height are needed to undo the clearing
+        nbrs = self.tables.neighbor_mask[b]
+        delta = (tuple(w & nbrs for w in self.white), tuple(x & nbrs for x in self.black))
+        self.history.append((b, player, c, delta))
+        return self.place(b, player)
+
+    def unmake_move(self):
+        """Revert the last make_move. Returns (b, player)."""
+        b, player, c, delta = self.history.pop()
+        stacks = self.white if player == "White" else self.black
+        bit = 1 << b
+        stacks[c + 1] ^= bit
+        if c:
+            stacks[c] |= bit
+        if delta is not None:
+            self.saturated ^= bit
+            old_white, old_black = delta
+            for h in range(1, MAX_HEIGHT + 1):
+                self.white[h] |= old_white[h]
+                self.black[h] |= old_black[h]
+        return (b, player)
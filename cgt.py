@@ -0,0 +1,307 @@
+"""Combinatorial game values (canonical forms) of ruleset-1 positions.
+
+White is Left and Black is Right. A position is a partizan game whose Left
+options are the boards after each White move and whose Right options are the
+boards after each Black move, regardless of whose turn it is.
+
+Canonical forms are hash-consed: every canonical game exists exactly once,
+so two positions have equal values iff their canonical forms are the same
+object. Comparisons, sums and negations are memoized on these objects, and
+GameValues caches the value of each board key, so the cache can be shared
+across many queries and common subpositions are only evaluated once.
+"""
+import math
+import sys
+from fractions import Fraction
+
+import engine
+from bitboard import BitBoard, iter_bits
+from symmetry import canonical_key
+
+
+class Game:
+    """A short partizan game {left | right}. Use canonical() to build one."""
+    __slots__ = ("left", "right", "uid", "__weakref__")
+
+    def __init__(self, left, right, uid=None):
+        self.left = left
+        self.right = right
+        self.uid = uid
+
+    def __repr__(self):
+        return f"Game({self})"
+
+    def __str__(self):
+        return describe(self)
+
+
+# Interned canonical forms, keyed by the uids of their options
+_interned = {}
+_le_cache = {}
+_sum_cache = {}
+_neg_cache = {}
+
+
+def _intern(left, right):
+    left = tuple(sorted(left, key=lambda g: g.uid))
+    right = tuple(sorted(right, key=lambda g: g.uid))
+    key = (tuple(g.uid for g in left), tuple(g.uid for g in right))
+    game = _interned.get(key)
+    if game is None:
+        game = Game(left, right, len(_interned))
+        _interned[key] = game
+    return game
+
+
+def le(g, h):
+    """Return True if g <= h.
+
+    g <= h iff no Left option of g is >= h and no Right option of h is <= g.
+    Results are cached when both games are interned.
+    """
+    if g is h:
+        return True
+    key = None
+    if g.uid is not None and h.uid is not None:
+        key = (g.uid, h.uid)
+        result = _le_cache.get(key)
+        if result is not None:
+            return result
+    result = (not any(le(h, gl) for gl in g.left) and
+              not any(le(hr, g) for hr in h.right))
+    if key is not None:
+        _le_cache[key] = result
+    return result
+
+
+def _undominated(options, better):
+    """Drop duplicate options and options that another option is better than."""
+    unique = []
+    for option in options:
+        if not any(option is u for u in unique):
+            unique.append(option)
+    # Distinct canonical forms are never equal, so better() here is strict
+    return [option for option in unique
+            if not any(other is not option and better(other, option) for other in unique)]
+
+
+def canonical(left, right):
+    """Return the canonical form of {left | right} given canonical options.
+
+    Dominated options are removed and reversible options are bypassed until
+    neither applies.
+    """
+    left = list(left)
+    right = list(right)
+    while True:
+        left = _undominated(left, lambda a, b: le(b, a))
+        right = _undominated(right, lambda a, b: le(a, b))
+        g = Game(tuple(left), tuple(right))
+        changed = False
+        new_left = []
+        for option in left:
+            # A Left option is reversible through any of its Right options <= g
+            reverse = next((r for r in option.right if le(r, g)), None)
+            if reverse is None:
+                new_left.append(option)
+            else:
+                new_left.extend(reverse.left)
+                changed = True
+        new_right = []
+        for option in right:
+            reverse = next((l for l in option.left if le(g, l)), None)
+            if reverse is None:
+                new_right.append(option)
+            else:
+                new_right.extend(reverse.right)
+                changed = True
+        if not changed:
+            return _intern(left, right)
+        left, right = new_left, new_right
+
+
+ZERO = _intern((), ())
+STAR = _intern((ZERO,), (ZERO,))
+
+
+def neg(g):
+    """Return -g, with Left and Right swapped."""
+    result = _neg_cache.get(g.uid)
+    if result is None:
+        result = canonical([neg(r) for r in g.right], [neg(l) for l in g.left])
+        _neg_cache[g.uid] = result
+    return result
+
+
+def add(g, h):
+    """Return the canonical form of the disjunctive sum g + h."""
+    if g is ZERO:
+        return h
+    if h is ZERO:
+        return g
+    key = (g.uid, h.uid) if g.uid <= h.uid else (h.uid, g.uid)
+    result = _sum_cache.get(key)
+    if result is None:
+        left = [add(gl, h) for gl in g.left] + [add(g, hl) for hl in h.left]
+        right = [add(gr, h) for gr in g.right] + [add(g, hr) for hr in h.right]
+        result = canonical(left, right)
+        _sum_cache[key] = result
+    return result
+
+
+def outcome(g):
+    """Return the outcome class: "L" (Left wins), "R", "P" (second player) or "N" (first player)."""
+    left_first = not le(g, ZERO)
+    right_first = not le(ZERO, g)
+    if left_first and right_first:
+        return "N"
+    if left_first:
+        return "L"
+    if right_first:
+        return "R"
+    return "P"
+
+
+def winner(g, player):
+    """Return who wins g with player ("White" = Left, "Black" = Right) moving first."""
+    result = outcome(g)
+    if result == "N":
+        return player
+    if result == "P":
+        return engine.other_player(player)
+    return "White" if result == "L" else "Black"
+
+
+def number_value(g):
+    """Return g as a Fraction if it is a number, else None."""
+    if g is ZERO:
+        return Fraction(0)
+    lefts = [number_value(l) for l in g.left]
+    rights = [number_value(r) for r in g.right]
+    if None in lefts or None in rights:
+        return None
+    low = max(lefts) if lefts else None
+    high = min(rights) if rights else None
+    if low is not None and high is not None and low >= high:
+        return None
+    return _simplest_between(low, high)
+
+
+def _simplest_between(low, high):
+    """Return the simplest number strictly between low and high (None = unbounded)."""
+    first = None if low is None else math.floor(low) + 1
+    last = None if high is None else math.ceil(high) - 1
+    if (first is None or first <= 0) and (last is None or last >= 0):
+        return Fraction(0)
+    if first is not None and first > 0 and (last is None or first <= last):
+        return Fraction(first)
+    if last is not None and last < 0 and (first is None or first <= last):
+        return Fraction(last)
+    # No integer fits: take the multiple of the largest power of 1/2 that does
+    step = Fraction(1, 2)
+    while True:
+        x = (math.floor(low / step) + 1) * step
+        if x < high:
+            return x
+        step /= 2
+
+
+def nimber_value(g):
+    """Return n if g is *n, else None."""
+    if g is ZERO:
+        return 0
+    if g.left != g.right:
+        return None
+    values = [nimber_value(l) for l in g.left]
+    if None in values or sorted(values) != list(range(len(values))):
+        return None
+    return len(values)
+
+
+def describe(g):
+    """Return a readable name: numbers, nimbers, up/down, else {L|R}."""
+    number = number_value(g)
+    if number is not None:
+        return str(number)
+    nim = nimber_value(g)
+    if nim is not None:
+        return "*" if nim == 1 else f"*{nim}"
+    if g.left == (ZERO,) and g.right == (STAR,):
+        return "^"
+    if g.left == (STAR,) and g.right == (ZERO,):
+        return "v"
+    if len(g.left) == 1 and g.right == g.left and number_value(g.left[0]) is not None:
+        return f"{number_value(g.left[0])}*"
+    left = ",".join(describe(l) for l in g.left)
+    right = ",".join(describe(r) for r in g.right)
+    return f"{{{left}|{right}}}"
+
+
+class GameValues:
+    """Canonical forms of ruleset-1 boards, cached by BitBoard.key().
+
+    One instance can serve any number of queries (and board sizes); values of
+    subpositions are reused across them. With symmetry=True boards are cached
+    under symmetry.canonical_key, and a board whose representative has the
+    colors swapped gets the negated value.
+    """
+
+    def __init__(self, symmetry=True):
+        self.cache = {}
+        self.symmetry = symmetry
+        self.hits = 0
+        self.misses = 0
+
+    def value_of_board(self, board):
+        """Return the canonical form of a BitBoard (it is restored afterwards)."""
+        swapped = False
+        if self.symmetry:
+            key, _, swapped = canonical_key(board)
+            key = (board.tables.n, key)
+        else:
+            key = (board.tables.n, board.key())
+        value = self.cache.get(key)
+        if value is not None:
+            self.hits += 1
+            return neg(value) if swapped else value
+        self.misses += 1
+        options = {}
+        for player in ("White", "Black"):
+            options[player] = []
+            for b in iter_bits(board.legal_mask(player)):
+                board.make_move(b, player)
+                options[player].append(self.value_of_board(board))
+                board.unmake_move()
+        value = canonical(options["White"], options["Black"])
+        self.cache[key] = neg(value) if swapped else value
+        return value
+
+    def value(self, pieces):
+        """Return the canonical form of a grid of signed counts."""
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, 10000))
+        try:
+            return self.value_of_board(BitBoard.from_grid(pieces))
+        finally:
+            sys.setrecursionlimit(limit)
+
+    def winning_move(self, pieces, player):
+        """Return a winning (i,j) for player to move, or None if there is none."""
+        board = BitBoard.from_grid(pieces)
+        n = board.n
+        for b in iter_bits(board.legal_mask(player)):
+            board.make_move(b, player)
+            option = self.value_of_board(board)
+            board.unmake_move()
+            # After the move the opponent moves first in the option
+            if winner(option, engine.other_player(player)) == player:
+                return (b // n, b % n)
+        return None
+
+
+_default_values = GameValues()
+
+
+def value(pieces):
+    """Return the canonical form of a grid using the shared module cache."""
+    return _default_values.value(pieces)
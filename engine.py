@@ -0,0 +1,371 @@
+"""Headless rules engine for ruleset 1 (also used by strategy_demo.py).
+
+Cells hold signed counts: 0=empty, >0=White, <0=Black. A player may place on
+an empty cell or on one of their own stacks below its threshold k, as long as
+no orthogonal neighbor is saturated. A stack that reaches k becomes an
+attacker and clears all of its neighbors. The player with no legal move loses.
+
+Nothing in here imports tkinter, so it can be used for batch analysis and
+self-play on machines without a display.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+import zobrist
+
+NEIGHBOR_OFFSETS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+def other_player(player):
+    """Return the opponent of player."""
+    return "Black" if player == "White" else "White"
+
+
+@lru_cache(maxsize=None)
+def make_thresholds(n):
+    """Return the n x n grid of thresholds (number of orthogonal neighbors)."""
+    thresholds = []
+    for i in range(n):
+        row = []
+        for j in range(n):
+            k = 0
+            if i > 0: k += 1
+            if i < n-1: k += 1
+            if j > 0: k += 1
+            if j < n-1: k += 1
+            row.append(k)
+        thresholds.append(tuple(row))
+    return tuple(thresholds)
+
+
+@lru_cache(maxsize=None)
+def make_neighbors(n):
+    """Return the in-bounds orthogonal neighbors of every cell, indexed [i][j]."""
+    return tuple(
+        tuple(
+            tuple((i + di, j + dj) for di, dj in NEIGHBOR_OFFSETS
+                  if 0 <= i + di < n and 0 <= j + dj < n)
+            for j in range(n))
+        for i in range(n))
+
+
+class Position(namedtuple("Position", ["pieces", "player"])):
+    """Immutable ruleset-1 position: a tuple-of-tuples grid and the player to move."""
+    __slots__ = ()
+
+    @property
+    def n(self):
+        return len(self.pieces)
+
+    def to_lists(self):
+        """Return a mutable list-of-lists copy of the grid."""
+        return [list(row) for row in self.pieces]
+
+
+def initial_position(n, player="White"):
+    """Return the empty n x n position."""
+    return Position(tuple((0,) * n for _ in range(n)), player)
+
+
+def from_grid(pieces, player="White"):
+    """Validate a grid of signed counts and return it as a Position."""
+    n = len(pieces)
+    if any(len(row) != n for row in pieces):
+        raise ValueError("Position must be an n x n grid")
+    thresholds = make_thresholds(n)
+    for i in range(n):
+        for j in range(n):
+            count = pieces[i][j]
+            k = thresholds[i][j]
+            if abs(count) > k:
+                raise ValueError(f"Invalid piece count at ({i},{j}): |{count}| > k={k}")
+    return Position(tuple(tuple(row) for row in pieces), player)
+
+
+def is_saturated(pieces, i, j):
+    """Check if the stack at (i,j) has reached its threshold (is an attacker)."""
+    return abs(pieces[i][j]) == make_thresholds(len(pieces))[i][j]
+
+
+def blocking_attacker(pieces, i, j):
+    """Return the neighbor of (i,j) that blocks it, or None if it is not blocked."""
+    thresholds = make_thresholds(len(pieces))
+    for ni, nj in make_neighbors(len(pieces))[i][j]:
+        if abs(pieces[ni][nj]) == thresholds[ni][nj]:
+            return (ni, nj)
+    return None
+
+
+def is_blocked(pieces, i, j):
+    """Check if position (i,j) is blocked."""
+    return blocking_attacker(pieces, i, j) is not None
+
+
+def is_legal(pieces, i, j, player):
+    """Check if player may place a piece at (i,j)."""
+    current_pieces = pieces[i][j]
+    k = make_thresholds(len(pieces))[i][j]
+    if player == "White":
+        ok = 0 <= current_pieces < k
+    else:
+        ok = 0 <= -current_pieces < k
+    return ok and not is_blocked(pieces, i, j)
+
+
+def get_possible_moves(pieces, player):
+    """Return list of (i,j) coordinates for valid moves."""
+    n = len(pieces)
+    return [(i, j) for i in range(n) for j in range(n) if is_legal(pieces, i, j, player)]
+
+
+def has_legal_moves(pieces, player):
+    """Check if player has at least one legal move."""
+    n = len(pieces)
+    return any(is_legal(pieces, i, j, player) for i in range(n) for j in range(n))
+
+
+def apply_attacker_effects(pieces, i, j):
+    """Clear the neighbors of the attacker at (i,j) in place.
+
+    Returns the list of cells that were cleared.
+    """
+    cleared = []
+    for ni, nj in make_neighbors(len(pieces))[i][j]:
+        if pieces[ni][nj] != 0:
+            pieces[ni][nj] = 0
+            cleared.append((ni, nj))
+    return cleared
+
+
+def place_piece(pieces, i, j, player):
+    """Place a piece for player at (i,j) in place, without legality checks.
+
+    Returns the list of cells cleared by the attacker effect (empty unless the
+    stack reached its threshold).
+    """
+    count = abs(pieces[i][j]) + 1
+    pieces[i][j] = count if player == "White" else -count
+    if count == make_thresholds(len(pieces))[i][j]:
+        return apply_attacker_effects(pieces, i, j)
+    return []
+
+
+def apply_move(position, move):
+    """Return the Position after the player to move places at move=(i,j)."""
+    i, j = move
+    if not is_legal(position.pieces, i, j, position.player):
+        raise ValueError(f"Illegal move {move} for {position.player}")
+    pieces = position.to_lists()
+    place_piece(pieces, i, j, position.player)
+    return Position(tuple(tuple(row) for row in pieces), other_player(position.player))
+
+
+class Overlay:
+    """Read-only grid view of a parent grid with a few cells changed.
+
+    Rows the changes do not touch are the parent's own rows; a touched row
+    is patched into a tuple the first time it is read. The parent must not
+    be modified while the view is in use. hash is the Zobrist key of the
+    position the view shows, or None.
+    """
+
+    def __init__(self, parent, changes, hash=None):
+        self.parent = parent
+        self.changes = changes
+        self.hash = hash
+        self.rows = {}
+
+    def __len__(self):
+        return len(self.parent)
+
+    def __getitem__(self, i):
+        row = self.rows.get(i)
+        if row is None:
+            row = self.parent[i]
+            patched = [(j, value) for (ci, j), value in self.changes.items() if ci == i]
+            if patched:
+                row = list(row)
+                for j, value in patched:
+                    row[j] = value
+                row = tuple(row)
+            self.rows[i] = row
+        return row
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self.parent)))
+
+    def to_lists(self):
+        """Return a mutable list-of-lists copy of the grid."""
+        rows = [list(row) for row in self.parent]
+        for (i, j), value in self.changes.items():
+            rows[i][j] = value
+        return rows
+
+
+def iter_successors(pieces, player):
+    """Yield (move, Overlay) for each legal move of player, in row-major order.
+
+    Successors are computed only as they are consumed, and each one records
+    just the cells its move changes on top of pieces, so a caller that stops
+    after a few pays for those few. pieces must not be modified until the
+    iteration and the views are done with.
+    """
+    board = Board(pieces, player)
+    for i, j in board.get_possible_moves():
+        yield (i, j), Overlay(pieces, board.move_changes(i, j), board.successor_hash(i, j))
+
+
+def get_possible_boards(pieces, player):
+    """Return list of possible board states after player's moves."""
+    return [{"board": view.to_lists(), "move": move, "hash": view.hash}
+            for move, view in iter_successors(pieces, player)]
+
+
+def winner(position):
+    """Return the winner if the player to move has no legal moves, else None."""
+    if has_legal_moves(position.pieces, position.player):
+        return None
+    return other_player(position.player)
+
+
+class Board:
+    """Mutable ruleset-1 board with in-place make_move/unmake_move.
+
+    Each move pushes an undo record holding only the cells it changed: the
+    placed stack's previous count and the previous counts of any neighbors
+    cleared by the attacker effect. Undo is O(1) and history is O(moves).
+
+    The board also keeps, per cell, the number of adjacent attackers (a cell
+    is blocked while it is non-zero) and the set of legal moves of each
+    player. Both are updated only around the played cell and its neighbors,
+    so has_legal_moves is an emptiness check.
+
+    hash is the position's Zobrist key (see zobrist.py), updated with the
+    same per-move deltas.
+    """
+
+    def __init__(self, pieces, player="White"):
+        self.n = len(pieces)
+        self.pieces = [list(row) for row in pieces]
+        self.player = player
+        self.history = []
+        self.thresholds = make_thresholds(self.n)
+        self.neighbors = make_neighbors(self.n)
+        self.attacker_neighbors = [[0] * self.n for _ in range(self.n)]
+        self.legal = {"White": set(), "Black": set()}
+        self.keys = zobrist.get_keys(self.n)
+        self.hash = zobrist.hash_grid(self.pieces, player)
+        for i in range(self.n):
+            for j in range(self.n):
+                if abs(self.pieces[i][j]) == self.thresholds[i][j]:
+                    for ni, nj in self.neighbors[i][j]:
+                        self.attacker_neighbors[ni][nj] += 1
+        for i in range(self.n):
+            for j in range(self.n):
+                self._refresh(i, j)
+
+    @classmethod
+    def empty(cls, n, player="White"):
+        return cls([[0] * n for _ in range(n)], player)
+
+    def to_position(self):
+        """Return an immutable Position snapshot of the board."""
+        return Position(tuple(tuple(row) for row in self.pieces), self.player)
+
+    def _refresh(self, i, j):
+        """Recompute whether (i,j) is a legal move for each player."""
+        count = self.pieces[i][j]
+        k = self.thresholds[i][j]
+        free = self.attacker_neighbors[i][j] == 0
+        cell = (i, j)
+        if free and 0 <= count < k:
+            self.legal["White"].add(cell)
+        else:
+            self.legal["White"].discard(cell)
+        if free and 0 <= -count < k:
+            self.legal["Black"].add(cell)
+        else:
+            self.legal["Black"].discard(cell)
+
+    def _set_attacker(self, i, j, delta):
+        """Add delta to the attacker count of the neighbors of (i,j) and refresh them."""
+        for ni, nj in self.neighbors[i][j]:
+            self.attacker_neighbors[ni][nj] += delta
+            self._refresh(ni, nj)
+
+    def is_blocked(self, i, j):
+        """Check if position (i,j) is blocked."""
+        return self.attacker_neighbors[i][j] > 0
+
+    def is_legal(self, i, j, player=None):
+        return (i, j) in self.legal[player or self.player]
+
+    def get_possible_moves(self, player=None):
+        """Return list of (i,j) coordinates for valid moves, in row-major order."""
+        return sorted(self.legal[player or self.player])
+
+    def has_legal_moves(self, player=None):
+        return bool(self.legal[player or self.player])
+
+    def successor_hash(self, i, j):
+        """Return the Zobrist key after the player to move plays (i,j), without playing it."""
+        keys = self.keys
+        old = self.pieces[i][j]
+        count = abs(old) + 1
+        new = count if self.player == "White" else -count
+        key = self.hash ^ keys.black ^ keys.cell(i, j, old) ^ keys.cell(i, j, new)
+        if count == self.thresholds[i][j]:
+            for ni, nj in self.neighbors[i][j]:
+                key ^= keys.cell(ni, nj, self.pieces[ni][nj])
+        return key
+
+    def move_changes(self, i, j):
+        """Return {(i,j): new count} for the cells the player to move would change by playing (i,j)."""
+        count = abs(self.pieces[i][j]) + 1
+        changes = {(i, j): count if self.player == "White" else -count}
+        if count == self.thresholds[i][j]:
+            for ni, nj in self.neighbors[i][j]:
+                if self.pieces[ni][nj] != 0:
+                    changes[(ni, nj)] = 0
+        return changes
+
+    def make_move(self, i, j):
+        """Play (i,j) for the player to move, in place, without legality checks.
+
+        Returns the list of cells cleared by the attacker effect.
+        """
+        pieces = self.pieces
+        old = pieces[i][j]
+        count = abs(old) + 1
+        pieces[i][j] = count if self.player == "White" else -count
+        keys = self.keys
+        self.hash ^= keys.black ^ keys.cell(i, j, old) ^ keys.cell(i, j, pieces[i][j])
+        cleared = []
+        if count == self.thresholds[i][j]:
+            for ni, nj in self.neighbors[i][j]:
+                if pieces[ni][nj] != 0:
+                    cleared.append((ni, nj, pieces[ni][nj]))
+                    self.hash ^= keys.cell(ni, nj, pieces[ni][nj])
+                    pieces[ni][nj] = 0
+            self._set_attacker(i, j, 1)
+        self._refresh(i, j)
+        self.history.append((i, j, old, cleared))
+        self.player = other_player(self.player)
+        return [(ni, nj) for ni, nj, _ in cleared]
+
+    def unmake_move(self):
+        """Revert the last move. Returns the (i,j) that was played."""
+        i, j, old, cleared = self.history.pop()
+        pieces = self.pieces
+        saturated = abs(pieces[i][j]) == self.thresholds[i][j]
+        keys = self.keys
+        self.hash ^= keys.black ^ keys.cell(i, j, pieces[i][j]) ^ keys.cell(i, j, old)
+        pieces[i][j] = old
+        for ni, nj, count in cleared:
+            pieces[ni][nj] = count
+            self.hash ^= keys.cell(ni, nj, count)
+        if saturated:
+            self._set_attacker(i, j, -1)
+        self._refresh(i, j)
+        self.player = other_player(self.player)
+        return (i, j)
@@ -0,0 +1,415 @@
+"""Headless rules engine for ruleset 2 (neutral green pieces).
+
+On top of ruleset 1, the player to move may instead place a neutral green
+piece on any unblocked non-empty stack with room left. Green pieces take up
+capacity (colored + green <= k) but never count towards saturation, and they
+are cleared together with the stack they sit on.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+import zobrist
+from engine import (make_thresholds, make_neighbors, is_blocked, other_player, Overlay)
+
+PIECE_TYPES = ("White", "Black", "Green")
+
+# GreenBoard packs a cell into one integer: bits 0-2 hold the colored
+# count, bits 3-4 the owner and bits 5-6 the green count
+COUNT_MASK = 0b111
+OWNER_WHITE = 0b01000
+OWNER_BLACK = 0b10000
+OWNER_MASK = OWNER_WHITE | OWNER_BLACK
+GREEN_UNIT = 0b100000
+CELL_BITS = 7
+
+
+class GreenPosition(namedtuple("GreenPosition", ["pieces", "green_pieces", "player"])):
+    """Immutable ruleset-2 position: signed counts, green counts and player to move."""
+    __slots__ = ()
+
+    @property
+    def n(self):
+        return len(self.pieces)
+
+    def to_lists(self):
+        """Return mutable list-of-lists copies of both grids."""
+        return [list(row) for row in self.pieces], [list(row) for row in self.green_pieces]
+
+
+# Lazy successor from iter_successors: two Overlay grids and the Zobrist key
+GreenSuccessor = namedtuple("GreenSuccessor", ["pieces", "green_pieces", "hash"])
+
+
+def initial_position(n, player="White"):
+    """Return the empty n x n position."""
+    empty = tuple((0,) * n for _ in range(n))
+    return GreenPosition(empty, empty, player)
+
+
+def from_grids(pieces, green_pieces, player="White"):
+    """Validate both grids and return them as a GreenPosition."""
+    n = len(pieces)
+    if any(len(row) != n for row in pieces):
+        raise ValueError("Position must be an n x n grid")
+    if len(green_pieces) != n or any(len(row) != n for row in green_pieces):
+        raise ValueError("Green position must be an n x n grid")
+    thresholds = make_thresholds(n)
+    for i in range(n):
+        for j in range(n):
+            count = pieces[i][j]
+            green = green_pieces[i][j]
+            k = thresholds[i][j]
+            if abs(count) + green > k or green < 0:
+                raise ValueError(f"Invalid counts at ({i},{j}): |{count}| + {green} > k={k}")
+            if green > 0 and count == 0:
+                raise ValueError(f"Green pieces require White/Black at ({i},{j})")
+    return GreenPosition(tuple(tuple(row) for row in pieces),
+                         tuple(tuple(row) for row in green_pieces), player)
+
+
+def is_legal(pieces, green_pieces, i, j, player, piece_type):
+    """Check if player may place a piece of piece_type at (i,j)."""
+    count = pieces[i][j]
+    green = green_pieces[i][j]
+    if abs(count) + green >= make_thresholds(len(pieces))[i][j]:
+        return False
+    if piece_type == "Green":
+        ok = count != 0
+    elif piece_type != player:
+        return False
+    elif player == "White":
+        ok = count > 0 or (count == 0 and green == 0)
+    else:
+        ok = count < 0 or (count == 0 and green == 0)
+    return ok and not is_blocked(pieces, i, j)
+
+
+def get_possible_moves(pieces, green_pieces, player, piece_type):
+    """Return list of (i,j) coordinates where player may place piece_type."""
+    n = len(pieces)
+    return [(i, j) for i in range(n) for j in range(n)
+            if is_legal(pieces, green_pieces, i, j, player, piece_type)]
+
+
+def get_all_moves(pieces, green_pieces, player):
+    """Return every legal move of player as (i, j, piece_type) triples."""
+    moves = [(i, j, player) for i, j in get_possible_moves(pieces, green_pieces, player, player)]
+    moves += [(i, j, "Green") for i, j in get_possible_moves(pieces, green_pieces, player, "Green")]
+    return moves
+
+
+def has_legal_moves(pieces, green_pieces, player):
+    """Check if player has a colored or green move."""
+    n = len(pieces)
+    return any(is_legal(pieces, green_pieces, i, j, player, piece_type)
+               for piece_type in (player, "Green")
+               for i in range(n) for j in range(n))
+
+
+def apply_attacker_effects(pieces, green_pieces, i, j):
+    """Clear the neighbors of the attacker at (i,j) in place.
+
+    Returns the list of cells that were cleared.
+    """
+    cleared = []
+    for ni, nj in make_neighbors(len(pieces))[i][j]:
+        if pieces[ni][nj] != 0:
+            pieces[ni][nj] = 0
+            green_pieces[ni][nj] = 0
+            cleared.append((ni, nj))
+    return cleared
+
+
+def place_piece(pieces, green_pieces, i, j, player, piece_type):
+    """Place piece_type at (i,j) in place, without legality checks.
+
+    Returns the list of cells cleared by the attacker effect.
+    """
+    if piece_type == "Green":
+        green_pieces[i][j] += 1
+        return []
+    count = abs(pieces[i][j]) + 1
+    pieces[i][j] = count if player == "White" else -count
+    if count == make_thresholds(len(pieces))[i][j]:
+        return apply_attacker_effects(pieces, green_pieces, i, j)
+    return []
+
+
+def successor_hash(key, pieces, green_pieces, i, j, player, piece_type):
+    """Return the Zobrist key after player places piece_type at (i,j).
+
+    key is the Zobrist key of the position before the move (see
+    zobrist.hash_grid); only the cells the move changes are rehashed.
+    """
+    keys = zobrist.get_keys(len(pieces))
+    key ^= keys.black
+    green = green_pieces[i][j]
+    if piece_type == "Green":
+        return key ^ keys.green(i, j, green) ^ keys.green(i, j, green + 1)
+    old = pieces[i][j]
+    count = abs(old) + 1
+    key ^= keys.cell(i, j, old) ^ keys.cell(i, j, count if player == "White" else -count)
+    if count == make_thresholds(len(pieces))[i][j]:
+        for ni, nj in make_neighbors(len(pieces))[i][j]:
+            key ^= keys.cell(ni, nj, pieces[ni][nj]) ^ keys.green(ni, nj, green_pieces[ni][nj])
+    return key
+
+
+def apply_move(position, move):
+    """Return the GreenPosition after the player to move plays move=(i, j, piece_type)."""
+    i, j, piece_type = move
+    if not is_legal(position.pieces, position.green_pieces, i, j, position.player, piece_type):
+        raise ValueError(f"Illegal move {move} for {position.player}")
+    pieces, green_pieces = position.to_lists()
+    place_piece(pieces, green_pieces, i, j, position.player, piece_type)
+    return GreenPosition(tuple(tuple(row) for row in pieces),
+                         tuple(tuple(row) for row in green_pieces),
+                         other_player(position.player))
+
+
+def iter_successors(pieces, green_pieces, player):
+    """Yield ((i, j, piece_type), GreenSuccessor) for each legal move of player.
+
+    Colored moves of a cell come before its green move, cells in row-major
+    order. Successors are computed only as they are consumed, and their
+    grids are engine.Overlay views holding just the cells the move changed.
+    The grids must not be modified until the iteration and the views are
+    done with.
+    """
+    board = GreenBoard(pieces, green_pieces, player)
+    n = board.n
+    for b, piece_type in board.legal_moves():
+        count_changes = {}
+        green_changes = {}
+        for c in [b] + board.make_move(b, piece_type):
+            count, green = unpack_cell(board.cells[c])
+            count_changes[(c // n, c % n)] = count
+            green_changes[(c // n, c % n)] = green
+        key = board.hash
+        board.unmake_move()
+        yield ((b // n, b % n, piece_type),
+               GreenSuccessor(Overlay(pieces, count_changes), Overlay(green_pieces, green_changes), key))
+
+
+def get_possible_boards(pieces, green_pieces, player):
+    """Return list of possible board states after player's colored and green moves."""
+    return [{"pieces": view.pieces.to_lists(), "green_pieces": view.green_pieces.to_lists(),
+             "move": (i, j), "piece_type": piece_type, "hash": view.hash}
+            for (i, j, piece_type), view in iter_successors(pieces, green_pieces, player)]
+
+
+def winner(position):
+    """Return the winner if the player to move has no legal moves, else None."""
+    if has_legal_moves(position.pieces, position.green_pieces, position.player):
+        return None
+    return other_player(position.player)
+
+
+def pack_cell(count, green):
+    """Return the packed code of a cell holding a signed count and green pieces."""
+    owner = OWNER_WHITE if count > 0 else OWNER_BLACK if count < 0 else 0
+    return abs(count) | owner | green * GREEN_UNIT
+
+
+def unpack_cell(code):
+    """Return (signed count, green) of a packed cell."""
+    count = code & COUNT_MASK
+    return (-count if code & OWNER_BLACK else count), code >> 5
+
+
+# Signed count of every code
+CODE_COUNTS = tuple(unpack_cell(code)[0] for code in range(1 << CELL_BITS))
+
+
+@lru_cache(maxsize=None)
+def cell_moves(k):
+    """Return, per player, the piece types that player may place on each code of a threshold-k cell.
+
+    The tables assume the cell is not blocked. Codes that are not valid
+    cell states map to no moves.
+    """
+    table = {"White": [()] * (1 << CELL_BITS), "Black": [()] * (1 << CELL_BITS)}
+    for code in range(1 << CELL_BITS):
+        count, green = unpack_cell(code)
+        if code & OWNER_MASK == OWNER_MASK or abs(count) + green >= k or (count == 0 and green):
+            continue
+        for player, sign in (("White", 1), ("Black", -1)):
+            moves = []
+            if count * sign >= 0:
+                moves.append(player)
+            if count != 0:
+                moves.append("Green")
+            table[player][code] = tuple(moves)
+    return {player: tuple(codes) for player, codes in table.items()}
+
+
+@lru_cache(maxsize=None)
+def code_tables(k):
+    """Return the Zobrist indices and the key code of every code of a threshold-k cell.
+
+    The indices are (count + MAX_COUNT, green) into ZobristKeys.counts and
+    greens. Invalid codes get those of an empty cell, whose value is 0.
+    """
+    indices = []
+    key_codes = []
+    for code in range(1 << CELL_BITS):
+        count, green = unpack_cell(code)
+        valid = abs(count) <= k and green <= zobrist.MAX_GREEN
+        indices.append((count + zobrist.MAX_COUNT, green) if valid else (zobrist.MAX_COUNT, 0))
+        key_codes.append(k | OWNER_MASK if abs(count) == k else code)
+    return tuple(indices), tuple(key_codes)
+
+
+@lru_cache(maxsize=None)
+def board_tables(n):
+    """Return the per-cell constants of GreenBoard for an n x n board.
+
+    These are the thresholds, neighbor indices, move tables and bit shifts
+    of each cell, the Zobrist value of each code of each cell, and the code
+    each cell contributes to GreenBoard.key. Attackers are keyed with both
+    owner bits set, since their color never matters once saturated.
+    """
+    thresholds = make_thresholds(n)
+    neighbors = make_neighbors(n)
+    keys = zobrist.get_keys(n)
+    ks = []
+    cell_neighbors = []
+    moves = {"White": [], "Black": []}
+    hashes = []
+    key_codes = []
+    for i in range(n):
+        for j in range(n):
+            k = thresholds[i][j]
+            ks.append(k)
+            cell_neighbors.append(tuple(ni * n + nj for ni, nj in neighbors[i][j]))
+            for player in moves:
+                moves[player].append(cell_moves(k)[player])
+            indices, codes = code_tables(k)
+            counts = keys.counts[i][j]
+            greens = keys.greens[i][j]
+            hashes.append(tuple(counts[c] ^ greens[g] for c, g in indices))
+            key_codes.append(codes)
+    shifts = tuple(CELL_BITS * b for b in range(n * n))
+    return (tuple(ks), tuple(cell_neighbors), {p: tuple(m) for p, m in moves.items()},
+            tuple(hashes), tuple(key_codes), shifts)
+
+
+class GreenBoard:
+    """Mutable ruleset-2 board with in-place make_move/unmake_move.
+
+    cells holds one packed integer per cell, row by row (see pack_cell), so
+    a green placement changes one small integer instead of copying two
+    grids. Moves are (cell index, piece type) pairs. Each move pushes an
+    undo record of the played cell's old code and the codes of any cleared
+    neighbors; the per-cell count of adjacent attackers is updated with it.
+
+    hash is the Zobrist key (see zobrist.py) and key an exact integer
+    packing the cells with attackers' colors dropped, both updated with the
+    same per-move deltas.
+    """
+
+    def __init__(self, pieces, green_pieces, player="White"):
+        self.n = n = len(pieces)
+        (self.k, self.neighbors, self.moves, self.hashes,
+         self.key_codes, self.shifts) = board_tables(n)
+        self.cells = [pack_cell(pieces[i][j], green_pieces[i][j]) for i in range(n) for j in range(n)]
+        self.player = player
+        self.history = []
+        self.attackers = [0] * (n * n)
+        for b, code in enumerate(self.cells):
+            if code & COUNT_MASK == self.k[b]:
+                for nb in self.neighbors[b]:
+                    self.attackers[nb] += 1
+        self.black_key = zobrist.get_keys(n).black
+        self.hash = self.black_key if player == "Black" else 0
+        self.key = 0
+        for b, code in enumerate(self.cells):
+            self.hash ^= self.hashes[b][code]
+            self.key |= self.key_codes[b][code] << self.shifts[b]
+
+    @classmethod
+    def empty(cls, n, player="White"):
+        empty = [[0] * n for _ in range(n)]
+        return cls(empty, empty, player)
+
+    def to_grids(self):
+        """Return list-of-lists copies of the signed counts and the green counts."""
+        n = self.n
+        rows = [self.cells[i * n:(i + 1) * n] for i in range(n)]
+        return ([[CODE_COUNTS[code] for code in row] for row in rows],
+                [[code >> 5 for code in row] for row in rows])
+
+    def to_position(self):
+        """Return an immutable GreenPosition snapshot of the board."""
+        pieces, green_pieces = self.to_grids()
+        return GreenPosition(tuple(tuple(row) for row in pieces),
+                             tuple(tuple(row) for row in green_pieces), self.player)
+
+    def legal_moves(self, player=None):
+        """Return the legal (cell index, piece type) moves of player, colored moves of a cell first."""
+        moves = self.moves[player or self.player]
+        attackers = self.attackers
+        return [(b, piece_type) for b, code in enumerate(self.cells) if not attackers[b]
+                for piece_type in moves[b][code]]
+
+    def is_legal(self, b, piece_type, player=None):
+        """Check if player (default: the player to move) may place piece_type on cell b."""
+        return not self.attackers[b] and piece_type in self.moves[player or self.player][b][self.cells[b]]
+
+    def has_legal_moves(self, player=None):
+        moves = self.moves[player or self.player]
+        attackers = self.attackers
+        return any(moves[b][code] for b, code in enumerate(self.cells) if not attackers[b])
+
+    def make_move(self, b, piece_type):
+        """Play piece_type on cell b for the player to move, in place, without legality checks.
+
+        Returns the list of cell indices cleared by the attacker effect.
+        """
+        cells = self.cells
+        old = cells[b]
+        if piece_type == "Green":
+            new = old + GREEN_UNIT
+        else:
+            new = ((old & COUNT_MASK) + 1) | (old & ~COUNT_MASK & ~OWNER_MASK)
+            new |= OWNER_WHITE if self.player == "White" else OWNER_BLACK
+        cells[b] = new
+        hashes = self.hashes
+        key_codes = self.key_codes
+        self.hash ^= hashes[b][old] ^ hashes[b][new] ^ self.black_key
+        key = self.key + ((key_codes[b][new] - key_codes[b][old]) << self.shifts[b])
+        cleared = []
+        if new & COUNT_MASK == self.k[b]:
+            for nb in self.neighbors[b]:
+                self.attackers[nb] += 1
+                code = cells[nb]
+                if code:
+                    cleared.append((nb, code))
+                    self.hash ^= hashes[nb][code]
+                    key -= key_codes[nb][code] << self.shifts[nb]
+                    cells[nb] = 0
+        self.key = key
+        self.history.append((b, old, cleared))
+        self.player = other_player(self.player)
+        return [nb for nb, _ in cleared]
+
+    def unmake_move(self):
+        """Revert the last move. Returns the (cell index, piece type) that was played."""
+        b, old, cleared = self.history.pop()
+        cells = self.cells
+        new = cells[b]
+        hashes = self.hashes
+        key_codes = self.key_codes
+        self.player = other_player(self.player)
+        if new & COUNT_MASK == self.k[b]:
+            for nb in self.neighbors[b]:
+                self.attackers[nb] -= 1
+        key = self.key + ((key_codes[b][old] - key_codes[b][new]) << self.shifts[b])
+        for nb, code in cleared:
+            cells[nb] = code
+            self.hash ^= hashes[nb][code]
+            key += key_codes[nb][code] << self.shifts[nb]
+        cells[b] = old
+        self.hash ^= hashes[b][old] ^ hashes[b][new] ^ self.black_key
+        self.key = key
+        return (b, "Green" if new >> 5 != old >> 5 else self.player)
@@ -0,0 +1,188 @@
+"""Paginated, scrollable gallery of preview thumbnails.
+
+The demos show the successor boards of a position here, PAGE_SIZE to a
+page. Items are pulled from the iterator they come from (such as
+iter_successors) only when their page is first shown, so opening the
+gallery costs one page of successors however many there are.
+
+A page scrolls vertically and only its rows in the window are rendered: a
+pool of (VIEW_ROWS + 1) * COLUMNS canvases, each with its label, is moved
+to the slots that scroll into view and redrawn there. Slots that stay in
+view keep their drawing, and nothing is drawn for rows never scrolled to.
+
+Only Gallery needs tkinter.
+"""
+PAGE_SIZE = 50
+COLUMNS = 5
+VIEW_ROWS = 2  # Rows of thumbnails in the window
+PAD = 5
+LABEL_HEIGHT = 20
+
+
+class Gallery:
+    """Thumbnail gallery with Prev/Next pages and a scrollbar.
+
+    draw(canvas, item) draws item on an empty thumbnail canvas and
+    describe(item) returns its label text; both run only for thumbnails
+    that scroll into view.
+    """
+
+    def __init__(self, parent, thumb_width, thumb_height, draw, describe):
+        import tkinter as tk
+        self.tk = tk
+        self.thumb_width = thumb_width
+        self.thumb_height = thumb_height
+        self.draw = draw
+        self.describe = describe
+        self.slot_width = thumb_width + 2 * PAD
+        self.slot_height = thumb_height + LABEL_HEIGHT + 2 * PAD
+        self.source = None
+        self.items = []
+        self.total = None  # Number of items if known, else None until the source runs out
+        self.page = 0
+        self.pool = []  # One dict per thumbnail canvas: window, canvas, label and the item index it shows
+        self.frame = tk.Frame(parent)
+        self.strip = tk.Canvas(self.frame, width=COLUMNS * self.slot_width,
+                               height=VIEW_ROWS * self.slot_height, yscrollincrement=self.slot_height)
+        self.strip.grid(row=0, column=0)
+        ybar = tk.Scrollbar(self.frame, orient="vertical", command=self.yview)
+        ybar.grid(row=0, column=1, sticky="ns")
+        self.strip.configure(yscrollcommand=ybar.set)
+        nav = tk.Frame(self.frame)
+        nav.grid(row=1, column=0)
+        self.prev_button = tk.Button(nav, text="< Prev", command=lambda: self.set_page(self.page - 1))
+        self.prev_button.pack(side=tk.LEFT)
+        self.page_label = tk.Label(nav, text="", font=("Arial", 8), width=30)
+        self.page_label.pack(side=tk.LEFT)
+        self.next_button = tk.Button(nav, text="Next >", command=lambda: self.set_page(self.page + 1))
+        self.next_button.pack(side=tk.LEFT)
+        self.bind_wheel(self.strip)
+        self.strip.bind("<Configure>", lambda event: self.refresh())
+        self.update_nav()
+
+    def bind_wheel(self, widget):
+        # "break" keeps the wheel from also scrolling an enclosing window
+        widget.bind("<Button-4>", lambda event: self.scroll(-1) or "break")
+        widget.bind("<Button-5>", lambda event: self.scroll(1) or "break")
+        widget.bind("<MouseWheel>", lambda event: self.scroll(-1 if event.delta > 0 else 1) or "break")
+
+    def show(self, items, total=None):
+        """Show the items of an iterable from the first page, pulling them lazily."""
+        self.source = iter(items)
+        self.items = []
+        self.total = total
+        self.set_page(0)
+
+    def clear(self):
+        """Empty the gallery."""
+        self.source = None
+        self.items = []
+        self.total = None
+        self.set_page(0)
+
+    def fetch(self, count):
+        """Pull items from the source until there are count of them or it runs out."""
+        while len(self.items) < count and self.source is not None:
+            item = next(self.source, None)
+            if item is None:
+                self.source = None
+                self.total = len(self.items)
+            else:
+                self.items.append(item)
+
+    def page_count(self):
+        """Return the number of pages known so far (at least one)."""
+        return max(1, -(-len(self.items) // PAGE_SIZE))
+
+    def page_range(self):
+        """Return the item indices of the current page."""
+        start = self.page * PAGE_SIZE
+        return range(start, min(start + PAGE_SIZE, len(self.items)))
+
+    def set_page(self, page):
+        """Show page page from its top, fetching its items and one more to know if a next page exists."""
+        self.fetch((max(0, page) + 1) * PAGE_SIZE + 1)
+        self.page = max(0, min(page, self.page_count() - 1))
+        rows = -(-len(self.page_range()) // COLUMNS)
+        self.strip.configure(scrollregion=(0, 0, COLUMNS * self.slot_width, rows * self.slot_height))
+        self.strip.yview_moveto(0)
+        for slot in self.pool:
+            self.hide(slot)
+        self.refresh()
+        self.update_nav()
+
+    def update_nav(self):
+        shown = self.page_range()
+        if not self.items:
+            text = "No boards" if self.total == 0 else ""
+        else:
+            total = self.total if self.total is not None else f"{len(self.items) - 1}+"
+            text = f"Boards {shown.start + 1}-{shown.stop} of {total}"
+        self.page_label.config(text=text)
+        self.prev_button.config(state="normal" if self.page > 0 else "disabled")
+        self.next_button.config(state="normal" if self.page < self.page_count() - 1 else "disabled")
+
+    def visible_indices(self):
+        """Return the item indices of the page whose slots are in the window."""
+        shown = self.page_range()
+        height = max(self.strip.winfo_height(), int(self.strip.cget("height")))
+        y0 = self.strip.canvasy(0)
+        first = int(y0 // self.slot_height)
+        last = int((y0 + height - 1) // self.slot_height)
+        return [index for index in range(shown.start + first * COLUMNS, shown.start + (last + 1) * COLUMNS)
+                if index in shown]
+
+    def refresh(self):
+        """Move pool canvases to the slots that scrolled into view and draw their items."""
+        visible = self.visible_indices()
+        wanted = set(visible)
+        free = []
+        for slot in self.pool:
+            if slot["index"] in wanted:
+                wanted.discard(slot["index"])
+            else:
+                self.hide(slot)
+                free.append(slot)
+        for index in visible:
+            if index in wanted:
+                slot = free.pop() if free else self.new_slot()
+                self.place(slot, index)
+
+    def new_slot(self):
+        tk = self.tk
+        frame = tk.Frame(self.strip)
+        canvas = tk.Canvas(frame, width=self.thumb_width, height=self.thumb_height, bg="white")
+        canvas.pack()
+        label = tk.Label(frame, text="", font=("Arial", 8))
+        label.pack()
+        self.bind_wheel(canvas)
+        self.bind_wheel(label)
+        window = self.strip.create_window(0, 0, window=frame, anchor="nw", state="hidden")
+        slot = {"window": window, "canvas": canvas, "label": label, "index": None}
+        self.pool.append(slot)
+        return slot
+
+    def place(self, slot, index):
+        """Show item index in slot at its place on the page."""
+        position = index - self.page * PAGE_SIZE
+        row, col = divmod(position, COLUMNS)
+        self.strip.coords(slot["window"], col * self.slot_width + PAD, row * self.slot_height + PAD)
+        self.strip.itemconfig(slot["window"], state="normal")
+        item = self.items[index]
+        slot["canvas"].delete("all")
+        self.draw(slot["canvas"], item)
+        slot["label"].config(text=self.describe(item))
+        slot["index"] = index
+
+    def hide(self, slot):
+        if slot["index"] is not None:
+            self.strip.itemconfig(slot["window"], state="hidden")
+            slot["index"] = None
+
+    def yview(self, *args):
+        self.strip.yview(*args)
+        self.refresh()
+
+    def scroll(self, rows):
+        self.strip.yview_scroll(rows, "units")
+        self.refresh()
@@ -0,0 +1,151 @@
+"""Monte Carlo Tree Search (UCT) player for ruleset-1 positions.
+
+Each playout walks down the tree choosing children by the UCB1 bound, adds
+one new node, then finishes the game with a rollout policy and credits the
+result to every node on the path. Playouts run on a single BitBoard with
+make/unmake moves, so no position is copied; the board is unwound to the
+root after every playout.
+
+Rollout policies are functions (board, player, rng) -> cell index, see
+ROLLOUT_POLICIES. The search stops after a number of playouts or a time
+limit, whichever comes first, and plays the most visited root move.
+
+Run "python3 mcts.py --size 8 --time 1" to search an empty board and print
+the playouts/sec rate.
+"""
+import math
+import random
+import time
+from collections import namedtuple
+
+import engine
+from bitboard import BitBoard, iter_bits
+from strategies import heuristic_move, random_move
+
+MCTSResult = namedtuple("MCTSResult", ["move", "win_rate", "playouts", "seconds", "pps"])
+
+ROLLOUT_POLICIES = {
+    "random": random_move,
+    "heuristic": heuristic_move,
+}
+
+DEFAULT_PLAYOUTS = 2000
+DEFAULT_EXPLORATION = 1.4
+
+
+class Node:
+    """A search tree node. wins counts playouts won by the player who moved into it."""
+    __slots__ = ("move", "player", "parent", "children", "untried", "wins", "visits")
+
+    def __init__(self, move, player, parent, legal):
+        self.move = move
+        self.player = player  # player to move at this node
+        self.parent = parent
+        self.children = []
+        self.untried = list(iter_bits(legal))
+        self.wins = 0
+        self.visits = 0
+
+    def select_child(self, exploration):
+        """Return the child with the largest UCB1 bound."""
+        log_visits = math.log(self.visits)
+        return max(self.children,
+                   key=lambda child: child.wins / child.visits +
+                   exploration * math.sqrt(log_visits / child.visits))
+
+
+class MCTS:
+    """UCT player.
+
+    playouts and time_limit (seconds) bound each search; either may be None
+    but not both. policy names a rollout policy in ROLLOUT_POLICIES.
+    """
+
+    def __init__(self, playouts=DEFAULT_PLAYOUTS, time_limit=None, policy="random",
+                 exploration=DEFAULT_EXPLORATION, rng=None):
+        if playouts is None and time_limit is None:
+            raise ValueError("MCTS needs a playout count or a time limit")
+        self.playouts = playouts
+        self.time_limit = time_limit
+        self.rollout = ROLLOUT_POLICIES[policy]
+        self.exploration = exploration
+        self.rng = rng or random.Random()
+
+    def playout(self, board, root):
+        """Run one selection/expansion/rollout/backpropagation pass from root."""
+        node = root
+        depth = len(board.history)
+        # Selection
+        while not node.untried and node.children:
+            node = node.select_child(self.exploration)
+            board.make_move(node.move, node.parent.player)
+        # Expansion
+        if node.untried:
+            b = node.untried.pop(self.rng.randrange(len(node.untried)))
+            board.make_move(b, node.player)
+            opponent = engine.other_player(node.player)
+            child = Node(b, opponent, node, board.legal_mask(opponent))
+            node.children.append(child)
+            node = child
+        # Rollout: the player left without a legal move loses
+        player = node.player
+        while True:
+            b = self.rollout(board, player, self.rng)
+            if b is None:
+                break
+            board.make_move(b, player)
+            player = engine.other_player(player)
+        winner = engine.other_player(player)
+        while len(board.history) > depth:
+            board.unmake_move()
+        # Backpropagation
+        while node is not None:
+            node.visits += 1
+            if node.player != winner:
+                node.wins += 1
+            node = node.parent
+
+    def search(self, pieces, player="White"):
+        """Search a grid for player to move. Returns an MCTSResult.
+
+        move is the most visited (i,j), or None if player has no legal move,
+        and win_rate its share of won playouts.
+        """
+        board = BitBoard.from_grid(pieces)
+        n = board.n
+        root = Node(None, player, None, board.legal_mask(player))
+        start = time.perf_counter()
+        deadline = start + self.time_limit if self.time_limit is not None else None
+        count = 0
+        if root.untried:
+            while self.playouts is None or count < self.playouts:
+                if deadline is not None and time.perf_counter() > deadline:
+                    break
+                self.playout(board, root)
+                count += 1
+        seconds = time.perf_counter() - start
+        pps = count / seconds if seconds > 0 else 0.0
+        if not root.children:
+            return MCTSResult(None, 0.0, count, seconds, pps)
+        best = max(root.children, key=lambda child: child.visits)
+        return MCTSResult((best.move // n, best.move % n), best.wins / best.visits,
+                          count, seconds, pps)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Run MCTS on the empty n x n ruleset-1 board.")
+    parser.add_argument("--size", type=int, default=6, help="board size n")
+    parser.add_argument("--playouts", type=int, default=None, help="playout budget")
+    parser.add_argument("--time", type=float, default=1.0, help="time budget in seconds")
+    parser.add_argument("--policy", choices=sorted(ROLLOUT_POLICIES), default="random",
+                        help="rollout policy")
+    args = parser.parse_args()
+    player = MCTS(args.playouts, args.time, args.policy)
+    result = player.search(engine.initial_position(args.size).pieces)
+    print(f"{args.size}x{args.size}: move {result.move}, win rate {result.win_rate:.2f}, "
+          f"{result.playouts} playouts in {result.seconds:.3f}s ({result.pps:.0f} playouts/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Per-move timing and search statistics for the demos.
+
+Metrics splits the wall time between two consecutive moves into phases:
+    movegen  engine work: legal-move generation and checks, successor
+             boards and applying moves
+    ai       choosing the AI's move (the heuristic, or a search's own time)
+    render   canvas updates, animation frames and previews
+    idle     the rest: waiting for a click, timers and the Tk event loop
+
+Code runs inside a phase with `with metrics.phase("render"):`. Phases nest
+and time is charged to the innermost one, so a move generation inside an
+AI decision counts as movegen only. Animations that run after a move are
+charged to the next one.
+
+It also sums the nodes and playouts of search results and reports the hit
+rates of watched caches: any object with hits and misses counters, such as
+a transposition table ("tt") or a tablebase ("tablebase"). Only lookups
+made after watch() count, so a cache shared between games starts from zero
+each game. stats() returns all of it as a dict and report() as text for the
+side panel.
+"""
+import time
+from contextlib import contextmanager
+
+PHASES = ("movegen", "ai", "render", "idle")
+
+
+class Metrics:
+    """Phase timings of every move plus cumulative search counters."""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        """Forget every move and counter, e.g. when a new game starts."""
+        self.moves = []  # One dict per move: phase -> seconds, plus "total"
+        self.current = dict.fromkeys(PHASES[:-1], 0.0)
+        self.move_start = self.clock()
+        self.stack = []  # [phase, seconds spent in nested phases] per open phase
+        self.searches = 0
+        self.nodes = 0
+        self.playouts = 0
+        self.caches = {}  # kind -> [cache, hits, misses when watched]
+
+    @contextmanager
+    def phase(self, name):
+        """Charge the time of the with-block to phase name."""
+        start = self.clock()
+        self.stack.append([name, 0.0])
+        try:
+            yield
+        finally:
+            _, nested = self.stack.pop()
+            elapsed = self.clock() - start
+            self.current[name] += elapsed - nested
+            if self.stack:
+                self.stack[-1][1] += elapsed
+
+    def add(self, name, seconds):
+        """Charge seconds measured elsewhere (such as in a search thread) to phase name."""
+        self.current[name] += seconds
+
+    def frames(self, animation, name="render"):
+        """Wrap an animation generator so the drawing of each frame is charged to name."""
+        try:
+            while True:
+                with self.phase(name):
+                    try:
+                        next(animation)
+                    except StopIteration:
+                        return
+                yield
+        finally:
+            animation.close()
+
+    def end_move(self):
+        """Close the current move: what the phases did not use is idle."""
+        now = self.clock()
+        total = now - self.move_start
+        move = dict(self.current)
+        move["idle"] = max(0.0, total - sum(self.current.values()))
+        move["total"] = total
+        self.moves.append(move)
+        self.current = dict.fromkeys(PHASES[:-1], 0.0)
+        self.move_start = now
+
+    def watch(self, cache, kind="tt"):
+        """Count the hits and misses of cache under kind from now on."""
+        watched = self.caches.setdefault(kind, [])
+        if all(entry[0] is not cache for entry in watched):
+            watched.append([cache, cache.hits, cache.misses])
+
+    def record_result(self, result):
+        """Add a search result's nodes (alpha-beta) or playouts (MCTS)."""
+        self.searches += 1
+        self.nodes += getattr(result, "nodes", 0)
+        self.playouts += getattr(result, "playouts", 0)
+
+    def hit_rate(self, kind="tt"):
+        """Return the fraction of lookups in the caches of kind that hit, or None if none were made."""
+        hits = misses = 0
+        for cache, hits_before, misses_before in self.caches.get(kind, []):
+            hits += cache.hits - hits_before
+            misses += cache.misses - misses_before
+        return hits / (hits + misses) if hits + misses else None
+
+    def stats(self):
+        """Return the counters and the mean, last and total milliseconds of each phase."""
+        totals = {name: sum(move[name] for move in self.moves) * 1000 for name in PHASES + ("total",)}
+        count = len(self.moves)
+        return {
+            "moves": count,
+            "total_ms": totals,
+            "mean_ms": {name: value / count for name, value in totals.items()} if count else {},
+            "last_ms": {name: value * 1000 for name, value in self.moves[-1].items()} if count else {},
+            "searches": self.searches,
+            "nodes": self.nodes,
+            "playouts": self.playouts,
+            "hit_rates": {kind: self.hit_rate(kind) for kind in self.caches},
+        }
+
+    def report(self):
+        """Return stats() as a few lines of text."""
+        stats = self.stats()
+        lines = [f"Moves: {stats['moves']}", f"{'ms':<8}{'last':>9}{'mean':>9}{'share':>7}"]
+        total = stats["total_ms"]["total"]
+        for name in PHASES + ("total",):
+            last = stats["last_ms"].get(name, 0.0)
+            mean = stats["mean_ms"].get(name, 0.0)
+            share = 100 * stats["total_ms"][name] / total if total else 0.0
+            lines.append(f"{name:<8}{last:9.1f}{mean:9.1f}{share:6.0f}%")
+        lines.append(f"Searches: {stats['searches']}")
+        lines.append(f"Nodes: {stats['nodes']}  Playouts: {stats['playouts']}")
+        for kind, rate in stats["hit_rates"].items():
+            lines.append(f"{kind} hits: " + ("-" if rate is None else f"{rate:.0%}"))
+        return "\n".join(lines)
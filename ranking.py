@@ -0,0 +1,158 @@
+"""Perfect ranking of positions to dense integers.
+
+A ruleset-1 cell holds a signed count in [-k, k], so it is one digit of
+radix 2k+1; a ruleset-2 cell holds a signed count c and a green count g
+with |c| + g <= k and g = 0 when c = 0, which is one digit of radix
+k(k+1) + 1. A position's rank is the mixed-radix number of its cells
+(cell (0,0) most significant) followed by a final binary digit for the
+side to move (1 = Black). rank() and unrank() are inverse bijections
+between valid positions and range(position_count(n)).
+
+Ranks of boards up to 4x4 fit in 64 bits under either ruleset; the batch
+functions return uint64 arrays for those sizes and object arrays of
+Python ints beyond. Only the batch functions need numpy.
+"""
+from functools import lru_cache
+
+from engine import make_thresholds
+
+
+@lru_cache(maxsize=None)
+def cell_radices(n, green=False):
+    """Return the radix of each cell, row by row."""
+    radices = []
+    for row in make_thresholds(n):
+        for k in row:
+            radices.append(k * (k + 1) + 1 if green else 2 * k + 1)
+    return tuple(radices)
+
+
+@lru_cache(maxsize=None)
+def place_values(n, green=False):
+    """Return the place value of each cell's digit in the rank."""
+    places = []
+    value = 2  # The side to move is the last digit
+    for radix in reversed(cell_radices(n, green)):
+        places.append(value)
+        value *= radix
+    return tuple(reversed(places))
+
+
+def position_count(n, green=False):
+    """Return the number of ranks: every cell state times the side to move."""
+    count = 2
+    for radix in cell_radices(n, green):
+        count *= radix
+    return count
+
+
+@lru_cache(maxsize=None)
+def green_states(k):
+    """Return the (count, green) cell states of threshold k in digit order."""
+    states = [(0, 0)]
+    for sign in (1, -1):
+        for count in range(1, k + 1):
+            for green in range(k - count + 1):
+                states.append((sign * count, green))
+    return tuple(states)
+
+
+@lru_cache(maxsize=None)
+def green_digits(k):
+    """Return the map (count, green) -> digit for threshold k."""
+    return {state: digit for digit, state in enumerate(green_states(k))}
+
+
+def rank(pieces, player="White"):
+    """Return the rank of a ruleset-1 grid of signed counts and the player to move."""
+    n = len(pieces)
+    thresholds = make_thresholds(n)
+    result = 0
+    for i in range(n):
+        for j in range(n):
+            result = result * (2 * thresholds[i][j] + 1) + pieces[i][j] + thresholds[i][j]
+    return result * 2 + (player == "Black")
+
+
+def unrank(value, n):
+    """Return (pieces, player) for a ruleset-1 rank; pieces is a list-of-lists grid."""
+    if not 0 <= value < position_count(n):
+        raise ValueError(f"Rank {value} out of range for a {n}x{n} board")
+    value, black = divmod(value, 2)
+    thresholds = make_thresholds(n)
+    pieces = [[0] * n for _ in range(n)]
+    for b in reversed(range(n * n)):
+        k = thresholds[b // n][b % n]
+        value, digit = divmod(value, 2 * k + 1)
+        pieces[b // n][b % n] = digit - k
+    return pieces, "Black" if black else "White"
+
+
+def rank_green(pieces, green_pieces, player="White"):
+    """Return the rank of a ruleset-2 position."""
+    n = len(pieces)
+    thresholds = make_thresholds(n)
+    result = 0
+    for i in range(n):
+        for j in range(n):
+            k = thresholds[i][j]
+            result = result * (k * (k + 1) + 1) + green_digits(k)[(pieces[i][j], green_pieces[i][j])]
+    return result * 2 + (player == "Black")
+
+
+def unrank_green(value, n):
+    """Return (pieces, green_pieces, player) for a ruleset-2 rank."""
+    if not 0 <= value < position_count(n, green=True):
+        raise ValueError(f"Rank {value} out of range for a {n}x{n} board")
+    value, black = divmod(value, 2)
+    thresholds = make_thresholds(n)
+    pieces = [[0] * n for _ in range(n)]
+    green_pieces = [[0] * n for _ in range(n)]
+    for b in reversed(range(n * n)):
+        k = thresholds[b // n][b % n]
+        value, digit = divmod(value, k * (k + 1) + 1)
+        pieces[b // n][b % n], green_pieces[b // n][b % n] = green_states(k)[digit]
+    return pieces, green_pieces, "Black" if black else "White"
+
+
+def _batch_places(n, green):
+    """Return the place values as an array, uint64 when every rank fits."""
+    import numpy as np
+    if position_count(n, green) <= 2 ** 64:
+        return np.array(place_values(n, green), dtype=np.uint64)
+    return np.array(place_values(n, green), dtype=object)
+
+
+def batch_rank(pieces, black):
+    """Rank many ruleset-1 positions at once.
+
+    pieces is a (B, n, n) integer array of signed counts and black a (B,)
+    bool array (True = Black to move). Returns a (B,) array of ranks.
+    """
+    import numpy as np
+    pieces = np.asarray(pieces)
+    n = pieces.shape[1]
+    places = _batch_places(n, False)
+    digits = pieces.reshape(len(pieces), -1).astype(np.int64) + np.array(make_thresholds(n)).reshape(-1)
+    return digits.astype(places.dtype) @ places + np.asarray(black).astype(places.dtype)
+
+
+def batch_rank_green(pieces, green_pieces, black):
+    """Rank many ruleset-2 positions at once (see batch_rank); green_pieces is (B, n, n)."""
+    import numpy as np
+    pieces = np.asarray(pieces)
+    n = pieces.shape[1]
+    places = _batch_places(n, True)
+    ks = np.array(make_thresholds(n)).reshape(-1)
+    # Digit lookup indexed by [k, count + k, green]; invalid states map to -1
+    top = int(ks.max())
+    table = np.full((top + 1, 2 * top + 1, top + 1), -1, dtype=np.int64)
+    for k in set(ks.tolist()):
+        for (count, green), digit in green_digits(k).items():
+            table[k, count + k, green] = digit
+    counts = pieces.reshape(len(pieces), -1).astype(np.int64)
+    greens = np.asarray(green_pieces).reshape(len(pieces), -1).astype(np.int64)
+    digits = table[ks, counts + ks, greens]
+    if (digits < 0).any():
+        raise ValueError("Invalid (count, green) cell state in batch")
+    return digits.astype(places.dtype) @ places + np.asarray(black).astype(places.dtype)
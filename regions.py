@@ -0,0 +1,189 @@
+"""Decomposition of ruleset-1 positions into independent regions.
+
+Attackers are permanent and blocked cells can never be played again, so once
+they cut the board apart the remaining live cells fall into connected
+components that never interact: a move in one component only changes that
+component (an attacker clears and blocks its own neighbors, which are either
+in the component or already dead). The position is then the disjunctive sum
+of its components, and its value is the sum of their values.
+
+ruleset1_demo.py and strategy_demo.py play the same rules on the shared
+engine, so this applies to both.
+
+A region is stored as a tuple of masks: the region's cells, then the White
+and Black stacks of height 1, 2 and 3 inside it (the layout of
+symmetry.key_masks). Regions are cached by their own symmetry-reduced key,
+so a region shape reached in different positions, or in different places of
+the same position, is only evaluated once.
+
+solver.Solver switches to these values once a position has split into
+regions that are all small enough.
+"""
+import sys
+
+import cgt
+import engine
+from bitboard import BitBoard, MAX_HEIGHT, iter_bits
+from symmetry import mask_images, pack
+
+
+def components(tables, mask):
+    """Split a cell mask into its orthogonally connected components."""
+    regions = []
+    while mask:
+        region = mask & -mask
+        while True:
+            grown = region | (tables.spread(region) & mask)
+            if grown == region:
+                break
+            region = grown
+        regions.append(region)
+        mask &= ~region
+    return regions
+
+
+def find_regions(board):
+    """Return the masks of the connected components of a BitBoard's live cells."""
+    return components(board.tables, board.live_mask())
+
+
+def find_regions_grid(pieces):
+    """Return the connected groups of live cells of a grid as lists of (i,j)."""
+    board = BitBoard.from_grid(pieces)
+    n = board.n
+    return [[(b // n, b % n) for b in iter_bits(region)] for region in find_regions(board)]
+
+
+def region_masks(board, region):
+    """Return the mask tuple of one region of a BitBoard."""
+    masks = [region]
+    for h in range(1, MAX_HEIGHT):
+        masks.append(board.white[h] & region)
+        masks.append(board.black[h] & region)
+    return tuple(masks)
+
+
+def restrict(masks, region):
+    """Return the mask tuple of a sub-region of masks[0]."""
+    return (region,) + tuple(mask & region for mask in masks[1:])
+
+
+class RegionValues:
+    """Canonical forms of regions, cached per region.
+
+    With symmetry=True regions are cached under their smallest image over
+    the symmetries of the square and color swapping (see
+    symmetry.mask_images); a region stored with its colors swapped has the
+    negated value.
+    """
+
+    def __init__(self, symmetry=True):
+        self.cache = {}
+        self.symmetry = symmetry
+        self.hits = 0
+        self.misses = 0
+
+    def value_of_region(self, tables, masks):
+        """Return the canonical form of one region given its mask tuple."""
+        n = tables.n
+        swapped = False
+        if self.symmetry:
+            key, _, swapped = min(mask_images(masks, n), key=lambda image: image[0])
+        else:
+            key = pack(masks, tables.size)
+        key = (n, key)
+        value = self.cache.get(key)
+        if value is not None:
+            self.hits += 1
+            return cgt.neg(value) if swapped else value
+        self.misses += 1
+        options = {}
+        for player in ("White", "Black"):
+            options[player] = [self.value_after(tables, masks, b, player)
+                               for b in iter_bits(self.legal_mask(masks, player))]
+        value = cgt.canonical(options["White"], options["Black"])
+        self.cache[key] = cgt.neg(value) if swapped else value
+        return value
+
+    def legal_mask(self, masks, player):
+        """Return the cells of a region where player may place a piece."""
+        # Black stacks are at the even indices, White stacks at the odd ones
+        if player == "White":
+            other = masks[2] | masks[4] | masks[6]
+        else:
+            other = masks[1] | masks[3] | masks[5]
+        return masks[0] & ~other
+
+    def value_after(self, tables, masks, b, player):
+        """Return the value of a region after player places on cell b.
+
+        A move that saturates b removes b and its neighbors from the region,
+        which may split it; the result is then the sum of the parts.
+        """
+        color = 0 if player == "White" else 1
+        bit = 1 << b
+        c = 0
+        for h in range(1, MAX_HEIGHT):
+            if masks[2 * h - 1 + color] & bit:
+                c = h
+                break
+        if c + 1 == tables.k[b]:
+            rest = masks[0] & ~bit & ~tables.neighbor_mask[b]
+            total = cgt.ZERO
+            for region in components(tables, rest):
+                total = cgt.add(total, self.value_of_region(tables, restrict(masks, region)))
+            return total
+        masks = list(masks)
+        if c:
+            masks[2 * c - 1 + color] ^= bit
+        masks[2 * c + 1 + color] |= bit
+        return self.value_of_region(tables, tuple(masks))
+
+    def region_values(self, board):
+        """Return [(masks, value)] for the regions of a BitBoard."""
+        tables = board.tables
+        return [(masks, self.value_of_region(tables, masks))
+                for masks in (region_masks(board, region) for region in find_regions(board))]
+
+    def value_of_board(self, board):
+        """Return the canonical form of a BitBoard as the sum of its regions."""
+        total = cgt.ZERO
+        for _, value in self.region_values(board):
+            total = cgt.add(total, value)
+        return total
+
+    def value(self, pieces):
+        """Return the canonical form of a grid of signed counts."""
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, 10000))
+        try:
+            return self.value_of_board(BitBoard.from_grid(pieces))
+        finally:
+            sys.setrecursionlimit(limit)
+
+    def winning_move(self, pieces, player):
+        """Return a winning (i,j) for player to move, or None if there is none."""
+        board = BitBoard.from_grid(pieces)
+        tables = board.tables
+        n = board.n
+        opponent = engine.other_player(player)
+        regions = self.region_values(board)
+        for index, (masks, _) in enumerate(regions):
+            others = cgt.ZERO
+            for other, (_, value) in enumerate(regions):
+                if other != index:
+                    others = cgt.add(others, value)
+            for b in iter_bits(self.legal_mask(masks, player)):
+                option = cgt.add(others, self.value_after(tables, masks, b, player))
+                # After the move the opponent moves first in the option
+                if cgt.winner(option, opponent) == player:
+                    return (b // n, b % n)
+        return None
+
+
+_default_values = RegionValues()
+
+
+def value(pieces):
+    """Return the canonical form of a grid using the shared module cache."""
+    return _default_values.value(pieces)
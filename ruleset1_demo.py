@@ -1,7 +1,11 @@
 import tkinter as tk
 from tkinter import messagebox, simpledialog
-import time
-import copy
+
+import animation
+import engine
+import gallery
+import tablebase
+import viewport
 
 class StackingGame:
     def __init__(self, root):
@@ -14,48 +18,32 @@ class StackingGame:
             root.destroy()
             return
             
-        self.cell_size = 100
-        self.preview_cell_size = 50
+        self.preview_cell_size = max(1, min(50, 250 // self.n))
         self.current_player = "White"
-        self.animating = False
-        self.possible_boards = []
-        self.move_history = []  # Store moves and board states for undo
+        self.animator = animation.Animator(root)
+        self.preview_player = "White"  # Whose successors the gallery shows
 
-        # Initialize grids
-        self.pieces = [[0] * self.n for _ in range(self.n)]  # 0=empty, >0=White, <0=Black
-        self.thresholds = [[0] * self.n for _ in range(self.n)]
-        for i in range(self.n):
-            for j in range(self.n):
-                k = 0
-                if i > 0: k += 1
-                if i < self.n-1: k += 1
-                if j > 0: k += 1
-                if j < self.n-1: k += 1
-                self.thresholds[i][j] = k
+        # Initialize grids; the engine board keeps per-move deltas for undo
+        self.board = engine.Board.empty(self.n, self.current_player)
+        self.pieces = self.board.pieces  # 0=empty, >0=White, <0=Black
+        self.thresholds = engine.make_thresholds(self.n)
+        self.tablebase = tablebase.load(self.n)  # None unless a tablebase was generated for n
 
         # Main GUI setup
         self.root.title("Stacking Game")
-        self.main_canvas = tk.Canvas(root, width=self.n*self.cell_size, height=self.n*self.cell_size)
-        self.main_canvas.pack()
+        # Only the visible tiles exist; see viewport.py
+        self.viewport = viewport.Viewport(root, self.n, self.create_tile, self.delete_tile,
+                                          self.update_board, self.animator.finish)
+        self.viewport.frame.pack()
+        self.main_canvas = self.viewport.canvas
+        self.tiles = self.viewport.tiles
         self.status_label = tk.Label(root, text=f"Current Player: {self.current_player}", font=("Arial", 12))
         self.status_label.pack()
 
-        # Preview frame
-        self.preview_frame = tk.Frame(root)
-        self.preview_frame.pack()
-        self.preview_canvases = []
-        self.preview_labels = []
-        # Create 2x5 grid for up to 9 boards
-        for row in range(2):
-            for col in range(5):
-                if row * 5 + col < 9:  # Max 9 moves
-                    canvas = tk.Canvas(self.preview_frame, width=self.n*self.preview_cell_size,
-                                      height=self.n*self.preview_cell_size, bg="white")
-                    canvas.grid(row=row, column=col, padx=5, pady=5)
-                    label = tk.Label(self.preview_frame, text="", font=("Arial", 8))
-                    label.grid(row=row+1, column=col)
-                    self.preview_canvases.append(canvas)
-                    self.preview_labels.append(label)
+        # Preview gallery; thumbnails are drawn as they scroll into view
+        side = self.n * self.preview_cell_size
+        self.gallery = gallery.Gallery(root, side, side, self.draw_preview, self.describe_preview)
+        self.gallery.frame.pack()
 
         # Buttons
         button_frame = tk.Frame(root)
@@ -65,310 +53,319 @@ class StackingGame:
         tk.Button(button_frame, text="Clear Boards", command=self.clear_preview).pack(side=tk.LEFT)
         tk.Button(button_frame, text="Undo Move", command=self.undo_move).pack(side=tk.LEFT)
 
-        # Draw main board
-        self.tiles = {}
-        for i in range(self.n):
-            for j in range(self.n):
-                x1, y1 = j * self.cell_size, i * self.cell_size
-                x2, y2 = x1 + self.cell_size, y1 + self.cell_size
-                rect = self.main_canvas.create_rectangle(x1, y1, x2, y2, fill="lightgray", outline="black")
-                text = self.main_canvas.create_text(x1 + self.cell_size/2, y1 + self.cell_size-10,
-                                                  text=f"k={self.thresholds[i][j]}", font=("Arial", 10))
-                self.tiles[(i, j)] = {"rect": rect, "text": text, "circles": []}
-                self.main_canvas.tag_bind(rect, "<Button-1>", lambda event, row=i, col=j: self.handle_click(row, col))
-
-        self.update_board()
+        # Draw the visible part of the main board
+        self.viewport.refresh()
 
     def get_board_size(self):
         """Prompt user for board size and validate input."""
         while True:
             try:
-                n = simpledialog.askinteger("Input", "Enter board size (n for n x n board, 2-10):",
-                                          parent=self.root, minvalue=2, maxvalue=10)
+                n = simpledialog.askinteger("Input", f"Enter board size (n for n x n board, 2-{viewport.MAX_SIZE}):",
+                                          parent=self.root, minvalue=2, maxvalue=viewport.MAX_SIZE)
                 if n is None:  # User cancelled
                     return None
                 return n
             except ValueError:
-                messagebox.showerror("Invalid Input", "Please enter a number between 2 and 10.")
+                messagebox.showerror("Invalid Input", f"Please enter a number between 2 and {viewport.MAX_SIZE}.")
                 continue
 
     def get_possible_moves(self, player):
         """Return list of (i,j) coordinates for valid moves."""
-        is_white = player == "White"
-        moves = []
-        for i in range(self.n):
-            for j in range(self.n):
-                current_pieces = self.pieces[i][j]
-                k = self.thresholds[i][j]
-                if (not self.is_blocked(i, j) and
-                    (current_pieces == 0 or
-                     (current_pieces > 0 and is_white and current_pieces < k) or
-                     (current_pieces < 0 and not is_white and -current_pieces < k))):
-                    moves.append((i, j))
-        return moves
-
-    def get_possible_boards(self, player):
-        """Return list of possible board states after player's moves."""
-        is_white = player == "White"
-        moves = self.get_possible_moves(player)
-        boards = []
-        for i, j in moves:
-            new_board = copy.deepcopy(self.pieces)
-            new_board[i][j] = (abs(new_board[i][j]) + 1) if is_white else -(abs(new_board[i][j]) + 1)
-            if abs(new_board[i][j]) == self.thresholds[i][j]:
-                for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                    ni, nj = i + di, j + dj
-                    if 0 <= ni < self.n and 0 <= nj < self.n:
-                        new_board[ni][nj] = 0
-            boards.append({"board": new_board, "move": (i, j)})
-        return boards
+        return self.board.get_possible_moves(player)
+
+    def iter_successors(self, player):
+        """Yield (move, board view) for player's moves, computed on demand."""
+        return engine.iter_successors(self.pieces, player)
 
     def show_possible_boards(self, player):
-        """Display all possible boards for the player."""
-        self.clear_preview()
-        self.possible_boards = self.get_possible_boards(player)
-        for idx, board_info in enumerate(self.possible_boards):
-            if idx >= len(self.preview_canvases):
-                break
-            canvas = self.preview_canvases[idx]
-            label = self.preview_labels[idx]
-            board = board_info["board"]
-            move = board_info["move"]
-            player_char = "W" if player == "White" else "B"
-            label.config(text=f"{player_char}: {move}")
-            # Draw board
-            for i in range(self.n):
-                for j in range(self.n):
-                    x1, y1 = j * self.preview_cell_size, i * self.preview_cell_size
-                    x2, y2 = x1 + self.preview_cell_size, y1 + self.preview_cell_size
-                    is_blocked = False
-                    for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                        ni, nj = i + di, j + dj
-                        if 0 <= ni < self.n and 0 <= nj < self.n:
-                            if abs(board[ni][nj]) == self.thresholds[ni][nj]:
-                                is_blocked = True
-                                break
-                    count = abs(board[i][j])
-                    color = "lightgray"
-                    if count == self.thresholds[i][j]:
-                        color = "blue" if board[i][j] > 0 else "red"
-                    elif is_blocked:
-                        color = "yellow"
-                    rect = canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="black")
-                    text = canvas.create_text(x1 + self.preview_cell_size/2, y1 + self.preview_cell_size-8,
-                                            text=f"k={self.thresholds[i][j]}", font=("Arial", 8))
-                    if count > 0:
-                        is_white = board[i][j] > 0
-                        for p in range(count):
-                            offset_x = 10 + (p % 2) * 15
-                            offset_y = 10 + (p // 2) * 15
-                            canvas.create_oval(
-                                x1 + offset_x, y1 + offset_y,
-                                x1 + offset_x + 10, y1 + offset_y + 10,
-                                fill="white" if is_white else "black",
-                                outline="black"
-                            )
+        """Show all of player's successor boards in the preview gallery."""
+        self.preview_player = player
+        self.gallery.show(self.iter_successors(player), total=len(self.board.legal[player]))
+
+    def describe_preview(self, item):
+        """Return the label of a successor's thumbnail: the move and, with a tablebase, its outcome."""
+        move, board = item
+        player = self.preview_player
+        text = f"{'W' if player == 'White' else 'B'}: {move}"
+        outcome = self.tablebase.probe(board, engine.other_player(player)) if self.tablebase else None
+        if outcome:
+            text += " wins" if outcome[0] == player else " loses"
+        return text
+
+    def draw_preview(self, canvas, item):
+        """Draw a successor board on an empty thumbnail canvas.
+
+        Empty cells share one background rectangle and the grid lines; only
+        stacks and blocked cells get items of their own. Small thumbnails
+        (large boards) show only the cell colors.
+        """
+        move, board = item
+        size = self.preview_cell_size
+        scale = size / 50
+        detailed = size >= 20
+        side = self.n * size
+        outline = "black" if size >= 4 else ""
+        canvas.create_rectangle(0, 0, side, side, fill="lightgray", outline=outline)
+        if outline:
+            for p in range(1, self.n):
+                canvas.create_line(0, p * size, side, p * size)
+                canvas.create_line(p * size, 0, p * size, side)
+        stacks = [(i, j) for i, row in enumerate(board) if any(row) for j, value in enumerate(row) if value]
+        neighbors = engine.make_neighbors(self.n)
+        blocked = {cell for i, j in stacks if abs(board[i][j]) == self.thresholds[i][j]
+                   for cell in neighbors[i][j]}
+        for i, j in sorted(blocked.union(stacks)):
+            count = abs(board[i][j])
+            if count == self.thresholds[i][j]:
+                color = "blue" if board[i][j] > 0 else "red"
+            elif (i, j) in blocked:
+                color = "yellow"
+            elif not detailed:
+                color = "white" if board[i][j] > 0 else "gray40"
+            else:
+                continue
+            x1, y1 = j * size, i * size
+            canvas.create_rectangle(x1, y1, x1 + size, y1 + size, fill=color, outline=outline)
+        if not detailed:
+            return
+        for i in range(self.n):
+            for j in range(self.n):
+                canvas.create_text(j * size + size/2, i * size + size - 8*scale,
+                                   text=f"k={self.thresholds[i][j]}", font=("Arial", 8))
+        for i, j in stacks:
+            x1, y1 = j * size, i * size
+            is_white = board[i][j] > 0
+            for p in range(abs(board[i][j])):
+                offset_x = (10 + (p % 2) * 15) * scale
+                offset_y = (10 + (p // 2) * 15) * scale
+                canvas.create_oval(
+                    x1 + offset_x, y1 + offset_y,
+                    x1 + offset_x + 10*scale, y1 + offset_y + 10*scale,
+                    fill="white" if is_white else "black",
+                    outline="black"
+                )
 
     def clear_preview(self):
-        """Clear all preview canvases."""
-        self.possible_boards = []
-        for canvas in self.preview_canvases:
-            canvas.delete("all")
-        for label in self.preview_labels:
-            label.config(text="")
+        """Empty the preview gallery."""
+        self.gallery.clear()
 
     def set_position(self, position):
         """Set the game position."""
-        if len(position) != self.n or any(len(row) != self.n for row in position):
+        if len(position) != self.n:
             raise ValueError("Position must be an n x n grid")
-        for i in range(self.n):
-            for j in range(self.n):
-                count = position[i][j]
-                k = self.thresholds[i][j]
-                if abs(count) > k:
-                    raise ValueError(f"Invalid piece count at ({i},{j}): |{count}| > k={k}")
-                self.pieces[i][j] = count
+        position = engine.from_grid(position, self.current_player)
+        self.board = engine.Board(position.pieces, self.current_player)
+        self.pieces = self.board.pieces
         self.update_board()
         self.clear_preview()
 
     def is_blocked(self, i, j):
         """Check if position (i,j) is blocked."""
-        for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            ni, nj = i + di, j + dj
-            if 0 <= ni < self.n and 0 <= nj < self.n:
-                if abs(self.pieces[ni][nj]) == self.thresholds[ni][nj]:
-                    return True
-        return False
-
-    def apply_attacker_effects(self, i, j):
-        """Apply attacker effects for position (i,j)."""
-        for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            ni, nj = i + di, j + dj
-            if 0 <= ni < self.n and 0 <= nj < self.n:
-                if self.pieces[ni][nj] != 0:
-                    self.pieces[ni][nj] = 0
-                    self.animate_removal(ni, nj)
-
-    def animate_removal(self, i, j):
-        """Animate removal of pieces at (i,j)."""
-        if self.animating:
-            return
-        self.animating = True
+        return self.board.is_blocked(i, j)
+
+    def animate_removals(self, cells):
+        """Queue the flashes of the tiles an attacker cleared, all at once."""
+        def done():
+            for i, j in cells:
+                self.redraw_tile(i, j)
+        # Tiles out of view have nothing to flash
+        visible = [(i, j) for i, j in cells if (i, j) in self.tiles]
+        if visible:
+            self.animator.play([self.removal_frames(i, j) for i, j in visible], done)
+        else:
+            done()
+
+    def removal_frames(self, i, j):
+        """Flash the tile at (i,j) yellow twice, 200 ms per color."""
         rect = self.tiles[(i, j)]["rect"]
-        circles = self.tiles[(i, j)]["circles"]
-        original_color = "lightgray"
-        for circle in circles:
-            self.main_canvas.delete(circle)
-        self.tiles[(i, j)]["circles"] = []
-        self.main_canvas.itemconfig(rect, fill="yellow")
-        self.root.update()
-        self.root.after(200, lambda: self.main_canvas.itemconfig(rect, fill=original_color))
-        self.root.after(400, lambda: self.main_canvas.itemconfig(rect, fill="yellow"))
-        self.root.after(600, lambda: self.main_canvas.itemconfig(rect, fill=original_color))
-        self.root.after(800, lambda: setattr(self, "animating", False))
-        self.update_board()
+        self.tiles[(i, j)]["state"] = None
+        for fill in ("yellow", "lightgray", "yellow", "lightgray"):
+            self.main_canvas.itemconfig(rect, fill=fill)
+            for _ in range(200 // self.animator.frame_ms):
+                yield
 
     def animate_placement(self, i, j, player):
-        """Animate placement of a piece at (i,j)."""
-        if self.animating:
-            return
-        self.animating = True
-        x1, y1 = j * self.cell_size, i * self.cell_size
+        """Queue the growth of the pieces at (i,j); the tile is redrawn when it ends.
+
+        Tiles out of view or too small for pieces are just redrawn.
+        """
+        if (i, j) in self.tiles and self.viewport.detailed:
+            self.animator.play([self.placement_frames(i, j, player)], lambda: self.redraw_tile(i, j))
+        else:
+            self.redraw_tile(i, j)
+
+    def placement_frames(self, i, j, player):
+        """Grow the pieces of the stack at (i,j) from half size over 10 frames."""
+        tile = self.tiles[(i, j)]
+        size = self.viewport.cell_size
+        scale = size / viewport.CELL_SIZE
+        x1, y1 = j * size, i * size
         count = abs(self.pieces[i][j])
-        k = self.thresholds[i][j]
         is_white = player == "White"
-        for circle in self.tiles[(i, j)]["circles"]:
+        for circle in tile["circles"]:
             self.main_canvas.delete(circle)
-        self.tiles[(i, j)]["circles"] = []
+        tile["circles"] = []
+        tile["state"] = None
+        centers = []
         for p in range(count):
-            offset_x = 20 + (p % 2) * 30
-            offset_y = 20 + (p // 2) * 30
+            cx = x1 + (30 + (p % 2) * 30) * scale
+            cy = y1 + (30 + (p // 2) * 30) * scale
+            centers.append((cx, cy))
             circle = self.main_canvas.create_oval(
-                x1 + offset_x, y1 + offset_y,
-                x1 + offset_x + 20, y1 + offset_y + 20,
+                cx - 5*scale, cy - 5*scale, cx + 5*scale, cy + 5*scale,
                 fill="white" if is_white else "black",
-                outline="black",
-                state="hidden"
+                outline="black"
             )
-            self.tiles[(i, j)]["circles"].append(circle)
+            tile["circles"].append(circle)
         for step in range(10):
-            for circle in self.tiles[(i, j)]["circles"]:
-                self.main_canvas.itemconfig(circle, state="normal")
-                scale = 0.5 + step * 0.05
+            radius = 10 * scale * (0.5 + step * 0.05)
+            for circle, (cx, cy) in zip(tile["circles"], centers):
                 self.main_canvas.coords(circle,
-                                       x1 + offset_x - 10 * scale, y1 + offset_y - 10 * scale,
-                                       x1 + offset_x + 10 * scale, y1 + offset_y + 10 * scale)
-            self.root.update()
-            time.sleep(0.05)
-        for p, circle in enumerate(self.tiles[(i, j)]["circles"]):
-            offset_x = 20 + (p % 2) * 30
-            offset_y = 20 + (p // 2) * 30
-            self.main_canvas.coords(circle,
-                                   x1 + offset_x, y1 + offset_y,
-                                   x1 + offset_x + 20, y1 + offset_y + 20)
-        self.animating = False
-        self.update_board()
+                                       cx - radius, cy - radius,
+                                       cx + radius, cy + radius)
+            yield
 
     def handle_click(self, i, j):
         """Handle click events on the board."""
-        if self.animating:
+        if self.animator.busy:
             return
-        current_pieces = self.pieces[i][j]
         k = self.thresholds[i][j]
         is_white = self.current_player == "White"
-        if (self.is_blocked(i, j) or
-            (current_pieces < 0 and is_white) or
-            (current_pieces > 0 and not is_white) or
-            abs(current_pieces) >= k):
+        if not self.board.is_legal(i, j, self.current_player):
             messagebox.showinfo("Invalid Move", "Cannot place piece here!")
             return
 
-        # Save state before move
-        self.move_history.append({
-            "pieces": copy.deepcopy(self.pieces),
-            "player": self.current_player
-        })
-
+        # The board records only the changed cells, so the move can be undone
         self.clear_preview()
-        self.pieces[i][j] = (abs(current_pieces) + 1) if is_white else -(abs(current_pieces) + 1)
+        cleared = self.board.make_move(i, j)
         self.animate_placement(i, j, self.current_player)
 
         if abs(self.pieces[i][j]) == k:
-            self.apply_attacker_effects(i, j)
-            self.main_canvas.itemconfig(self.tiles[(i, j)]["rect"],
-                                      fill="blue" if is_white else "red")
+            self.animate_removals(cleared)
+            if (i, j) in self.tiles:
+                self.main_canvas.itemconfig(self.tiles[(i, j)]["rect"],
+                                          fill="blue" if is_white else "red")
 
-        self.update_board()
-        self.current_player = "Black" if self.current_player == "White" else "White"
+        self.update_board(self.move_cells(i, j))
+        self.current_player = self.board.player
         self.status_label.config(text=f"Current Player: {self.current_player}")
 
         if not self.has_legal_moves():
-            winner = "Black" if self.current_player == "White" else "White"
-            messagebox.showinfo("Game Over", f"{winner} wins!")
-            self.root.quit()
+            self.animator.when_idle(self.end_game)
+
+    def end_game(self):
+        """Announce the winner once the last move's animations have finished."""
+        winner = "Black" if self.current_player == "White" else "White"
+        messagebox.showinfo("Game Over", f"{winner} wins!")
+        self.root.quit()
 
     def undo_move(self):
         """Revert the last move played."""
-        if not self.move_history:
+        if not self.board.history:
             messagebox.showinfo("No Moves", "No moves to undo!")
             return
-        if self.animating:
+        if self.animator.busy:
             messagebox.showinfo("Animating", "Please wait for animation to finish!")
             return
 
         # Restore previous state
-        last_state = self.move_history.pop()
-        self.pieces = copy.deepcopy(last_state["pieces"])
-        self.current_player = last_state["player"]
+        self.board.unmake_move()
+        self.current_player = self.board.player
         self.status_label.config(text=f"Current Player: {self.current_player}")
         self.clear_preview()
         self.update_board()
 
     def has_legal_moves(self):
         """Check if the current player has legal moves."""
-        is_white = self.current_player == "White"
-        for i in range(self.n):
-            for j in range(self.n):
-                current_pieces = self.pieces[i][j]
-                k = self.thresholds[i][j]
-                if (not self.is_blocked(i, j) and
-                    (current_pieces == 0 or
-                     (current_pieces > 0 and is_white and current_pieces < k) or
-                     (current_pieces < 0 and not is_white and -current_pieces < k))):
-                    return True
-        return False
-
-    def update_board(self):
-        """Update the board display."""
-        for i in range(self.n):
-            for j in range(self.n):
-                count = abs(self.pieces[i][j])
-                k = self.thresholds[i][j]
-                rect = self.tiles[(i, j)]["rect"]
-                text = self.tiles[(i, j)]["text"]
-                self.main_canvas.itemconfig(text, text=f"k={k}")
-                if count == k:
-                    self.main_canvas.itemconfig(rect, fill="blue" if self.pieces[i][j] > 0 else "red")
-                elif self.is_blocked(i, j):
-                    self.main_canvas.itemconfig(rect, fill="yellow")
-                else:
-                    self.main_canvas.itemconfig(rect, fill="lightgray")
-                x1, y1 = j * self.cell_size, i * self.cell_size
-                for circle in self.tiles[(i, j)]["circles"]:
-                    self.main_canvas.delete(circle)
-                self.tiles[(i, j)]["circles"] = []
-                if count > 0:
-                    is_white = self.pieces[i][j] > 0
-                    for p in range(count):
-                        offset_x = 20 + (p % 2) * 30
-                        offset_y = 20 + (p // 2) * 30
-                        circle = self.main_canvas.create_oval(
-                            x1 + offset_x, y1 + offset_y,
-                            x1 + offset_x + 20, y1 + offset_y + 20,
-                            fill="white" if is_white else "black",
-                            outline="black"
-                        )
-                        self.tiles[(i, j)]["circles"].append(circle)
+        return self.board.has_legal_moves(self.current_player)
+
+    def tile_state(self, i, j):
+        """Return what the tile at (i,j) shows: its signed count and whether it is blocked."""
+        return (self.pieces[i][j], self.board.is_blocked(i, j))
+
+    def move_cells(self, i, j):
+        """Return the cells whose tiles a move at (i,j) can change: (i,j) and its neighbors."""
+        return [(i, j), *self.board.neighbors[i][j]]
+
+    def redraw_tile(self, i, j):
+        """Redraw the tile at (i,j) even if its state is unchanged, e.g. after an animation."""
+        if (i, j) in self.tiles:
+            self.tiles[(i, j)]["state"] = None
+            self.update_board([(i, j)])
+
+    def update_board(self, cells=None):
+        """Redraw the tiles whose state changed since they were last drawn.
+
+        Each tile caches the state it was drawn for, so only changed tiles
+        touch the canvas. cells limits the check to some cells, such as
+        move_cells() after a move; by default every visible cell is checked.
+        Cells out of view have no tile and are skipped.
+        """
+        tiles = self.tiles
+        for i, j in cells if cells is not None else list(tiles):
+            tile = tiles.get((i, j))
+            if tile is not None:
+                state = self.tile_state(i, j)
+                if tile["state"] != state:
+                    self.draw_tile(i, j, state)
+
+    def create_tile(self, i, j):
+        """Create the rectangle and k label of the tile at (i,j) at the current zoom."""
+        size = self.viewport.cell_size
+        scale = size / viewport.CELL_SIZE
+        x1, y1 = j * size, i * size
+        rect = self.main_canvas.create_rectangle(x1, y1, x1 + size, y1 + size, fill="lightgray", outline="black")
+        text = None
+        if self.viewport.detailed:
+            text = self.main_canvas.create_text(x1 + size/2, y1 + size - 10*scale,
+                                              text=f"k={self.thresholds[i][j]}", font=("Arial", round(10 * scale)))
+        self.main_canvas.tag_bind(rect, "<Button-1>", lambda event: self.handle_click(i, j))
+        return {"rect": rect, "text": text, "circles": [], "state": None}
+
+    def delete_tile(self, tile):
+        """Delete the canvas items of a tile that left the view."""
+        self.main_canvas.delete(tile["rect"], *tile["circles"])
+        if tile["text"] is not None:
+            self.main_canvas.delete(tile["text"])
+
+    def draw_tile(self, i, j, state):
+        """Draw the tile at (i,j) for state, replacing its pieces.
+
+        Tiles too small for pieces show a stack as a white or gray cell.
+        """
+        value, blocked = state
+        count = abs(value)
+        k = self.thresholds[i][j]
+        tile = self.tiles[(i, j)]
+        rect = tile["rect"]
+        detailed = self.viewport.detailed
+        if count == k:
+            self.main_canvas.itemconfig(rect, fill="blue" if value > 0 else "red")
+        elif blocked:
+            self.main_canvas.itemconfig(rect, fill="yellow")
+        elif count > 0 and not detailed:
+            self.main_canvas.itemconfig(rect, fill="white" if value > 0 else "gray40")
+        else:
+            self.main_canvas.itemconfig(rect, fill="lightgray")
+        size = self.viewport.cell_size
+        scale = size / viewport.CELL_SIZE
+        x1, y1 = j * size, i * size
+        for circle in tile["circles"]:
+            self.main_canvas.delete(circle)
+        tile["circles"] = []
+        if count > 0 and detailed:
+            is_white = value > 0
+            for p in range(count):
+                offset_x = (20 + (p % 2) * 30) * scale
+                offset_y = (20 + (p // 2) * 30) * scale
+                circle = self.main_canvas.create_oval(
+                    x1 + offset_x, y1 + offset_y,
+                    x1 + offset_x + 20*scale, y1 + offset_y + 20*scale,
+                    fill="white" if is_white else "black",
+                    outline="black"
+                )
+                tile["circles"].append(circle)
+        tile["state"] = state
 
 def main():
     root = tk.Tk()
@@ -1,7 +1,11 @@
 import tkinter as tk
 from tkinter import messagebox, simpledialog
-import time
-import copy
+
+import animation
+import engine
+import engine2
+import gallery
+import viewport
 
 class StackingGame:
     def __init__(self, root):
@@ -14,29 +18,22 @@ class StackingGame:
             root.destroy()
             return
             
-        self.cell_size = 100
-        self.preview_cell_size = 50
+        self.preview_cell_size = max(1, min(50, 250 // self.n))
         self.current_player = "White"
-        self.animating = False
-        self.possible_boards = []
+        self.animator = animation.Animator(root)
 
-        # Initialize grids
-        self.pieces = [[0] * self.n for _ in range(self.n)]  # 0=empty, >0=White, <0=Black
-        self.green_pieces = [[0] * self.n for _ in range(self.n)]  # Green count
-        self.thresholds = [[0] * self.n for _ in range(self.n)]
-        for i in range(self.n):
-            for j in range(self.n):
-                k = 0
-                if i > 0: k += 1
-                if i < self.n-1: k += 1
-                if j > 0: k += 1
-                if j < self.n-1: k += 1
-                self.thresholds[i][j] = k
+        # The engine board keeps packed cells and attacker counts up to date per move
+        self.board = engine2.GreenBoard.empty(self.n, self.current_player)
+        self.thresholds = engine.make_thresholds(self.n)
 
         # Main GUI setup
         self.root.title("Stacking Game")
-        self.main_canvas = tk.Canvas(root, width=self.n*self.cell_size, height=self.n*self.cell_size)
-        self.main_canvas.pack()
+        # Only the visible tiles exist; see viewport.py
+        self.viewport = viewport.Viewport(root, self.n, self.create_tile, self.delete_tile,
+                                          self.update_board, self.animator.finish)
+        self.viewport.frame.pack()
+        self.main_canvas = self.viewport.canvas
+        self.tiles = self.viewport.tiles
         self.status_label = tk.Label(root, text=f"Current Player: {self.current_player}", font=("Arial", 12))
         self.status_label.pack()
 
@@ -52,21 +49,10 @@ class StackingGame:
         tk.Radiobutton(choice_frame, text="Green", variable=self.piece_var, value="Green",
                        command=self.update_piece_choice).pack(side=tk.LEFT)
 
-        # Preview frame
-        self.preview_frame = tk.Frame(root)
-        self.preview_frame.pack()
-        self.preview_canvases = []
-        self.preview_labels = []
-        for row in range(2):
-            for col in range(5):
-                if row * 5 + col < 9:
-                    canvas = tk.Canvas(self.preview_frame, width=self.n*self.preview_cell_size,
-                                      height=self.n*self.preview_cell_size, bg="white")
-                    canvas.grid(row=row, column=col, padx=5, pady=5)
-                    label = tk.Label(self.preview_frame, text="", font=("Arial", 8))
-                    label.grid(row=row+1, column=col)
-                    self.preview_canvases.append(canvas)
-                    self.preview_labels.append(label)
+        # Preview gallery; thumbnails are drawn as they scroll into view
+        side = self.n * self.preview_cell_size
+        self.gallery = gallery.Gallery(root, side, side, self.draw_preview, self.describe_preview)
+        self.gallery.frame.pack()
 
         # Buttons
         button_frame = tk.Frame(root)
@@ -75,32 +61,21 @@ class StackingGame:
         tk.Button(button_frame, text="Show Black Boards", command=lambda: self.show_possible_boards("Black")).pack(side=tk.LEFT)
         tk.Button(button_frame, text="Clear Boards", command=self.clear_preview).pack(side=tk.LEFT)
 
-        # Draw main board
-        self.tiles = {}
-        for i in range(self.n):
-            for j in range(self.n):
-                x1, y1 = j * self.cell_size, i * self.cell_size
-                x2, y2 = x1 + self.cell_size, y1 + self.cell_size
-                rect = self.main_canvas.create_rectangle(x1, y1, x2, y2, fill="lightgray", outline="black")
-                text = self.main_canvas.create_text(x1 + self.cell_size/2, y1 + self.cell_size-10,
-                                                  text=f"k={self.thresholds[i][j]}", font=("Arial", 10))
-                self.tiles[(i, j)] = {"rect": rect, "text": text, "circles": [], "green_circles": []}
-                self.main_canvas.tag_bind(rect, "<Button-1>", lambda event, row=i, col=j: self.handle_click(row, col))
-
-        self.update_board()
+        # Draw the visible part of the main board
+        self.viewport.refresh()
         self.update_piece_choice()
 
     def get_board_size(self):
         """Prompt user for board size and validate input."""
         while True:
             try:
-                n = simpledialog.askinteger("Input", "Enter board size (n for n x n board, 2-10):",
-                                          parent=self.root, minvalue=2, maxvalue=10)
+                n = simpledialog.askinteger("Input", f"Enter board size (n for n x n board, 2-{viewport.MAX_SIZE}):",
+                                          parent=self.root, minvalue=2, maxvalue=viewport.MAX_SIZE)
                 if n is None:  # User cancelled
                     return None
                 return n
             except ValueError:
-                messagebox.showerror("Invalid Input", "Please enter a number between 2 and 10.")
+                messagebox.showerror("Invalid Input", f"Please enter a number between 2 and {viewport.MAX_SIZE}.")
                 continue
 
     def update_piece_choice(self):
@@ -112,336 +87,310 @@ class StackingGame:
             self.root.winfo_children()[2].winfo_children()[1].config(state="disabled")
 
     def get_possible_moves(self, piece_type):
-        is_white = self.current_player == "White"
-        moves = []
-        for i in range(self.n):
-            for j in range(self.n):
-                count = abs(self.pieces[i][j])
-                green = self.green_pieces[i][j]
-                k = self.thresholds[i][j]
-                total = count + green
-                if piece_type == "Green":
-                    if (not self.is_blocked(i, j) and total < k and
-                        self.pieces[i][j] != 0):
-                        moves.append((i, j))
-                elif piece_type == self.current_player:
-                    if (not self.is_blocked(i, j) and total < k and
-                        (self.pieces[i][j] == 0 and green == 0 or
-                         (self.pieces[i][j] > 0 and is_white) or
-                         (self.pieces[i][j] < 0 and not is_white))):
-                        moves.append((i, j))
-        return moves
-
-    def get_possible_boards(self, player):
-        boards = []
-        moves = self.get_possible_moves(player)
-        for i, j in moves:
-            new_pieces = copy.deepcopy(self.pieces)
-            new_green = copy.deepcopy(self.green_pieces)
-            new_pieces[i][j] = (abs(new_pieces[i][j]) + 1) if player == "White" else -(abs(new_pieces[i][j]) + 1)
-            if abs(new_pieces[i][j]) == self.thresholds[i][j]:
-                for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                    ni, nj = i + di, j + dj
-                    if 0 <= ni < self.n and 0 <= nj < self.n:
-                        new_pieces[ni][nj] = 0
-            boards.append({"pieces": new_pieces, "green_pieces": new_green, "move": (i, j), "piece_type": player})
-        green_moves = self.get_possible_moves("Green")
-        for i, j in green_moves:
-            new_pieces = copy.deepcopy(self.pieces)
-            new_green = copy.deepcopy(self.green_pieces)
-            new_green[i][j] += 1
-            boards.append({"pieces": new_pieces, "green_pieces": new_green, "move": (i, j), "piece_type": "Green"})
-        return boards
+        return [divmod(b, self.n) for b, move_type in self.board.legal_moves(self.current_player)
+                if move_type == piece_type]
+
+    def iter_successors(self, player):
+        # The successors are views of a snapshot, so later moves cannot change them
+        pieces, green_pieces = self.board.to_grids()
+        return engine2.iter_successors(pieces, green_pieces, player)
+
+    def cell(self, i, j):
+        """Return (signed count, green count) of the stack at (i,j)."""
+        return engine2.unpack_cell(self.board.cells[i * self.n + j])
 
     def show_possible_boards(self, player):
-        self.clear_preview()
-        self.possible_boards = self.get_possible_boards(player)
-        for idx, board_info in enumerate(self.possible_boards):
-            if idx >= len(self.preview_canvases):
-                break
-            canvas = self.preview_canvases[idx]
-            label = self.preview_labels[idx]
-            pieces = board_info["pieces"]
-            green_pieces = board_info["green_pieces"]
-            move = board_info["move"]
-            piece_type = board_info["piece_type"]
-            player_char = "W" if piece_type == "White" else "B" if piece_type == "Black" else "G"
-            label.config(text=f"{player_char}: {move}")
-            for i in range(self.n):
-                for j in range(self.n):
-                    x1, y1 = j * self.preview_cell_size, i * self.preview_cell_size
-                    x2, y2 = x1 + self.preview_cell_size, y1 + self.preview_cell_size
-                    count = abs(pieces[i][j])
-                    green = green_pieces[i][j]
-                    k = self.thresholds[i][j]
-                    is_blocked = False
-                    for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                        ni, nj = i + di, j + dj
-                        if 0 <= ni < self.n and 0 <= nj < self.n:
-                            if abs(pieces[ni][nj]) == self.thresholds[ni][nj]:
-                                is_blocked = True
-                                break
-                    color = "lightgray"
-                    if count == k:
-                        color = "blue" if pieces[i][j] > 0 else "red"
-                    elif is_blocked:
-                        color = "yellow"
-                    elif count > 0 or green > 0:
-                        color = "#fff3b0" if pieces[i][j] > 0 else "#606c38"
-                    canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="black")
-                    canvas.create_text(x1 + self.preview_cell_size/2, y1 + self.preview_cell_size-8,
-                                      text=f"k={k}", font=("Arial", 8))
-                    # Assign pieces to 2x2 grid
-                    grid_positions = [(12, 12), (28, 12), (12, 28), (28, 28)]
-                    grid_idx = 0
-                    # White/Black pieces
-                    if count > 0:
-                        is_white = pieces[i][j] > 0
-                        for _ in range(count):
-                            if grid_idx < k:
-                                x, y = grid_positions[grid_idx]
-                                canvas.create_oval(
-                                    x1 + x - 4, y1 + y - 4,
-                                    x1 + x + 4, y1 + y + 4,
-                                    fill="white" if is_white else "black",
-                                    outline="black"
-                                )
-                                grid_idx += 1
-                    # Green pieces
-                    for _ in range(green):
-                        if grid_idx < k:
-                            x, y = grid_positions[grid_idx]
-                            canvas.create_oval(
-                                x1 + x - 4, y1 + y - 4,
-                                x1 + x + 4, y1 + y + 4,
-                                fill="#2ecc71",
-                                outline="black"
-                            )
-                            grid_idx += 1
+        self.gallery.show(self.iter_successors(player))
+
+    def describe_preview(self, item):
+        (mi, mj, piece_type), view = item
+        player_char = "W" if piece_type == "White" else "B" if piece_type == "Black" else "G"
+        return f"{player_char}: {(mi, mj)}"
+
+    def draw_preview(self, canvas, item):
+        """Draw a successor board on an empty thumbnail canvas.
+
+        Empty cells share one background rectangle and the grid lines; only
+        stacks and blocked cells get items of their own. Small thumbnails
+        (large boards) show only the cell colors.
+        """
+        move, view = item
+        pieces = view.pieces
+        green_pieces = view.green_pieces
+        size = self.preview_cell_size
+        scale = size / 50
+        detailed = size >= 20
+        side = self.n * size
+        outline = "black" if size >= 4 else ""
+        canvas.create_rectangle(0, 0, side, side, fill="lightgray", outline=outline)
+        if outline:
+            for p in range(1, self.n):
+                canvas.create_line(0, p * size, side, p * size)
+                canvas.create_line(p * size, 0, p * size, side)
+        stacks = [(i, j) for i, (row, green_row) in enumerate(zip(pieces, green_pieces)) if any(row) or any(green_row)
+                  for j in range(self.n) if row[j] or green_row[j]]
+        neighbors = engine.make_neighbors(self.n)
+        blocked = {cell for i, j in stacks if abs(pieces[i][j]) == self.thresholds[i][j]
+                   for cell in neighbors[i][j]}
+        for i, j in sorted(blocked.union(stacks)):
+            count = abs(pieces[i][j])
+            if count == self.thresholds[i][j]:
+                color = "blue" if pieces[i][j] > 0 else "red"
+            elif (i, j) in blocked:
+                color = "yellow"
+            else:
+                color = "#fff3b0" if pieces[i][j] > 0 else "#606c38"
+            x1, y1 = j * size, i * size
+            canvas.create_rectangle(x1, y1, x1 + size, y1 + size, fill=color, outline=outline)
+        if not detailed:
+            return
+        for i in range(self.n):
+            for j in range(self.n):
+                canvas.create_text(j * size + size/2, i * size + size - 8*scale,
+                                   text=f"k={self.thresholds[i][j]}", font=("Arial", 8))
+        # Pieces on a 2x2 grid, colored ones first
+        grid_positions = [(12*scale, 12*scale), (28*scale, 12*scale), (12*scale, 28*scale), (28*scale, 28*scale)]
+        for i, j in stacks:
+            x1, y1 = j * size, i * size
+            count = abs(pieces[i][j])
+            fills = ["white" if pieces[i][j] > 0 else "black"] * count + ["#2ecc71"] * green_pieces[i][j]
+            for (x, y), fill in zip(grid_positions[:self.thresholds[i][j]], fills):
+                canvas.create_oval(
+                    x1 + x - 4*scale, y1 + y - 4*scale,
+                    x1 + x + 4*scale, y1 + y + 4*scale,
+                    fill=fill,
+                    outline="black"
+                )
 
     def clear_preview(self):
-        self.possible_boards = []
-        for canvas in self.preview_canvases:
-            canvas.delete("all")
-        for label in self.preview_labels:
-            label.config(text="")
+        self.gallery.clear()
 
     def set_position(self, position, green_position):
-        if len(position) != self.n or any(len(row) != self.n for row in position):
+        if len(position) != self.n:
             raise ValueError("Position must be an n x n grid")
-        if len(green_position) != self.n or any(len(row) != self.n for row in green_position):
-            raise ValueError("Green position must be an n x n grid")
-        for i in range(self.n):
-            for j in range(self.n):
-                count = position[i][j]
-                green = green_position[i][j]
-                k = self.thresholds[i][j]
-                if abs(count) + green > k or green < 0:
-                    raise ValueError(f"Invalid counts at ({i},{j}): |{count}| + {green} > k={k}")
-                if green > 0 and count == 0:
-                    raise ValueError(f"Green pieces require White/Black at ({i},{j})")
-                self.pieces[i][j] = count
-                self.green_pieces[i][j] = green
+        position = engine2.from_grids(position, green_position, self.current_player)
+        self.board = engine2.GreenBoard(position.pieces, position.green_pieces, self.current_player)
         self.update_board()
         self.clear_preview()
 
     def is_blocked(self, i, j):
-        for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            ni, nj = i + di, j + dj
-            if 0 <= ni < self.n and 0 <= nj < self.n:
-                if abs(self.pieces[ni][nj]) == self.thresholds[ni][nj]:
-                    return True
-        return False
-
-    def apply_attacker_effects(self, i, j):
-        for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            ni, nj = i + di, j + dj
-            if 0 <= ni < self.n and 0 <= nj < self.n:
-                if self.pieces[ni][nj] != 0:
-                    self.pieces[ni][nj] = 0
-                    self.green_pieces[ni][nj] = 0
-                    self.animate_removal(ni, nj)
-
-    def animate_removal(self, i, j):
-        if self.animating:
-            return
-        self.animating = True
+        return self.board.attackers[i * self.n + j] > 0
+
+    def animate_removals(self, cells):
+        """Queue the flashes of the tiles an attacker cleared, all at once."""
+        def done():
+            for i, j in cells:
+                self.redraw_tile(i, j)
+        # Tiles out of view have nothing to flash
+        visible = [(i, j) for i, j in cells if (i, j) in self.tiles]
+        if visible:
+            self.animator.play([self.removal_frames(i, j) for i, j in visible], done)
+        else:
+            done()
+
+    def removal_frames(self, i, j):
+        """Flash the tile at (i,j) yellow twice, 200 ms per color."""
         rect = self.tiles[(i, j)]["rect"]
-        circles = self.tiles[(i, j)]["circles"] + self.tiles[(i, j)]["green_circles"]
-        original_color = "lightgray"
-        for circle in circles:
-            self.main_canvas.delete(circle)
-        self.tiles[(i, j)]["circles"] = []
-        self.tiles[(i, j)]["green_circles"] = []
-        self.main_canvas.itemconfig(rect, fill="yellow")
-        self.root.update()
-        self.root.after(200, lambda: self.main_canvas.itemconfig(rect, fill=original_color))
-        self.root.after(400, lambda: self.main_canvas.itemconfig(rect, fill="yellow"))
-        self.root.after(600, lambda: self.main_canvas.itemconfig(rect, fill=original_color))
-        self.root.after(800, lambda: setattr(self, "animating", False))
-        self.update_board()
+        self.tiles[(i, j)]["state"] = None
+        for fill in ("yellow", "lightgray", "yellow", "lightgray"):
+            self.main_canvas.itemconfig(rect, fill=fill)
+            for _ in range(200 // self.animator.frame_ms):
+                yield
 
     def animate_placement(self, i, j, piece_type):
-        if self.animating:
-            return
-        self.animating = True
-        x1, y1 = j * self.cell_size, i * self.cell_size
-        count = abs(self.pieces[i][j])
-        green_count = self.green_pieces[i][j]
+        """Queue the growth of the pieces at (i,j); the tile is redrawn when it ends.
+
+        Tiles out of view or too small for pieces are just redrawn.
+        """
+        if (i, j) in self.tiles and self.viewport.detailed:
+            self.animator.play([self.placement_frames(i, j, piece_type)], lambda: self.redraw_tile(i, j))
+        else:
+            self.redraw_tile(i, j)
+
+    def placement_frames(self, i, j, piece_type):
+        """Grow the colored and green pieces at (i,j) from half size over 10 frames."""
+        tile = self.tiles[(i, j)]
+        size = self.viewport.cell_size
+        scale = size / viewport.CELL_SIZE
+        x1, y1 = j * size, i * size
+        value, green_count = self.cell(i, j)
+        count = abs(value)
         k = self.thresholds[i][j]
-        is_white = self.pieces[i][j] > 0 if count > 0 else self.current_player == "White"
-        for circle in self.tiles[(i, j)]["circles"] + self.tiles[(i, j)]["green_circles"]:
+        is_white = value > 0 if count > 0 else self.current_player == "White"
+        for circle in tile["circles"] + tile["green_circles"]:
             self.main_canvas.delete(circle)
-        self.tiles[(i, j)]["circles"] = []
-        self.tiles[(i, j)]["green_circles"] = []
-        # 2x2 grid positions
-        grid_positions = [(25, 25), (55, 25), (25, 55), (55, 55)]
-        grid_idx = 0
-        # White/Black circles
-        for _ in range(count):
-            if grid_idx < k:
-                x, y = grid_positions[grid_idx]
-                circle = self.main_canvas.create_oval(
-                    x1 + x - 7, y1 + y - 7,
-                    x1 + x + 7, y1 + y + 7,
-                    fill="white" if is_white else "black",
-                    outline="black",
-                    state="hidden"
-                )
-                self.tiles[(i, j)]["circles"].append(circle)
-                grid_idx += 1
-        # Green circles
-        for _ in range(green_count):
-            if grid_idx < k:
-                x, y = grid_positions[grid_idx]
-                circle = self.main_canvas.create_oval(
-                    x1 + x - 7, y1 + y - 7,
-                    x1 + x + 7, y1 + y + 7,
-                    fill="#2ecc71",
-                    outline="black",
-                    state="hidden"
-                )
-                self.tiles[(i, j)]["green_circles"].append(circle)
-                grid_idx += 1
-        # Animate
+        tile["circles"] = []
+        tile["green_circles"] = []
+        tile["state"] = None
+        # 2x2 grid positions, colored pieces first
+        grid_positions = [(25*scale, 25*scale), (55*scale, 25*scale), (25*scale, 55*scale), (55*scale, 55*scale)]
+        fills = ["white" if is_white else "black"] * count + ["#2ecc71"] * green_count
+        centers = []
+        for (x, y), fill in zip(grid_positions[:k], fills):
+            centers.append((x1 + x, y1 + y))
+            circle = self.main_canvas.create_oval(
+                x1 + x - 3*scale, y1 + y - 3*scale,
+                x1 + x + 3*scale, y1 + y + 3*scale,
+                fill=fill,
+                outline="black"
+            )
+            tile["circles" if fill != "#2ecc71" else "green_circles"].append(circle)
         for step in range(10):
-            for circle in self.tiles[(i, j)]["circles"] + self.tiles[(i, j)]["green_circles"]:
-                self.main_canvas.itemconfig(circle, state="normal")
-                scale = 0.5 + step * 0.05
-                x, y, x2, y2 = self.main_canvas.coords(circle)
-                cx, cy = (x + x2) / 2, (y + y2) / 2
+            radius = 7 * scale * (0.5 + step * 0.05)
+            for circle, (cx, cy) in zip(tile["circles"] + tile["green_circles"], centers):
                 self.main_canvas.coords(circle,
-                                       cx - 7 * scale, cy - 7 * scale,
-                                       cx + 7 * scale, cy + 7 * scale)
-            self.root.update()
-            time.sleep(0.05)
-        self.animating = False
-        self.update_board()
+                                       cx - radius, cy - radius,
+                                       cx + radius, cy + radius)
+            yield
 
     def handle_click(self, i, j):
-        if self.animating:
+        if self.animator.busy:
             return
         piece_type = self.piece_var.get()
         is_white = self.current_player == "White"
-        count = abs(self.pieces[i][j])
-        green = self.green_pieces[i][j]
         k = self.thresholds[i][j]
-        total = count + green
 
         if piece_type != "Green" and piece_type != self.current_player:
             messagebox.showinfo("Invalid Choice", f"{self.current_player} cannot place {piece_type}!")
             return
-        if piece_type == "Green":
-            if self.is_blocked(i, j) or total >= k or self.pieces[i][j] == 0:
+        if not self.board.is_legal(i * self.n + j, piece_type):
+            if piece_type == "Green":
                 messagebox.showinfo("Invalid Move", "Cannot place Green piece here!")
-                return
-        else:
-            if (self.is_blocked(i, j) or total >= k or
-                (self.pieces[i][j] < 0 and is_white) or
-                (self.pieces[i][j] > 0 and not is_white) or
-                (self.pieces[i][j] == 0 and green > 0)):
+            else:
                 messagebox.showinfo("Invalid Move", "Cannot place piece here!")
-                return
+            return
 
         self.clear_preview()
-        if piece_type == "Green":
-            self.green_pieces[i][j] += 1
-        else:
-            self.pieces[i][j] = (abs(self.pieces[i][j]) + 1) if is_white else -(abs(self.pieces[i][j]) + 1)
+        cleared = self.board.make_move(i * self.n + j, piece_type)
         self.animate_placement(i, j, piece_type)
 
-        if abs(self.pieces[i][j]) == k:
-            self.apply_attacker_effects(i, j)
-            self.main_canvas.itemconfig(self.tiles[(i, j)]["rect"],
-                                      fill="blue" if is_white else "red")
+        if abs(self.cell(i, j)[0]) == k:
+            self.animate_removals([divmod(b, self.n) for b in cleared])
+            if (i, j) in self.tiles:
+                self.main_canvas.itemconfig(self.tiles[(i, j)]["rect"],
+                                          fill="blue" if is_white else "red")
 
-        self.update_board()
-        self.current_player = "Black" if self.current_player == "White" else "White"
+        self.update_board(self.move_cells(i, j))
+        self.current_player = self.board.player
         self.status_label.config(text=f"Current Player: {self.current_player}")
         self.update_piece_choice()
 
         if not self.has_legal_moves():
-            winner = "Black" if self.current_player == "White" else "White"
-            messagebox.showinfo("Game Over", f"{winner} wins!")
-            self.root.quit()
+            self.animator.when_idle(self.end_game)
+
+    def end_game(self):
+        """Announce the winner once the last move's animations have finished."""
+        winner = "Black" if self.current_player == "White" else "White"
+        messagebox.showinfo("Game Over", f"{winner} wins!")
+        self.root.quit()
 
     def has_legal_moves(self):
-        for piece_type in [self.current_player, "Green"]:
-            if self.get_possible_moves(piece_type):
-                return True
-        return False
+        return self.board.has_legal_moves(self.current_player)
 
-    def update_board(self):
-        for i in range(self.n):
-            for j in range(self.n):
-                count = abs(self.pieces[i][j])
-                green_count = self.green_pieces[i][j]
-                k = self.thresholds[i][j]
-                rect = self.tiles[(i, j)]["rect"]
-                text = self.tiles[(i, j)]["text"]
-                self.main_canvas.itemconfig(text, text=f"k={k}")
-                if count == k:
-                    self.main_canvas.itemconfig(rect, fill="blue" if self.pieces[i][j] > 0 else "red")
-                elif self.is_blocked(i, j):
-                    self.main_canvas.itemconfig(rect, fill="yellow")
-                elif count > 0 or green_count > 0:
-                    self.main_canvas.itemconfig(rect, fill="#fff3b0" if self.pieces[i][j] > 0 else "#606c38")
-                else:
-                    self.main_canvas.itemconfig(rect, fill="lightgray")
-                x1, y1 = j * self.cell_size, i * self.cell_size
-                for circle in self.tiles[(i, j)]["circles"] + self.tiles[(i, j)]["green_circles"]:
-                    self.main_canvas.delete(circle)
-                self.tiles[(i, j)]["circles"] = []
-                self.tiles[(i, j)]["green_circles"] = []
-                # 2x2 grid positions
-                grid_positions = [(25, 25), (55, 25), (25, 55), (55, 55)]
-                grid_idx = 0
-                # White/Black pieces
-                if count > 0:
-                    is_white = self.pieces[i][j] > 0
-                    for _ in range(count):
-                        if grid_idx < k:
-                            x, y = grid_positions[grid_idx]
-                            circle = self.main_canvas.create_oval(
-                                x1 + x - 7, y1 + y - 7,
-                                x1 + x + 7, y1 + y + 7,
-                                fill="white" if is_white else "black",
-                                outline="black"
-                            )
-                            self.tiles[(i, j)]["circles"].append(circle)
-                            grid_idx += 1
-                # Green pieces
-                for _ in range(green_count):
-                    if grid_idx < k:
-                        x, y = grid_positions[grid_idx]
-                        circle = self.main_canvas.create_oval(
-                            x1 + x - 7, y1 + y - 7,
-                            x1 + x + 7, y1 + y + 7,
-                            fill="#2ecc71",
-                            outline="black"
-                        )
-                        self.tiles[(i, j)]["green_circles"].append(circle)
-                        grid_idx += 1
+    def tile_state(self, i, j):
+        """Return what the tile at (i,j) shows: signed count, green count and blocked status."""
+        return (*self.cell(i, j), self.is_blocked(i, j))
+
+    def move_cells(self, i, j):
+        """Return the cells whose tiles a move at (i,j) can change: (i,j) and its neighbors."""
+        return [(i, j), *engine.make_neighbors(self.n)[i][j]]
+
+    def redraw_tile(self, i, j):
+        """Redraw the tile at (i,j) even if its state is unchanged, e.g. after an animation."""
+        if (i, j) in self.tiles:
+            self.tiles[(i, j)]["state"] = None
+            self.update_board([(i, j)])
+
+    def update_board(self, cells=None):
+        """Redraw the tiles whose state changed since they were last drawn.
+
+        Each tile caches the state it was drawn for, so only changed tiles
+        touch the canvas. cells limits the check to some cells, such as
+        move_cells() after a move; by default every visible cell is checked.
+        Cells out of view have no tile and are skipped.
+        """
+        tiles = self.tiles
+        for i, j in cells if cells is not None else list(tiles):
+            tile = tiles.get((i, j))
+            if tile is not None:
+                state = self.tile_state(i, j)
+                if tile["state"] != state:
+                    self.draw_tile(i, j, state)
+
+    def create_tile(self, i, j):
+        """Create the rectangle and k label of the tile at (i,j) at the current zoom."""
+        size = self.viewport.cell_size
+        scale = size / viewport.CELL_SIZE
+        x1, y1 = j * size, i * size
+        rect = self.main_canvas.create_rectangle(x1, y1, x1 + size, y1 + size, fill="lightgray", outline="black")
+        text = None
+        if self.viewport.detailed:
+            text = self.main_canvas.create_text(x1 + size/2, y1 + size - 10*scale,
+                                              text=f"k={self.thresholds[i][j]}", font=("Arial", round(10 * scale)))
+        self.main_canvas.tag_bind(rect, "<Button-1>", lambda event: self.handle_click(i, j))
+        return {"rect": rect, "text": text, "circles": [], "green_circles": [], "state": None}
+
+    def delete_tile(self, tile):
+        """Delete the canvas items of a tile that left the view."""
+        self.main_canvas.delete(tile["rect"], *tile["circles"], *tile["green_circles"])
+        if tile["text"] is not None:
+            self.main_canvas.delete(tile["text"])
+
+    def draw_tile(self, i, j, state):
+        value, green_count, blocked = state
+        count = abs(value)
+        k = self.thresholds[i][j]
+        tile = self.tiles[(i, j)]
+        rect = tile["rect"]
+        if count == k:
+            self.main_canvas.itemconfig(rect, fill="blue" if value > 0 else "red")
+        elif blocked:
+            self.main_canvas.itemconfig(rect, fill="yellow")
+        elif count > 0 or green_count > 0:
+            self.main_canvas.itemconfig(rect, fill="#fff3b0" if value > 0 else "#606c38")
+        else:
+            self.main_canvas.itemconfig(rect, fill="lightgray")
+        size = self.viewport.cell_size
+        scale = size / viewport.CELL_SIZE
+        x1, y1 = j * size, i * size
+        for circle in tile["circles"] + tile["green_circles"]:
+            self.main_canvas.delete(circle)
+        tile["circles"] = []
+        tile["green_circles"] = []
+        if not self.viewport.detailed:
+            # Too small for pieces; the cell color shows the stack
+            tile["state"] = state
+            return
+        # 2x2 grid positions
+        grid_positions = [(25*scale, 25*scale), (55*scale, 25*scale), (25*scale, 55*scale), (55*scale, 55*scale)]
+        grid_idx = 0
+        # White/Black pieces
+        if count > 0:
+            is_white = value > 0
+            for _ in range(count):
+                if grid_idx < k:
+                    x, y = grid_positions[grid_idx]
+                    circle = self.main_canvas.create_oval(
+                        x1 + x - 7*scale, y1 + y - 7*scale,
+                        x1 + x + 7*scale, y1 + y + 7*scale,
+                        fill="white" if is_white else "black",
+                        outline="black"
+                    )
+                    tile["circles"].append(circle)
+                    grid_idx += 1
+        # Green pieces
+        for _ in range(green_count):
+            if grid_idx < k:
+                x, y = grid_positions[grid_idx]
+                circle = self.main_canvas.create_oval(
+                    x1 + x - 7*scale, y1 + y - 7*scale,
+                    x1 + x + 7*scale, y1 + y + 7*scale,
+                    fill="#2ecc71",
+                    outline="black"
+                )
+                tile["green_circles"].append(circle)
+                grid_idx += 1
+        tile["state"] = state
 
 def main():
     root = tk.Tk()
@@ -0,0 +1,239 @@
+"""Depth-limited alpha-beta search for ruleset-1 positions.
+
+Negamax with alpha-beta pruning over BitBoard make/unmake moves, deepened
+one ply at a time until a wall-clock budget runs out. Each iteration starts
+from the best move of the previous one, which together with a transposition
+table of bounds and killer moves makes the repeated shallow searches cheap.
+Remaining moves are ordered by the one-ply heuristic (strategies.py).
+
+Leaves are scored by mobility: the number of legal moves of the player to
+move minus those of the opponent. A player with no legal move loses; won
+and lost scores are offset by the distance to the end so faster wins are
+preferred.
+
+Run "python3 search.py --size 6 --time 2" to search an empty board and
+print the nodes/sec rate.
+"""
+import time
+from collections import namedtuple
+
+import engine
+from bitboard import BitBoard
+from solver import TranspositionTable, position_key
+from strategies import heuristic_order
+
+SearchResult = namedtuple("SearchResult", ["move", "score", "depth", "nodes", "seconds", "nps"])
+
+WIN = 1000000
+# Scores beyond WIN - MAX_PLY are wins or losses found by the search
+MAX_PLY = 1000
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+DEFAULT_TIME_LIMIT = 1.0
+DEFAULT_MAX_ENTRIES = 1000000
+
+# Nodes between two clock checks
+CHECK_INTERVAL = 1024
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget is spent."""
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+def evaluate(board, player):
+    """Return the mobility score of board for player to move."""
+    opponent = engine.other_player(player)
+    return popcount(board.legal_mask(player)) - popcount(board.legal_mask(opponent))
+
+
+def to_table(score, ply):
+    """Make a win/loss score relative to the node before storing it."""
+    if score > WIN - MAX_PLY:
+        return score + ply
+    if score < -WIN + MAX_PLY:
+        return score - ply
+    return score
+
+
+def from_table(score, ply):
+    if score > WIN - MAX_PLY:
+        return score - ply
+    if score < -WIN + MAX_PLY:
+        return score + ply
+    return score
+
+
+class AlphaBeta:
+    """Iterative-deepening alpha-beta player.
+
+    time_limit is the wall-clock budget per search in seconds and max_depth
+    an optional depth cap (None searches until the time runs out or the
+    result is decided). The transposition table is kept between searches.
+    """
+
+    def __init__(self, time_limit=DEFAULT_TIME_LIMIT, max_depth=None,
+                 max_entries=DEFAULT_MAX_ENTRIES):
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.table = TranspositionTable(max_entries)
+        self.killers = []
+        self.nodes = 0
+        self.deadline = None
+
+    def ordered_moves(self, board, player, ply, first):
+        """Return player's legal cells: first (a table move), killers, then heuristic order."""
+        order = heuristic_order(board, player)
+        front = []
+        candidates = [first]
+        if ply < len(self.killers):
+            candidates.extend(self.killers[ply])
+        for b in candidates:
+            if b is not None and b in order and b not in front:
+                front.append(b)
+        return front + [b for b in order if b not in front]
+
+    def add_killer(self, ply, b):
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if b not in killers:
+            killers.insert(0, b)
+            del killers[2:]
+
+    def negamax(self, board, player, depth, alpha, beta, ply):
+        """Return the score of board for player to move, searched depth plies deep."""
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0 and self.deadline is not None:
+            if time.perf_counter() > self.deadline:
+                raise SearchTimeout()
+        if not board.legal_mask(player):
+            return -WIN + ply
+        if depth == 0:
+            return evaluate(board, player)
+        key = position_key(board, player)
+        entry = self.table.get(key)
+        table_move = None
+        if entry is not None:
+            entry_depth, score, flag, table_move = entry
+            if entry_depth >= depth:
+                score = from_table(score, ply)
+                if (flag == EXACT or (flag == LOWER and score >= beta) or
+                        (flag == UPPER and score <= alpha)):
+                    return score
+        original_alpha = alpha
+        opponent = engine.other_player(player)
+        best_score = -WIN - 1
+        best_move = None
+        for b in self.ordered_moves(board, player, ply, table_move):
+            board.make_move(b, player)
+            try:
+                score = -self.negamax(board, opponent, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                board.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = b
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                self.add_killer(ply, b)
+                break
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table.store(key, (depth, to_table(best_score, ply), flag, best_move))
+        return best_score
+
+    def search_root(self, board, player, depth, first):
+        """Search all root moves to depth. Returns (best cell, score), or raises SearchTimeout.
+
+        If the time runs out after at least one move was searched, the
+        timeout carries the best (cell, score) found so far as its argument.
+        """
+        opponent = engine.other_player(player)
+        alpha = -WIN - 1
+        best = None
+        for b in self.ordered_moves(board, player, 0, first):
+            board.make_move(b, player)
+            try:
+                score = -self.negamax(board, opponent, depth - 1, -WIN - 1, -alpha, 1)
+            except SearchTimeout:
+                raise SearchTimeout(best)
+            finally:
+                board.unmake_move()
+            if best is None or score > best[1]:
+                best = (b, score)
+                alpha = score
+        return best
+
+    def search(self, pieces, player="White"):
+        """Search a grid for player to move. Returns a SearchResult.
+
+        move is the chosen (i,j) or None if player has no legal move, and
+        depth the last fully searched depth.
+        """
+        board = BitBoard.from_grid(pieces)
+        n = board.n
+        start = time.perf_counter()
+        self.deadline = start + self.time_limit if self.time_limit is not None else None
+        self.nodes = 0
+        self.killers = []
+        # No game lasts longer than the total capacity of the stacks
+        horizon = sum(board.tables.k)
+        if self.max_depth is not None:
+            horizon = min(horizon, self.max_depth)
+        best = None
+        completed = 0
+        depth = 1
+        while depth <= horizon:
+            first = best[0] if best is not None else None
+            try:
+                result = self.search_root(board, player, depth, first)
+            except SearchTimeout as timeout:
+                # The previous best move is searched first, so a partial
+                # iteration's best is at least as good as it
+                if timeout.args[0] is not None:
+                    best = timeout.args[0]
+                break
+            if result is None:
+                break
+            best = result
+            completed = depth
+            if abs(best[1]) > WIN - MAX_PLY:
+                break
+            depth += 1
+        seconds = time.perf_counter() - start
+        nps = self.nodes / seconds if seconds > 0 else 0.0
+        if best is None:
+            # Out of time before the first move finished: fall back on the heuristic
+            order = heuristic_order(board, player)
+            best = (order[0], None) if order else None
+        move = (best[0] // n, best[0] % n) if best is not None else None
+        score = best[1] if best is not None else -WIN
+        return SearchResult(move, score, completed, self.nodes, seconds, nps)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Search the empty n x n ruleset-1 board.")
+    parser.add_argument("--size", type=int, default=4, help="board size n")
+    parser.add_argument("--time", type=float, default=DEFAULT_TIME_LIMIT,
+                        help="time budget in seconds")
+    parser.add_argument("--depth", type=int, default=None, help="maximum depth")
+    args = parser.parse_args()
+    result = AlphaBeta(args.time, args.depth).search(engine.initial_position(args.size).pieces)
+    print(f"{args.size}x{args.size}: move {result.move}, score {result.score}, "
+          f"depth {result.depth}, {result.nodes} nodes in {result.seconds:.3f}s "
+          f"({result.nps:.0f} nodes/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""Exact outcome solver for ruleset-1 positions.
+
+Memoized negamax over BitBoard make/unmake moves. Positions are looked up in a
+transposition table keyed on a compact integer packed from the bitboards.
+Under normal play the player to move wins iff some move leads to a position
+the opponent loses; a player with no legal move loses.
+
+Positions that are color-antisymmetric under the 180 degree rotation are cut
+off without search (see mirror_lost), which settles the empty board for every
+even n, and for odd n once the center has been taken.
+
+Once attackers have cut the live cells into several regions that are all at
+most region_cells cells, the position is the disjunctive sum of the regions
+and is decided from their cached game values (see regions.py), so each region
+is evaluated once instead of once per combination of the other regions.
+
+Example:
+    >>> solve(engine.initial_position(3))
+    Solution(winner='White', move=(1, 1), nodes=...)
+"""
+import sys
+from collections import namedtuple
+
+import cgt
+import engine
+from bitboard import BitBoard, MAX_HEIGHT, iter_bits
+from regions import RegionValues, find_regions
+from symmetry import canonical_position_key
+
+Solution = namedtuple("Solution", ["winner", "move", "nodes"])
+
+DEFAULT_MAX_ENTRIES = 4000000
+
+# Largest region whose game value is computed instead of searched: the
+# canonical forms of larger regions get too expensive to build
+DEFAULT_REGION_CELLS = 6
+
+
+class TranspositionTable:
+    """Bounded key -> value table that drops its oldest half when full."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def store(self, key, value):
+        if len(self.entries) >= self.max_entries:
+            # Dicts keep insertion order, so this keeps the most recent half
+            keep = list(self.entries.items())[self.max_entries // 2:]
+            self.entries = dict(keep)
+        self.entries[key] = value
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def reverse_bits(mask, size):
+    """Reverse the low size bits of mask; this maps cell (i,j) to (n-1-i, n-1-j)."""
+    return int(format(mask, "0{}b".format(size))[::-1], 2)
+
+
+def mirror_lost(board, player):
+    """Check if player, to move, loses to the opponent's mirror strategy.
+
+    A cell and its image under the 180 degree rotation are never adjacent, so
+    if the live cells are antisymmetric (mirrored stacks of opposite color,
+    attackers mirrored onto attackers), the opponent can answer every move
+    on a cell by the same move in the other color on its image, and the
+    position is antisymmetric again afterwards. With odd n the center is its
+    own image, so it must be dead or held by the opponent.
+    """
+    tables = board.tables
+    size = tables.size
+    saturated = board.saturated
+    if reverse_bits(saturated, size) != saturated:
+        return False
+    live = board.live_mask()
+    if size % 2:
+        center = 1 << (size // 2)
+        if live & center:
+            mine = board.occupancy(player)
+            theirs = board.occupancy(engine.other_player(player))
+            if mine & center or not theirs & center:
+                return False
+            live &= ~center
+    for h in range(1, MAX_HEIGHT):
+        if reverse_bits(board.white[h] & live, size) != board.black[h] & live:
+            return False
+    return True
+
+
+def position_key(board, player):
+    """Pack a BitBoard (see BitBoard.key) and the player to move into one integer."""
+    return (board.key() << 1) | (player == "Black")
+
+
+class Solver:
+    """Memoized negamax solver whose table is reused across solve() calls.
+
+    With symmetry=True the table is keyed on symmetry.canonical_position_key,
+    so the up to 16 images of a position under the symmetries of the square
+    and color swapping share one entry. region_cells=0 turns off the
+    decomposition into regions.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, symmetry=True,
+                 region_cells=DEFAULT_REGION_CELLS):
+        self.table = TranspositionTable(max_entries)
+        self.key = canonical_position_key if symmetry else position_key
+        self.region_cells = region_cells
+        self.regions = RegionValues(symmetry)
+        self.nodes = 0
+
+    def wins(self, board, player):
+        """Return True if player, to move on board, wins with perfect play."""
+        key = self.key(board, player)
+        result = self.table.get(key)
+        if result is not None:
+            return result
+        self.nodes += 1
+        if mirror_lost(board, player):
+            self.table.store(key, False)
+            return False
+        if self.is_split(board):
+            result = cgt.winner(self.regions.value_of_board(board), player) == player
+            self.table.store(key, result)
+            return result
+        opponent = engine.other_player(player)
+        result = False
+        for b in self.ordered_moves(board, player):
+            board.make_move(b, player)
+            opponent_wins = self.wins(board, opponent)
+            board.unmake_move()
+            if not opponent_wins:
+                result = True
+                break
+        self.table.store(key, result)
+        return result
+
+    def is_split(self, board):
+        """Check if board has several live regions, all of at most region_cells cells."""
+        parts = find_regions(board)
+        return len(parts) > 1 and all(bin(part).count("1") <= self.region_cells for part in parts)
+
+    def ordered_moves(self, board, player):
+        """Return the legal cell indices of player in search order.
+
+        The mirror image of the opponent's last move and the center come
+        first since they are the replies that can restore antisymmetry, then
+        moves that saturate a stack, then the rest.
+        """
+        tables = board.tables
+        legal = board.legal_mask(player)
+        stacks = board.white if player == "White" else board.black
+        first = []
+        if board.history:
+            mirror = tables.size - 1 - board.history[-1][0]
+            if legal >> mirror & 1:
+                first.append(mirror)
+        center = tables.size // 2
+        if tables.size % 2 and legal >> center & 1 and center not in first:
+            first.append(center)
+        for b in first:
+            legal &= ~(1 << b)
+        # A stack one below its threshold saturates when played
+        near_full = 0
+        for k, mask in tables.k_masks.items():
+            near_full |= stacks[k - 1] & mask
+        saturating = legal & near_full
+        return first + list(iter_bits(saturating)) + list(iter_bits(legal & ~saturating))
+
+    def solve(self, pieces, player="White"):
+        """Solve a grid for player to move. Returns a Solution.
+
+        winner is the player who wins with perfect play and move is a
+        winning (i,j) for the player to move, or None if they lose.
+        """
+        board = BitBoard.from_grid(pieces)
+        n = board.n
+        opponent = engine.other_player(player)
+        self.nodes = 0
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, 10000))
+        try:
+            for b in self.ordered_moves(board, player):
+                board.make_move(b, player)
+                opponent_wins = self.wins(board, opponent)
+                board.unmake_move()
+                if not opponent_wins:
+                    return Solution(player, (b // n, b % n), self.nodes)
+        finally:
+            sys.setrecursionlimit(limit)
+        return Solution(opponent, None, self.nodes)
+
+
+def solve(position, max_entries=DEFAULT_MAX_ENTRIES, symmetry=True,
+          region_cells=DEFAULT_REGION_CELLS):
+    """Solve an engine.Position with a fresh Solver."""
+    return Solver(max_entries, symmetry, region_cells).solve(position.pieces, position.player)
+
+
+def main():
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description="Solve the empty n x n ruleset-1 board.")
+    parser.add_argument("--size", type=int, default=4, help="board size n")
+    parser.add_argument("--max-entries", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="transposition table capacity")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    solution = solve(engine.initial_position(args.size), args.max_entries)
+    elapsed = time.perf_counter() - start
+    move = f", winning move {solution.move}" if solution.move else ""
+    print(f"{args.size}x{args.size}: {solution.winner} wins{move} "
+          f"({solution.nodes} nodes, {elapsed:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""Exact outcome solver for ruleset-2 positions (neutral green pieces).
+
+Memoized negamax over engine2.GreenBoard make/unmake moves, keyed on the
+board's exact packed key and the player to move, reduced over the
+symmetries of the square and color swapping (see solver.py for the
+ruleset-1 solver this follows).
+
+The mirror argument of solver.mirror_lost carries over: a green piece on a
+stack can be answered by a green piece on its image, which holds the
+mirrored stack of the other color. With odd n the center is its own image
+and either player may put green pieces on it, so the cutoff only applies
+once the center is dead.
+
+compare() solves the same random ruleset-1 positions under both rulesets,
+which shows how often the green option changes the outcome.
+
+Example:
+    python3 solver2.py --size 3 --compare 200
+"""
+import random
+import sys
+import time
+from functools import lru_cache
+from operator import lshift
+
+import engine
+import engine2
+from solver import DEFAULT_MAX_ENTRIES, Solution, TranspositionTable
+from solver import Solver as Ruleset1Solver
+from symmetry import cell_permutations
+
+# Key code of each cell with White and Black swapped; attackers, keyed with
+# both owner bits set, stay as they are
+SWAPPED_CODES = tuple(
+    code ^ engine2.OWNER_MASK if code & engine2.OWNER_MASK in (engine2.OWNER_WHITE, engine2.OWNER_BLACK)
+    else code for code in range(1 << engine2.CELL_BITS))
+
+
+def position_key(board):
+    """Pack a GreenBoard's key and the player to move into one integer."""
+    return (board.key << 1) | (board.player == "Black")
+
+
+@lru_cache(maxsize=None)
+def image_shifts(n):
+    """Return, per symmetry of the square, the shift of each cell's code in the image's key."""
+    return tuple(tuple(engine2.CELL_BITS * image for image in perm) for perm in cell_permutations(n))
+
+
+def canonical_key(board):
+    """Return the smallest position_key over the 16 images of a GreenBoard.
+
+    The images are the 8 symmetries of the square, each with and without
+    swapping White and Black (and the player to move).
+    """
+    key_codes = board.key_codes
+    codes = [key_codes[b][code] for b, code in enumerate(board.cells)]
+    swapped = [SWAPPED_CODES[code] for code in codes]
+    black = board.player == "Black"
+    return min(min((sum(map(lshift, codes, shifts)) << 1) | black,
+                   (sum(map(lshift, swapped, shifts)) << 1) | (not black))
+               for shifts in image_shifts(board.n))
+
+
+def mirror_lost(board):
+    """Check if the player to move on a GreenBoard loses to the opponent's mirror strategy.
+
+    Attackers must be mirrored onto attackers, and every live cell must hold
+    the mirrored stack of the other color with the same number of green
+    pieces. With odd n the center must be dead.
+    """
+    cells = board.cells
+    attackers = board.attackers
+    k = board.k
+    size = len(cells)
+    last = size - 1
+    if size % 2:
+        center = size // 2
+        if not attackers[center] and cells[center] & engine2.COUNT_MASK != k[center]:
+            return False
+    for b in range(size // 2 + 1):
+        image = last - b
+        code = cells[b]
+        other = cells[image]
+        saturated = code & engine2.COUNT_MASK == k[b]
+        if saturated != (other & engine2.COUNT_MASK == k[image]):
+            return False
+        if saturated or attackers[b]:
+            continue
+        if code & engine2.OWNER_MASK:
+            # Swapping the two owner bits gives the other color
+            code ^= engine2.OWNER_MASK
+        if code != other:
+            return False
+    return True
+
+
+class Solver:
+    """Memoized negamax solver whose table is reused across solve() calls.
+
+    With symmetry=True the table is keyed on canonical_key, so the up to 16
+    images of a position share one entry.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, symmetry=True):
+        self.table = TranspositionTable(max_entries)
+        self.key = canonical_key if symmetry else position_key
+        self.nodes = 0
+
+    def wins(self, board):
+        """Return True if the player to move on board wins with perfect play."""
+        # The exact key is checked first, so that transpositions skip the
+        # more expensive canonical_key
+        raw = position_key(board)
+        result = self.table.get(raw)
+        if result is not None:
+            return result
+        key = self.key(board)
+        result = self.table.get(key)
+        if result is not None:
+            self.table.store(raw, result)
+            return result
+        self.nodes += 1
+        if mirror_lost(board):
+            self.table.store(key, False)
+            self.table.store(raw, False)
+            return False
+        result = False
+        for b, piece_type in self.ordered_moves(board):
+            board.make_move(b, piece_type)
+            opponent_wins = self.wins(board)
+            board.unmake_move()
+            if not opponent_wins:
+                result = True
+                break
+        self.table.store(key, result)
+        self.table.store(raw, result)
+        return result
+
+    def ordered_moves(self, board):
+        """Return the legal moves of the player to move in search order.
+
+        The mirror image of the opponent's last move comes first since it is
+        the reply that can restore antisymmetry, then moves that saturate a
+        stack, then the other colored moves, then green moves.
+        """
+        moves = board.legal_moves()
+        k = board.k
+        cells = board.cells
+        first = []
+        saturating = []
+        colored = []
+        green = []
+        mirror = None
+        if board.history:
+            last, old = board.history[-1][:2]
+            mirror = (len(cells) - 1 - last, "Green" if cells[last] >> 5 != old >> 5 else board.player)
+        for move in moves:
+            b, piece_type = move
+            if move == mirror:
+                first.append(move)
+            elif piece_type == "Green":
+                green.append(move)
+            elif cells[b] & engine2.COUNT_MASK == k[b] - 1:
+                saturating.append(move)
+            else:
+                colored.append(move)
+        return first + saturating + colored + green
+
+    def solve(self, pieces, green_pieces, player="White"):
+        """Solve a pair of grids for player to move. Returns a Solution.
+
+        winner is the player who wins with perfect play and move is a
+        winning (i, j, piece_type) for the player to move, or None if they
+        lose.
+        """
+        board = engine2.GreenBoard(pieces, green_pieces, player)
+        n = board.n
+        opponent = engine.other_player(player)
+        self.nodes = 0
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, 10000))
+        try:
+            for b, piece_type in self.ordered_moves(board):
+                board.make_move(b, piece_type)
+                opponent_wins = self.wins(board)
+                board.unmake_move()
+                if not opponent_wins:
+                    return Solution(player, (b // n, b % n, piece_type), self.nodes)
+        finally:
+            sys.setrecursionlimit(limit)
+        return Solution(opponent, None, self.nodes)
+
+
+def solve(position, max_entries=DEFAULT_MAX_ENTRIES, symmetry=True):
+    """Solve an engine2.GreenPosition with a fresh Solver."""
+    return Solver(max_entries, symmetry).solve(position.pieces, position.green_pieces, position.player)
+
+
+def random_position(n, plies, rng):
+    """Return a ruleset-1 Position reached by up to plies random moves from the empty board."""
+    position = engine.initial_position(n)
+    for _ in range(plies):
+        moves = engine.get_possible_moves(position.pieces, position.player)
+        if not moves:
+            break
+        position = engine.apply_move(position, rng.choice(moves))
+    return position
+
+
+def compare(n, samples, seed=0, max_entries=DEFAULT_MAX_ENTRIES):
+    """Solve random ruleset-1 positions under both rulesets.
+
+    Returns (number of positions, number whose winner differs with green
+    pieces allowed). The empty board is always the first position.
+    """
+    rng = random.Random(seed)
+    ruleset1 = Ruleset1Solver(max_entries)
+    ruleset2 = Solver(max_entries)
+    empty = [[0] * n for _ in range(n)]
+    changed = 0
+    for sample in range(samples):
+        position = random_position(n, 0 if sample == 0 else rng.randrange(n * n), rng)
+        winner1 = ruleset1.solve(position.pieces, position.player).winner
+        winner2 = ruleset2.solve(position.pieces, empty, position.player).winner
+        changed += winner1 != winner2
+    return samples, changed
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Solve the empty n x n ruleset-2 board.")
+    parser.add_argument("--size", type=int, default=3, help="board size n")
+    parser.add_argument("--max-entries", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="transposition table capacity")
+    parser.add_argument("--compare", type=int, metavar="SAMPLES",
+                        help="also solve this many random ruleset-1 positions under both rulesets")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for --compare")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    solution = solve(engine2.initial_position(args.size), args.max_entries)
+    elapsed = time.perf_counter() - start
+    move = f", winning move {solution.move}" if solution.move else ""
+    print(f"{args.size}x{args.size}: {solution.winner} wins{move} "
+          f"({solution.nodes} nodes, {elapsed:.3f}s)")
+    if args.compare:
+        start = time.perf_counter()
+        samples, changed = compare(args.size, args.compare, args.seed, args.max_entries)
+        print(f"Green pieces change the winner of {changed} of {samples} random positions "
+              f"({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
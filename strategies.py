@@ -0,0 +1,105 @@
+"""Move-choice strategies for ruleset-1 AI players.
+
+The heuristic here is the one-ply rule the strategy demo has always used:
+play an empty cell with the largest threshold k, else add to one of your
+own stacks with the smallest k. Functions take a BitBoard and return cell
+indices (b = i*n + j).
+
+Players for tournaments and benchmarks are registered by name in PLAYERS.
+A registered factory takes a random.Random and returns a move function
+(board, player) -> cell index, or None when player has no legal move.
+Custom players are added with register_player().
+"""
+import random
+
+from bitboard import iter_bits
+
+
+def heuristic_order(board, player):
+    """Return player's legal cells, best first by the heuristic.
+
+    Empty cells come first, by decreasing k, then own stacks by increasing
+    k. Cells of equal rank keep index order.
+    """
+    tables = board.tables
+    legal = board.legal_mask(player)
+    own = board.occupancy(player)
+    empty = legal & ~own
+    order = []
+    for k in sorted(tables.k_masks, reverse=True):
+        order.extend(iter_bits(empty & tables.k_masks[k]))
+    for k in sorted(tables.k_masks):
+        order.extend(iter_bits(legal & own & tables.k_masks[k]))
+    return order
+
+
+def heuristic_candidates(board, player):
+    """Return the equally ranked cells the heuristic chooses between."""
+    tables = board.tables
+    legal = board.legal_mask(player)
+    own = board.occupancy(player)
+    empty = legal & ~own
+    if empty:
+        k = max(tables.k[b] for b in iter_bits(empty))
+        return list(iter_bits(empty & tables.k_masks[k]))
+    if legal:
+        k = min(tables.k[b] for b in iter_bits(legal))
+        return list(iter_bits(legal & tables.k_masks[k]))
+    return []
+
+
+def heuristic_move(board, player, rng=random):
+    """Return a random cell among the heuristic's best, or None if player cannot move."""
+    candidates = heuristic_candidates(board, player)
+    if not candidates:
+        return None
+    return rng.choice(candidates)
+
+
+def random_move(board, player, rng=random):
+    """Return a uniformly random legal cell, or None if player cannot move."""
+    legal = board.legal_mask(player)
+    if not legal:
+        return None
+    return rng.choice(list(iter_bits(legal)))
+
+
+def _search_move(searcher):
+    """Wrap a grid-based search player (search.AlphaBeta, mcts.MCTS) as a move function."""
+    def move(board, player):
+        result = searcher.search(board.to_grid(), player)
+        if result.move is None:
+            return None
+        i, j = result.move
+        return i * board.n + j
+    return move
+
+
+def _alphabeta(rng):
+    from search import AlphaBeta
+    return _search_move(AlphaBeta(time_limit=0.1))
+
+
+def _mcts(rng):
+    from mcts import MCTS
+    return _search_move(MCTS(playouts=200, rng=rng))
+
+
+PLAYERS = {
+    "heuristic": lambda rng: lambda board, player: heuristic_move(board, player, rng),
+    "random": lambda rng: lambda board, player: random_move(board, player, rng),
+    "alphabeta": _alphabeta,
+    "mcts": _mcts,
+}
+
+
+def register_player(name, factory):
+    """Register a player factory under name, replacing any player of that name."""
+    PLAYERS[name] = factory
+
+
+def make_player(name, rng=None):
+    """Return a move function for the registered player name."""
+    if name not in PLAYERS:
+        raise ValueError(f"Unknown player {name!r}, registered: {', '.join(sorted(PLAYERS))}")
+    return PLAYERS[name](rng or random.Random())
@@ -1,30 +1,166 @@
-import tkinter as tk
-from tkinter import messagebox, simpledialog
-import time
-import copy
+"""Strategy demo for ruleset 1: play against (or watch) the AI players.
+
+Run without arguments for the Tk game. With --headless it plays AI vs AI
+games with no window or dialogs and writes one JSON line per game (moves,
+winner, per-move timings), so it can run on servers without a display:
+
+    python3 strategy_demo.py --headless --size 6 --games 100 --white alphabeta-0.25s
+
+Move generation, blocked checks, attacker clears and AI decisions are
+counted with tracing rather than printed; the summary goes to stderr when a
+game ends. --trace (or CGT_TRACE) sets the level, and debug also records
+every board.
+"""
+import argparse
+import json
 import random
+import sys
+import threading
+import time
+
+try:
+    import tkinter as tk
+    from tkinter import messagebox, simpledialog
+except ImportError:  # --headless does not need Tk
+    tk = None
+
+import animation
+import engine
+import gallery
+import mcts
+import metrics
+import search
+import strategies
+import tablebase
+import tracing
+import viewport
+from bitboard import BitBoard
+
+# AI strength menu: label -> factory taking the board size and returning a search
+# player (None = one-ply heuristic). Search players have search(pieces, player)
+# returning a result with a move.
+AI_STRENGTHS = (
+    ("Heuristic", None),
+    ("Search 0.25s", lambda n: search.AlphaBeta(time_limit=0.25)),
+    ("Search 1s", lambda n: search.AlphaBeta(time_limit=1.0)),
+    ("Search 3s", lambda n: search.AlphaBeta(time_limit=3.0)),
+    ("MCTS 1s", lambda n: mcts.MCTS(playouts=None, time_limit=1.0)),
+    ("MCTS 1s, heuristic rollouts", lambda n: mcts.MCTS(playouts=None, time_limit=1.0, policy="heuristic")),
+    ("MCTS 5000 playouts", lambda n: mcts.MCTS(playouts=5000)),
+    ("Tablebase, else search 1s", lambda n: tablebase.TablebasePlayer(n, search.AlphaBeta(time_limit=1.0))),
+)
+
+# Short names for the AI strengths on the command line, in the style of
+# strategies.PLAYERS; the labels above are kept for the menu and the JSON output.
+AI_NAMES = {
+    "heuristic": "Heuristic",
+    "alphabeta-0.25s": "Search 0.25s",
+    "alphabeta": "Search 1s",
+    "alphabeta-3s": "Search 3s",
+    "mcts": "MCTS 1s",
+    "mcts-heuristic": "MCTS 1s, heuristic rollouts",
+    "mcts-5000": "MCTS 5000 playouts",
+    "tablebase": "Tablebase, else search 1s",
+}
+
+
+def ai_move(pieces, player, searcher=None, rng=random):
+    """Return the AI's (i,j) for player, or None if player cannot move.
+
+    searcher is a search player from AI_STRENGTHS; None means the one-ply
+    heuristic (empty cells with max k, else own stacks with min k).
+    """
+    if searcher is not None:
+        return searcher.search(pieces, player).move
+    b = strategies.heuristic_move(BitBoard.from_grid(pieces), player, rng)
+    return None if b is None else divmod(b, len(pieces))
+
+
+def play_headless(n, white=AI_STRENGTHS[0][0], black=AI_STRENGTHS[0][0], seed=None):
+    """Play one AI vs AI game on an empty n x n board without Tk.
+
+    white and black are AI_STRENGTHS labels or AI_NAMES. Returns a JSON-ready dict with
+    the moves as [i, j] pairs, the winner and the per-move thinking time in
+    milliseconds of each side.
+    """
+    rng = random.Random(seed)
+    white = AI_NAMES.get(white, white)
+    black = AI_NAMES.get(black, black)
+    strengths = dict(AI_STRENGTHS)
+    searchers = {"White": strengths[white], "Black": strengths[black]}
+    searchers = {color: factory(n) if factory else None for color, factory in searchers.items()}
+    board = engine.Board.empty(n)
+    moves = []
+    times = {"White": [], "Black": []}
+    start = time.perf_counter()
+    while board.has_legal_moves():
+        player = board.player
+        # The board keeps the legal moves up to date; count them as one generation
+        tracing.count("movegen_calls")
+        tracing.count("moves_generated", len(board.legal[player]))
+        move_start = time.perf_counter()
+        move = ai_move(board.pieces, player, searchers[player], rng)
+        times[player].append(round((time.perf_counter() - move_start) * 1000, 3))
+        tracing.count("ai_decisions")
+        tracing.count("ai_ms", times[player][-1])
+        tracing.event("ai_move", tracing.DEBUG, player=player, move=move)
+        if move is None or not board.is_legal(*move):
+            raise ValueError(f"{player} AI made an illegal move {move}")
+        moves.append(list(move))
+        cleared = board.make_move(*move)
+        if abs(board.pieces[move[0]][move[1]]) == board.thresholds[move[0]][move[1]]:
+            tracing.count("attacker_clears")
+            tracing.count("stacks_cleared", len(cleared))
+            tracing.event("clear", tracing.DEBUG, attacker=tuple(move), cleared=list(cleared))
+    return {"size": n, "seed": seed, "white": white, "black": black,
+            "winner": engine.other_player(board.player), "length": len(moves), "moves": moves,
+            "seconds": round(time.perf_counter() - start, 4),
+            "white_ms": times["White"], "black_ms": times["Black"]}
+
+
+def describe_result(result):
+    """Return a short summary of a search player's result for the status bar."""
+    if isinstance(result, tablebase.ProbeResult):
+        return f"tablebase: {result.winner} wins, {result.seconds * 1e6:.0f} us"
+    if isinstance(result, mcts.MCTSResult):
+        return f"{result.playouts} playouts, {result.pps:.0f} playouts/s"
+    return f"depth {result.depth}, {result.nps:.0f} nodes/s"
+
 
 class StackingGame:
-    def __init__(self, root):
+    def __init__(self, root, n=None):
         self.root = root
         self.root.title("Stacking Game Setup")
         
-        # Prompt for board size
-        self.n = self.get_board_size()
+        # Prompt for board size unless it was given
+        self.n = n or self.get_board_size()
         if self.n is None:
             root.destroy()
             return
             
-        self.cell_size = 100
-        self.preview_cell_size = 50
+        self.preview_cell_size = max(1, min(50, 250 // self.n))
         self.current_player = "White"
-        self.animating = False
-        self.possible_boards = []
+        self.animator = animation.Animator(root)
+        self.preview_player = "White"  # Whose successors the gallery shows
         self.white_ai = tk.BooleanVar(value=False)
         self.black_ai = tk.BooleanVar(value=False)
         self.white_ai_locked = False
         self.black_ai_locked = False
         self.auto_play_active = False
+        self.ai_strength = tk.StringVar(value=AI_STRENGTHS[0][0])
+        self.instant_play = tk.BooleanVar(value=False)
+        self.ai_thinking = False
+        self.ai_generation = 0  # bumped on restart so stale search results are dropped
+        self.end_pending = False  # end_game is waiting for the last move's animations
+        self.searchers = {}
+        self.metrics = metrics.Metrics()
+        self.show_metrics = tk.BooleanVar(value=False)
+
+        # Optional side panel with the metrics, packed by toggle_metrics()
+        self.metrics_panel = tk.Frame(root)
+        tk.Label(self.metrics_panel, text="Metrics", font=("Arial", 12)).pack()
+        self.metrics_label = tk.Label(self.metrics_panel, text="", font=("Courier", 9), justify=tk.LEFT)
+        self.metrics_label.pack(anchor="nw")
 
         # Scrollable canvas setup
         self.canvas = tk.Canvas(root, width=550, height=700)
@@ -47,41 +183,29 @@ class StackingGame:
         self.canvas.bind_all("<Button-4>", on_mouse_wheel)
         self.canvas.bind_all("<Button-5>", on_mouse_wheel)
 
-        # Initialize grids
-        self.pieces = [[0] * self.n for _ in range(self.n)]  # 0=empty, >0=White, <0=Black
-        self.thresholds = [[0] * self.n for _ in range(self.n)]
-        for i in range(self.n):
-            for j in range(self.n):
-                k = 0
-                if i > 0: k += 1
-                if i < self.n-1: k += 1
-                if j > 0: k += 1
-                if j < self.n-1: k += 1
-                self.thresholds[i][j] = k
+        # Initialize grids; the engine board keeps blocked cells and legal moves up to date
+        self.board = engine.Board.empty(self.n, self.current_player)
+        self.pieces = self.board.pieces  # 0=empty, >0=White, <0=Black
+        self.thresholds = engine.make_thresholds(self.n)
+        self.tablebase = tablebase.load(self.n)  # None unless a tablebase was generated for n
+        self.watch_caches()
 
         # Main GUI setup
-        self.main_canvas = tk.Canvas(self.content_frame, width=self.n*self.cell_size, height=self.n*self.cell_size)
-        self.main_canvas.pack()
+        # Only the visible tiles exist; see viewport.py
+        self.viewport = viewport.Viewport(self.content_frame, self.n, self.create_tile, self.delete_tile,
+                                          self.update_board, self.animator.finish)
+        self.viewport.frame.pack()
+        self.main_canvas = self.viewport.canvas
+        self.tiles = self.viewport.tiles
         self.status_label = tk.Label(self.content_frame, text=f"Current Player: {self.current_player}", font=("Arial", 12))
         self.status_label.pack()
 
-        # Preview frame
-        self.preview_frame = tk.Frame(self.content_frame)
-        self.preview_frame.pack()
-        self.preview_canvases = []
-        self.preview_labels = []
-        for row in range(2):
-            for col in range(5):
-                if row * 5 + col < 9:
-                    canvas = tk.Canvas(self.preview_frame, width=self.n*self.preview_cell_size,
-                                      height=self.n*self.preview_cell_size, bg="white")
-                    canvas.grid(row=row, column=col, padx=5, pady=5)
-                    label = tk.Label(self.preview_frame, text="", font=("Arial", 8))
-                    label.grid(row=row+1, column=col)
-                    self.preview_canvases.append(canvas)
-                    self.preview_labels.append(label)
-
-        # Buttons and AI controls (below preview frame)
+        # Preview gallery; thumbnails are drawn as they scroll into view
+        side = self.n * self.preview_cell_size
+        self.gallery = gallery.Gallery(self.content_frame, side, side, self.draw_preview, self.describe_preview)
+        self.gallery.frame.pack()
+
+        # Buttons and AI controls (below preview gallery)
         button_frame = tk.Frame(self.content_frame)
         button_frame.pack()
         tk.Button(button_frame, text="Show White Boards", command=lambda: self.show_possible_boards("White")).pack(side=tk.LEFT, padx=5)
@@ -98,292 +222,401 @@ class StackingGame:
         self.white_ai_checkbutton.pack(side=tk.LEFT, padx=5)
         self.black_ai_checkbutton = tk.Checkbutton(ai_frame, text="Black AI", variable=self.black_ai, command=self.check_ai_move)
         self.black_ai_checkbutton.pack(side=tk.LEFT, padx=5)
-
-        # Draw main board
-        self.tiles = {}
-        for i in range(self.n):
-            for j in range(self.n):
-                x1, y1 = j * self.cell_size, i * self.cell_size
-                x2, y2 = x1 + self.cell_size, y1 + self.cell_size
-                rect = self.main_canvas.create_rectangle(x1, y1, x2, y2, fill="lightgray", outline="black")
-                text = self.main_canvas.create_text(x1 + self.cell_size/2, y1 + self.cell_size-10,
-                                                  text=f"k={self.thresholds[i][j]}", font=("Arial", 10))
-                self.tiles[(i, j)] = {"rect": rect, "text": text, "circles": []}
-                self.main_canvas.tag_bind(rect, "<Button-1>", lambda event, row=i, col=j: self.handle_click(row, col))
-
-        self.update_board()
+        tk.Label(ai_frame, text="Strength:").pack(side=tk.LEFT, padx=5)
+        tk.OptionMenu(ai_frame, self.ai_strength, *[label for label, _ in AI_STRENGTHS]).pack(side=tk.LEFT)
+        tk.Checkbutton(ai_frame, text="Instant Play", variable=self.instant_play,
+                       command=lambda: self.animator.set_instant(self.instant_play.get())).pack(side=tk.LEFT, padx=5)
+        tk.Checkbutton(ai_frame, text="Metrics", variable=self.show_metrics,
+                       command=self.toggle_metrics).pack(side=tk.LEFT, padx=5)
+
+        # Draw the visible part of the main board
+        self.viewport.refresh()
         self.check_ai_move()
 
     def get_board_size(self):
         """Prompt user for board size and validate input."""
         while True:
             try:
-                n = simpledialog.askinteger("Input", "Enter board size (n for n x n board, 2-10):",
-                                          parent=self.root, minvalue=2, maxvalue=10)
+                n = simpledialog.askinteger("Input", f"Enter board size (n for n x n board, 2-{viewport.MAX_SIZE}):",
+                                          parent=self.root, minvalue=2, maxvalue=viewport.MAX_SIZE)
                 if n is None:  # User cancelled
                     return None
                 return n
             except ValueError:
-                messagebox.showerror("Invalid Input", "Please enter a number between 2 and 10.")
+                messagebox.showerror("Invalid Input", f"Please enter a number between 2 and {viewport.MAX_SIZE}.")
                 continue
 
     def get_possible_moves(self, player):
-        is_white = player == "White"
-        moves = []
-        for i in range(self.n):
-            for j in range(self.n):
-                current_pieces = self.pieces[i][j]
-                k = self.thresholds[i][j]
-                if (not self.is_blocked(i, j) and
-                    (current_pieces == 0 or
-                     (current_pieces > 0 and is_white and current_pieces < k) or
-                     (current_pieces < 0 and not is_white and -current_pieces < k))):
-                    moves.append((i, j))
-        print(f"Possible moves for {player}: {moves}, Board: {self.pieces}")
+        with self.metrics.phase("movegen"):
+            moves = self.board.get_possible_moves(player)
+        tracing.count("movegen_calls")
+        tracing.count("moves_generated", len(moves))
+        if tracing.level >= tracing.DEBUG:
+            tracing.event("movegen", tracing.DEBUG, player=player, moves=moves,
+                          board=[row[:] for row in self.pieces])
         return moves
 
     def get_best_move(self, player):
-        moves = self.get_possible_moves(player)
-        if not moves:
-            print(f"No valid moves for {player}")
-            return None
-        # Prioritize empty tiles with max k
-        empty_moves = [(i, j) for i, j in moves if self.pieces[i][j] == 0]
-        if empty_moves:
-            max_k = max(self.thresholds[i][j] for i, j in empty_moves)
-            best_moves = [(i, j) for i, j in empty_moves if self.thresholds[i][j] == max_k]
-            print(f"Empty moves for {player}: {best_moves}, max_k={max_k}")
-            return random.choice(best_moves)
-        # No empty tiles: pick own-color tile with min k
-        is_white = player == "White"
-        own_moves = [(i, j) for i, j in moves if (self.pieces[i][j] > 0 and is_white) or (self.pieces[i][j] < 0 and not is_white)]
-        if own_moves:
-            min_k = min(self.thresholds[i][j] for i, j in own_moves)
-            best_moves = [(i, j) for i, j in own_moves if self.thresholds[i][j] == min_k]
-            print(f"Own moves for {player}: {best_moves}, min_k={min_k}")
-            return random.choice(best_moves)
-        # Fallback: any valid move
-        print(f"Fallback moves for {player}: {moves}")
-        return random.choice(moves)
-
-    def get_possible_boards(self, player):
-        is_white = player == "White"
-        moves = []
-        for i, j in self.get_possible_moves(player):
-            new_board = copy.deepcopy(self.pieces)
-            new_board[i][j] = (abs(new_board[i][j]) + 1) if is_white else -(abs(new_board[i][j]) + 1)
-            if abs(new_board[i][j]) == self.thresholds[i][j]:
-                for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                    ni, nj = i + di, j + dj
-                    if 0 <= ni < self.n and 0 <= nj < self.n:
-                        new_board[ni][nj] = 0
-            moves.append({"board": new_board, "move": (i, j)})
-        return moves
+        with self.metrics.phase("ai"):
+            moves = self.get_possible_moves(player)
+            if not moves:
+                tracing.event("no_moves", player=player)
+                return None
+            if tracing.level >= tracing.DEBUG:
+                board = BitBoard.from_grid(self.pieces)
+                tracing.event("heuristic_candidates", tracing.DEBUG, player=player,
+                              cells=[divmod(c, self.n) for c in strategies.heuristic_candidates(board, player)])
+            return ai_move(self.pieces, player)
+
+    def get_searcher(self, label):
+        """Return the search player for a strength label, keeping it (and its tables) between moves."""
+        if label not in self.searchers:
+            self.searchers[label] = dict(AI_STRENGTHS)[label](self.n)
+            self.watch_caches(self.searchers[label])
+        return self.searchers[label]
+
+    def watch_caches(self, searcher=None):
+        """Count the hits of the tablebase and of a search player's tables in the metrics."""
+        if self.tablebase:
+            self.metrics.watch(self.tablebase, "tablebase")
+        if isinstance(searcher, tablebase.TablebasePlayer):
+            if searcher.table:
+                self.metrics.watch(searcher.table, "tablebase")
+            searcher = searcher.fallback
+        if isinstance(searcher, search.AlphaBeta):
+            self.metrics.watch(searcher.table, "tt")
+
+    def toggle_metrics(self):
+        if self.show_metrics.get():
+            self.metrics_panel.pack(side="right", fill="y", before=self.scrollbar)
+            self.update_metrics_panel()
+        else:
+            self.metrics_panel.pack_forget()
+
+    def update_metrics_panel(self):
+        if self.show_metrics.get():
+            self.metrics_label.config(text=self.metrics.report())
+
+    def end_move(self):
+        """Close the move's timings in the metrics and refresh the panel."""
+        self.metrics.end_move()
+        self.update_metrics_panel()
+
+    def iter_successors(self, player):
+        return engine.iter_successors(self.pieces, player)
 
     def show_possible_boards(self, player):
-        self.clear_preview()
-        self.possible_boards = self.get_possible_boards(player)
-        for idx, board_info in enumerate(self.possible_boards):
-            if idx >= len(self.preview_canvases):
-                break
-            canvas = self.preview_canvases[idx]
-            label = self.preview_labels[idx]
-            board = board_info["board"]
-            move = board_info["move"]
-            player_char = "W" if player == "White" else "B"
-            label.config(text=f"{player_char}: {move}")
-            for i in range(self.n):
-                for j in range(self.n):
-                    x1, y1 = j * self.preview_cell_size, i * self.preview_cell_size
-                    x2, y2 = x1 + self.preview_cell_size, y1 + self.preview_cell_size
-                    is_blocked = False
-                    for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                        ni, nj = i + di, j + dj
-                        if 0 <= ni < self.n and 0 <= nj < self.n:
-                            if abs(board[ni][nj]) == self.thresholds[ni][nj]:
-                                is_blocked = True
-                                break
-                    count = abs(board[i][j])
-                    color = "lightgray"
-                    if count == self.thresholds[i][j]:
-                        color = "blue" if board[i][j] > 0 else "red"
-                    elif is_blocked:
-                        color = "yellow"
-                    canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="black")
-                    canvas.create_text(x1 + self.preview_cell_size/2, y1 + self.preview_cell_size-8,
-                                      text=f"k={self.thresholds[i][j]}", font=("Arial", 8))
-                    if count > 0:
-                        is_white = board[i][j] > 0
-                        for p in range(count):
-                            offset_x = 10 + (p % 2) * 15
-                            offset_y = 10 + (p // 2) * 15
-                            canvas.create_oval(
-                                x1 + offset_x, y1 + offset_y,
-                                x1 + offset_x + 10, y1 + offset_y + 10,
-                                fill="white" if is_white else "black",
-                                outline="black"
-                            )
+        self.preview_player = player
+        with self.metrics.phase("render"):
+            self.gallery.show(self.timed_successors(player), total=len(self.board.legal[player]))
+
+    def timed_successors(self, player):
+        """Yield iter_successors(player), charging the generation of each successor to movegen."""
+        successors = self.iter_successors(player)
+        while True:
+            with self.metrics.phase("movegen"):
+                item = next(successors, None)
+            if item is None:
+                return
+            yield item
+
+    def describe_preview(self, item):
+        move, board = item
+        player = self.preview_player
+        text = f"{'W' if player == 'White' else 'B'}: {move}"
+        outcome = self.tablebase.probe(board, engine.other_player(player)) if self.tablebase else None
+        if outcome:
+            text += " wins" if outcome[0] == player else " loses"
+        return text
+
+    def draw_preview(self, canvas, item):
+        """Draw a successor board on an empty thumbnail canvas.
+
+        Empty cells share one background rectangle and the grid lines; only
+        stacks and blocked cells get items of their own. Small thumbnails
+        (large boards) show only the cell colors.
+        """
+        move, board = item
+        size = self.preview_cell_size
+        scale = size / 50
+        detailed = size >= 20
+        side = self.n * size
+        outline = "black" if size >= 4 else ""
+        canvas.create_rectangle(0, 0, side, side, fill="lightgray", outline=outline)
+        if outline:
+            for p in range(1, self.n):
+                canvas.create_line(0, p * size, side, p * size)
+                canvas.create_line(p * size, 0, p * size, side)
+        stacks = [(i, j) for i, row in enumerate(board) if any(row) for j, value in enumerate(row) if value]
+        neighbors = engine.make_neighbors(self.n)
+        blocked = {cell for i, j in stacks if abs(board[i][j]) == self.thresholds[i][j]
+                   for cell in neighbors[i][j]}
+        for i, j in sorted(blocked.union(stacks)):
+            count = abs(board[i][j])
+            if count == self.thresholds[i][j]:
+                color = "blue" if board[i][j] > 0 else "red"
+            elif (i, j) in blocked:
+                color = "yellow"
+            elif not detailed:
+                color = "white" if board[i][j] > 0 else "gray40"
+            else:
+                continue
+            x1, y1 = j * size, i * size
+            canvas.create_rectangle(x1, y1, x1 + size, y1 + size, fill=color, outline=outline)
+        if not detailed:
+            return
+        for i in range(self.n):
+            for j in range(self.n):
+                canvas.create_text(j * size + size/2, i * size + size - 8*scale,
+                                   text=f"k={self.thresholds[i][j]}", font=("Arial", 8))
+        for i, j in stacks:
+            x1, y1 = j * size, i * size
+            is_white = board[i][j] > 0
+            for p in range(abs(board[i][j])):
+                offset_x = (10 + (p % 2) * 15) * scale
+                offset_y = (10 + (p // 2) * 15) * scale
+                canvas.create_oval(
+                    x1 + offset_x, y1 + offset_y,
+                    x1 + offset_x + 10*scale, y1 + offset_y + 10*scale,
+                    fill="white" if is_white else "black",
+                    outline="black"
+                )
 
     def clear_preview(self):
-        self.possible_boards = []
-        for canvas in self.preview_canvases:
-            canvas.delete("all")
-        for label in self.preview_labels:
-            label.config(text="")
+        with self.metrics.phase("render"):
+            self.gallery.clear()
 
     def set_position(self, position):
-        if len(position) != self.n or any(len(row) != self.n for row in position):
+        if len(position) != self.n:
             raise ValueError("Position must be an n x n grid")
-        for i in range(self.n):
-            for j in range(self.n):
-                count = position[i][j]
-                k = self.thresholds[i][j]
-                if abs(count) > k:
-                    raise ValueError(f"Invalid piece count at ({i},{j}): |{count}| > k={k}")
-                self.pieces[i][j] = count
+        position = engine.from_grid(position, self.current_player)
+        self.board = engine.Board(position.pieces, self.current_player)
+        self.pieces = self.board.pieces
         self.update_board()
         self.clear_preview()
 
     def is_blocked(self, i, j):
-        for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            ni, nj = i + di, j + dj
-            if 0 <= ni < self.n and 0 <= nj < self.n:
-                if abs(self.pieces[ni][nj]) == self.thresholds[ni][nj]:
-                    print(f"Blocked at ({i},{j}) by attacker at ({ni},{nj})")
-                    return True
+        tracing.count("blocked_checks")
+        if self.board.is_blocked(i, j):
+            tracing.count("blocked")
+            if tracing.level >= tracing.DEBUG:
+                tracing.event("blocked", tracing.DEBUG, cell=(i, j),
+                              attacker=engine.blocking_attacker(self.pieces, i, j))
+            return True
         return False
 
-    def apply_attacker_effects(self, i, j):
-        for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            ni, nj = i + di, j + dj
-            if 0 <= ni < self.n and 0 <= nj < self.n:
-                if self.pieces[ni][nj] != 0:
-                    print(f"Clearing ({ni},{nj}) due to attacker at ({i},{j})")
-                    self.pieces[ni][nj] = 0
-                    self.animate_removal(ni, nj)
-
-    def animate_removal(self, i, j):
-        if self.animating:
-            return
-        self.animating = True
+    def show_attacker_effects(self, i, j, cleared):
+        tracing.count("attacker_clears")
+        tracing.count("stacks_cleared", len(cleared))
+        tracing.event("clear", attacker=(i, j), cleared=list(cleared))
+        self.animate_removals(cleared)
+
+    def animate_removals(self, cells):
+        """Queue the flashes of the tiles an attacker cleared, all at once."""
+        def done():
+            for i, j in cells:
+                self.redraw_tile(i, j)
+        # Tiles out of view have nothing to flash
+        visible = [(i, j) for i, j in cells if (i, j) in self.tiles]
+        if visible:
+            self.animator.play([self.metrics.frames(self.removal_frames(i, j)) for i, j in visible], done)
+        else:
+            done()
+
+    def removal_frames(self, i, j):
+        """Flash the tile at (i,j) yellow twice, 200 ms per color."""
         rect = self.tiles[(i, j)]["rect"]
-        circles = self.tiles[(i, j)]["circles"]
-        original_color = "lightgray"
-        for circle in circles:
-            self.main_canvas.delete(circle)
-        self.tiles[(i, j)]["circles"] = []
-        self.main_canvas.itemconfig(rect, fill="yellow")
-        self.root.update()
-        self.root.after(200, lambda: self.main_canvas.itemconfig(rect, fill=original_color))
-        self.root.after(400, lambda: self.main_canvas.itemconfig(rect, fill="yellow"))
-        self.root.after(600, lambda: self.main_canvas.itemconfig(rect, fill=original_color))
-        self.root.after(800, lambda: setattr(self, "animating", False))
-        self.update_board()
+        self.tiles[(i, j)]["state"] = None
+        for fill in ("yellow", "lightgray", "yellow", "lightgray"):
+            self.main_canvas.itemconfig(rect, fill=fill)
+            for _ in range(200 // self.animator.frame_ms):
+                yield
 
     def animate_placement(self, i, j, player, is_ai=False):
-        if self.animating:
-            return
-        self.animating = True
-        x1, y1 = j * self.cell_size, i * self.cell_size
+        """Queue the growth of the pieces at (i,j); the tile is redrawn when it ends.
+
+        Tiles out of view or too small for pieces are just redrawn.
+        """
+        if (i, j) in self.tiles and self.viewport.detailed:
+            self.animator.play([self.metrics.frames(self.placement_frames(i, j, player, is_ai))],
+                               lambda: self.redraw_tile(i, j))
+        else:
+            self.redraw_tile(i, j)
+
+    def placement_frames(self, i, j, player, is_ai=False):
+        """Grow the pieces of the stack at (i,j) from half size over 10 frames."""
+        tile = self.tiles[(i, j)]
+        size = self.viewport.cell_size
+        scale = size / viewport.CELL_SIZE
+        x1, y1 = j * size, i * size
         count = abs(self.pieces[i][j])
-        k = self.thresholds[i][j]
         is_white = player == "White"
-        for circle in self.tiles[(i, j)]["circles"]:
+        for circle in tile["circles"]:
             self.main_canvas.delete(circle)
-        self.tiles[(i, j)]["circles"] = []
+        tile["circles"] = []
+        tile["state"] = None
+        centers = []
         for p in range(count):
-            offset_x = 20 + (p % 2) * 30
-            offset_y = 20 + (p // 2) * 30
+            cx = x1 + (30 + (p % 2) * 30) * scale
+            cy = y1 + (30 + (p // 2) * 30) * scale
+            centers.append((cx, cy))
             circle = self.main_canvas.create_oval(
-                x1 + offset_x, y1 + offset_y,
-                x1 + offset_x + 20, y1 + offset_y + 20,
+                cx - 5*scale, cy - 5*scale, cx + 5*scale, cy + 5*scale,
                 fill="white" if is_white else "black",
-                outline="black",
-                state="hidden"
+                outline="black"
             )
-            self.tiles[(i, j)]["circles"].append(circle)
-        if is_ai:
-            self.main_canvas.itemconfig(self.tiles[(i, j)]["rect"], outline="green", width=3)
-        for step in range(10):
-            for circle in self.tiles[(i, j)]["circles"]:
-                self.main_canvas.itemconfig(circle, state="normal")
-                scale = 0.5 + step * 0.05
-                self.main_canvas.coords(circle,
-                                       x1 + offset_x - 10 * scale, y1 + offset_y - 10 * scale,
-                                       x1 + offset_x + 10 * scale, y1 + offset_y + 10 * scale)
-            self.root.update()
-            time.sleep(0.05)
-        for p, circle in enumerate(self.tiles[(i, j)]["circles"]):
-            offset_x = 20 + (p % 2) * 30
-            offset_y = 20 + (p // 2) * 30
-            self.main_canvas.coords(circle,
-                                   x1 + offset_x, y1 + offset_y,
-                                   x1 + offset_x + 20, y1 + offset_y + 20)
+            tile["circles"].append(circle)
         if is_ai:
-            self.root.after(200, lambda: self.main_canvas.itemconfig(self.tiles[(i, j)]["rect"], outline="black", width=1))
-        self.animating = False
-        self.update_board()
+            self.main_canvas.itemconfig(tile["rect"], outline="green", width=3)
+        try:
+            for step in range(10):
+                radius = 10 * scale * (0.5 + step * 0.05)
+                for circle, (cx, cy) in zip(tile["circles"], centers):
+                    self.main_canvas.coords(circle,
+                                           cx - radius, cy - radius,
+                                           cx + radius, cy + radius)
+                yield
+            if is_ai:
+                for _ in range(200 // self.animator.frame_ms):
+                    yield
+        finally:
+            if is_ai:
+                self.main_canvas.itemconfig(tile["rect"], outline="black", width=1)
 
     def handle_click(self, i, j):
         if self.auto_play_active:
             return
-        if self.animating:
+        if self.animator.busy or self.ai_thinking:
             return
         if ((self.current_player == "White" and self.white_ai.get()) or
             (self.current_player == "Black" and self.black_ai.get())):
             return
         if not self.has_legal_moves():
-            self.end_game()
+            self.finish_game()
             return
-        current_pieces = self.pieces[i][j]
         k = self.thresholds[i][j]
         is_white = self.current_player == "White"
-        if (self.is_blocked(i, j) or
-            (current_pieces < 0 and is_white) or
-            (current_pieces > 0 and not is_white) or
-            abs(current_pieces) >= k):
+        if not self.board.is_legal(i, j, self.current_player):
             messagebox.showinfo("Invalid Move", "Cannot place piece here!")
             return
 
         self.clear_preview()
-        self.pieces[i][j] = (abs(current_pieces) + 1) if is_white else -(abs(current_pieces) + 1)
+        with self.metrics.phase("movegen"):
+            cleared = self.board.make_move(i, j)
         self.animate_placement(i, j, self.current_player, is_ai=False)
         self.status_label.config(text=f"Player Move: ({i},{j})")
 
         if abs(self.pieces[i][j]) == k:
-            self.apply_attacker_effects(i, j)
-            self.main_canvas.itemconfig(self.tiles[(i, j)]["rect"],
-                                      fill="blue" if is_white else "red")
-
-        self.update_board()
-        self.current_player = "Black" if self.current_player == "White" else "White"
+            self.show_attacker_effects(i, j, cleared)
+            if (i, j) in self.tiles:
+                self.main_canvas.itemconfig(self.tiles[(i, j)]["rect"],
+                                          fill="blue" if is_white else "red")
+
+        self.update_board(self.move_cells(i, j))
+        self.current_player = self.board.player
+        self.end_move()
         self.status_label.config(text=f"Current Player: {self.current_player}")
 
         if not self.has_legal_moves():
-            self.end_game()
+            self.finish_game()
         else:
             self.check_ai_move()
 
-    def make_ai_move(self):
-        move = self.get_best_move(self.current_player)
-        if not move:
+    def make_ai_move(self, done=None):
+        """Choose and play a move for the current player, then call done().
+
+        Search strengths run in a worker thread that is polled from the Tk
+        loop, so the window keeps responding while the AI thinks. Returns
+        False if there is no move to make.
+        """
+        player = self.current_player
+        label = self.ai_strength.get()
+        if dict(AI_STRENGTHS)[label] is None:
+            move = self.get_best_move(player)
+            if not move:
+                return False
+            self.play_ai_move(move)
+            if done:
+                done()
+            return True
+        if not self.board.has_legal_moves(player):
             return False
+        self.ai_thinking = True
+        self.status_label.config(text=f"AI ({player}) thinking...")
+        searcher = self.get_searcher(label)
+        pieces = [row[:] for row in self.pieces]
+        results = []
+
+        def search():
+            try:
+                results.append(searcher.search(pieces, player))
+            except Exception as error:  # Reported from the Tk thread by poll_ai_move
+                results.append(error)
+
+        worker = threading.Thread(target=search, daemon=True)
+        worker.start()
+        self.root.after(50, self.poll_ai_move, worker, results, self.ai_generation, done)
+        return True
+
+    def poll_ai_move(self, worker, results, generation, done):
+        if worker.is_alive():
+            self.root.after(50, self.poll_ai_move, worker, results, generation, done)
+            return
+        if generation != self.ai_generation:
+            return  # The game was restarted while the AI was thinking
+        self.ai_thinking = False
+        if not results:
+            return
+        result = results[0]
+        if isinstance(result, Exception):
+            self.report_ai_error(result)
+            return
+        tracing.event("ai_search", player=self.current_player, result=result)
+        self.metrics.add("ai", result.seconds)
+        self.metrics.record_result(result)
+        self.play_ai_move(result.move, result)
+        if done:
+            done()
+
+    def report_ai_error(self, error):
+        """Show a failed search and hand both sides back to the user, stopping auto play."""
+        player = self.current_player
+        label = self.ai_strength.get()
+        tracing.event("ai_error", player=player, strength=label, error=repr(error))
+        self.auto_play_active = False
+        self.white_ai.set(False)
+        self.black_ai.set(False)
+        self.white_ai_checkbutton.config(state="normal")
+        self.black_ai_checkbutton.config(state="normal")
+        self.white_ai_locked = False
+        self.black_ai_locked = False
+        self.status_label.config(text=f"AI ({player}) failed: {error!r} | Current Player: {player}")
+        messagebox.showerror("AI Error", f"The {label} AI failed for {player}:\n{error!r}\n\nAuto play was stopped.")
+
+    def play_ai_move(self, move, result=None):
         i, j = move
         is_white = self.current_player == "White"
         self.clear_preview()
-        self.pieces[i][j] = (abs(self.pieces[i][j]) + 1) if is_white else -(abs(self.pieces[i][j]) + 1)
+        tracing.count("ai_decisions")
+        tracing.event("ai_move", player=self.current_player, move=move)
+        with self.metrics.phase("movegen"):
+            cleared = self.board.make_move(i, j)
         self.animate_placement(i, j, self.current_player, is_ai=True)
-        self.status_label.config(text=f"AI Move: ({i},{j}), k={self.thresholds[i][j]}")
+        status = f"AI Move: ({i},{j}), k={self.thresholds[i][j]}"
+        if result is not None:
+            status += f", {describe_result(result)}"
+        self.status_label.config(text=status)
 
         if abs(self.pieces[i][j]) == self.thresholds[i][j]:
-            self.apply_attacker_effects(i, j)
-            self.main_canvas.itemconfig(self.tiles[(i, j)]["rect"],
-                                      fill="blue" if is_white else "red")
+            self.show_attacker_effects(i, j, cleared)
+            if (i, j) in self.tiles:
+                self.main_canvas.itemconfig(self.tiles[(i, j)]["rect"],
+                                          fill="blue" if is_white else "red")
 
-        self.update_board()
-        self.current_player = "Black" if self.current_player == "White" else "White"
-        self.status_label.config(text=f"Current Player: {self.current_player}")
-        return True
+        self.update_board(self.move_cells(i, j))
+        self.current_player = self.board.player
+        self.end_move()
+        self.status_label.config(text=f"{status} | Current Player: {self.current_player}")
 
     def check_ai_move(self):
         if self.white_ai.get() and not self.white_ai_locked:
@@ -397,23 +630,27 @@ class StackingGame:
             self.run_ai_turn()
 
     def run_ai_turn(self):
-        if self.auto_play_active:
+        if self.auto_play_active or self.end_pending:
             return
-        if self.animating:
-            print("Waiting for animation, retrying")
+        if self.animator.busy or self.ai_thinking:
+            tracing.count("ai_waits")
             self.root.after(100, self.run_ai_turn)
             return
         if not self.has_legal_moves():
-            self.end_game()
+            self.finish_game()
             return
-        print(f"AI turn: {self.current_player}, Board: {self.pieces}")
-        if self.make_ai_move():
-            if not self.has_legal_moves():
-                self.end_game()
-                return
-            if ((self.current_player == "White" and self.white_ai.get()) or
-                (self.current_player == "Black" and self.black_ai.get())):
-                self.root.after(500, self.run_ai_turn)
+        if tracing.level >= tracing.DEBUG:
+            tracing.event("ai_turn", tracing.DEBUG, player=self.current_player,
+                          board=[row[:] for row in self.pieces])
+        self.make_ai_move(self.finish_ai_turn)
+
+    def finish_ai_turn(self):
+        if not self.has_legal_moves():
+            self.finish_game()
+            return
+        if ((self.current_player == "White" and self.white_ai.get()) or
+            (self.current_player == "Black" and self.black_ai.get())):
+            self.root.after(self.move_delay(), self.run_ai_turn)
 
     def auto_play(self):
         if self.auto_play_active:
@@ -434,22 +671,39 @@ class StackingGame:
 
     def run_auto_play(self):
         if not self.auto_play_active:
-            print("Auto play stopped")
+            tracing.event("auto_play_stopped")
             return
-        if self.animating:
+        if self.end_pending:
+            return
+        if self.animator.busy or self.ai_thinking:
             self.root.after(100, self.run_auto_play)
             return
         if not self.has_legal_moves():
-            self.end_game()
+            self.finish_game()
             return
-        print(f"Auto play: {self.current_player}'s turn, Board: {self.pieces}")
-        self.make_ai_move()
+        if tracing.level >= tracing.DEBUG:
+            tracing.event("auto_play_turn", tracing.DEBUG, player=self.current_player,
+                          board=[row[:] for row in self.pieces])
+        self.make_ai_move(self.finish_auto_play_move)
+
+    def finish_auto_play_move(self):
         if not self.has_legal_moves():
-            self.end_game()
+            self.finish_game()
             return
-        self.root.after(500, self.run_auto_play)
+        self.root.after(self.move_delay(), self.run_auto_play)
+
+    def move_delay(self):
+        """Return the pause in ms between AI moves: none in instant play."""
+        return 0 if self.animator.instant else 500
+
+    def finish_game(self):
+        """Call end_game once, after the last move's animations have finished."""
+        if not self.end_pending:
+            self.end_pending = True
+            self.animator.when_idle(self.end_game)
 
     def end_game(self):
+        self.end_pending = False
         winner = "Black" if self.current_player == "White" else "White"
         messagebox.showinfo("Game Over", f"{winner} wins!")
         self.white_ai_checkbutton.config(state="normal")
@@ -458,13 +712,21 @@ class StackingGame:
         self.black_ai_locked = False
         self.auto_play_active = False
         self.status_label.config(text=f"Game Over, Winner: {winner}")
-        print(f"Game over, winner: {winner}, Board: {self.pieces}")
+        tracing.event("game_over", winner=winner, board=[row[:] for row in self.pieces])
+        tracing.dump(with_events=tracing.level >= tracing.DEBUG)
 
     def restart_game(self):
-        self.pieces = [[0] * self.n for _ in range(self.n)]
         self.current_player = "White"
-        self.animating = False
-        self.possible_boards = []
+        self.board = engine.Board.empty(self.n, self.current_player)
+        self.pieces = self.board.pieces
+        self.animator.cancel()
+        self.end_pending = False
+        tracing.reset()
+        self.metrics.reset()
+        self.ai_thinking = False
+        self.ai_generation += 1
+        # A search from before the restart may still be running on the old searchers
+        self.searchers = {}
         self.white_ai.set(False)
         self.black_ai.set(False)
         self.white_ai_checkbutton.config(state="normal")
@@ -475,56 +737,141 @@ class StackingGame:
         self.status_label.config(text=f"Current Player: {self.current_player}")
         self.clear_preview()
         self.update_board()
+        self.watch_caches()
+        self.update_metrics_panel()
         self.check_ai_move()
 
     def has_legal_moves(self):
-        is_white = self.current_player == "White"
-        for i in range(self.n):
-            for j in range(self.n):
-                current_pieces = self.pieces[i][j]
-                k = self.thresholds[i][j]
-                if (not self.is_blocked(i, j) and
-                    (current_pieces == 0 or
-                     (current_pieces > 0 and is_white and current_pieces < k) or
-                     (current_pieces < 0 and not is_white and -current_pieces < k))):
-                    return True
-        print(f"No legal moves for {self.current_player}, Board: {self.pieces}")
+        with self.metrics.phase("movegen"):
+            legal = self.board.has_legal_moves(self.current_player)
+        if legal:
+            return True
+        tracing.event("no_legal_moves", player=self.current_player)
         return False
 
-    def update_board(self):
-        for i in range(self.n):
-            for j in range(self.n):
-                count = abs(self.pieces[i][j])
-                k = self.thresholds[i][j]
-                rect = self.tiles[(i, j)]["rect"]
-                text = self.tiles[(i, j)]["text"]
-                self.main_canvas.itemconfig(text, text=f"k={k}")
-                if count == k:
-                    self.main_canvas.itemconfig(rect, fill="blue" if self.pieces[i][j] > 0 else "red")
-                elif self.is_blocked(i, j):
-                    self.main_canvas.itemconfig(rect, fill="yellow")
-                else:
-                    self.main_canvas.itemconfig(rect, fill="lightgray")
-                x1, y1 = j * self.cell_size, i * self.cell_size
-                for circle in self.tiles[(i, j)]["circles"]:
-                    self.main_canvas.delete(circle)
-                self.tiles[(i, j)]["circles"] = []
-                if count > 0:
-                    is_white = self.pieces[i][j] > 0
-                    for p in range(count):
-                        offset_x = 20 + (p % 2) * 30
-                        offset_y = 20 + (p // 2) * 30
-                        circle = self.main_canvas.create_oval(
-                            x1 + offset_x, y1 + offset_y,
-                            x1 + offset_x + 20, y1 + offset_y + 20,
-                            fill="white" if is_white else "black",
-                            outline="black"
-                        )
-                        self.tiles[(i, j)]["circles"].append(circle)
+    def tile_state(self, i, j):
+        """Return what the tile at (i,j) shows: its signed count and whether it is blocked."""
+        return (self.pieces[i][j], self.is_blocked(i, j))
+
+    def move_cells(self, i, j):
+        """Return the cells whose tiles a move at (i,j) can change: (i,j) and its neighbors."""
+        return [(i, j), *self.board.neighbors[i][j]]
+
+    def redraw_tile(self, i, j):
+        """Redraw the tile at (i,j) even if its state is unchanged, e.g. after an animation."""
+        if (i, j) in self.tiles:
+            self.tiles[(i, j)]["state"] = None
+            self.update_board([(i, j)])
+
+    def update_board(self, cells=None):
+        """Redraw the tiles whose state changed since they were last drawn.
+
+        Each tile caches the state it was drawn for, so only changed tiles
+        touch the canvas. cells limits the check to some cells, such as
+        move_cells() after a move; by default every visible cell is checked.
+        Cells out of view have no tile and are skipped.
+        """
+        tiles = self.tiles
+        with self.metrics.phase("render"):
+            for i, j in cells if cells is not None else list(tiles):
+                tile = tiles.get((i, j))
+                if tile is not None:
+                    state = self.tile_state(i, j)
+                    if tile["state"] != state:
+                        self.draw_tile(i, j, state)
+
+    def create_tile(self, i, j):
+        """Create the rectangle and k label of the tile at (i,j) at the current zoom."""
+        size = self.viewport.cell_size
+        scale = size / viewport.CELL_SIZE
+        x1, y1 = j * size, i * size
+        rect = self.main_canvas.create_rectangle(x1, y1, x1 + size, y1 + size, fill="lightgray", outline="black")
+        text = None
+        if self.viewport.detailed:
+            text = self.main_canvas.create_text(x1 + size/2, y1 + size - 10*scale,
+                                              text=f"k={self.thresholds[i][j]}", font=("Arial", round(10 * scale)))
+        self.main_canvas.tag_bind(rect, "<Button-1>", lambda event: self.handle_click(i, j))
+        return {"rect": rect, "text": text, "circles": [], "state": None}
+
+    def delete_tile(self, tile):
+        """Delete the canvas items of a tile that left the view."""
+        self.main_canvas.delete(tile["rect"], *tile["circles"])
+        if tile["text"] is not None:
+            self.main_canvas.delete(tile["text"])
+
+    def draw_tile(self, i, j, state):
+        value, blocked = state
+        count = abs(value)
+        k = self.thresholds[i][j]
+        tile = self.tiles[(i, j)]
+        rect = tile["rect"]
+        detailed = self.viewport.detailed
+        if count == k:
+            self.main_canvas.itemconfig(rect, fill="blue" if value > 0 else "red")
+        elif blocked:
+            self.main_canvas.itemconfig(rect, fill="yellow")
+        elif count > 0 and not detailed:
+            # Too small for pieces; the cell color shows the stack
+            self.main_canvas.itemconfig(rect, fill="white" if value > 0 else "gray40")
+        else:
+            self.main_canvas.itemconfig(rect, fill="lightgray")
+        size = self.viewport.cell_size
+        scale = size / viewport.CELL_SIZE
+        x1, y1 = j * size, i * size
+        for circle in tile["circles"]:
+            self.main_canvas.delete(circle)
+        tile["circles"] = []
+        if count > 0 and detailed:
+            is_white = value > 0
+            for p in range(count):
+                offset_x = (20 + (p % 2) * 30) * scale
+                offset_y = (20 + (p // 2) * 30) * scale
+                circle = self.main_canvas.create_oval(
+                    x1 + offset_x, y1 + offset_y,
+                    x1 + offset_x + 20*scale, y1 + offset_y + 20*scale,
+                    fill="white" if is_white else "black",
+                    outline="black"
+                )
+                tile["circles"].append(circle)
+        tile["state"] = state
 
 def main():
+    names = list(AI_NAMES)
+    parser = argparse.ArgumentParser(description="Stacking game strategy demo.")
+    parser.add_argument("--headless", action="store_true",
+                        help="play AI vs AI without a window and print one JSON line per game")
+    parser.add_argument("--size", type=int,
+                        help=f"board size n (2-{viewport.MAX_SIZE}); asked for if omitted in the GUI")
+    parser.add_argument("--games", type=int, default=1, help="headless games to play")
+    parser.add_argument("--white", choices=names, default=names[0], help="White's AI strength (headless)")
+    parser.add_argument("--black", choices=names, default=names[0], help="Black's AI strength (headless)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first headless game")
+    parser.add_argument("--output", help="write the JSON lines to this file instead of stdout")
+    parser.add_argument("--trace", choices=list(tracing.LEVELS),
+                        help="tracing level (default: CGT_TRACE, else counts)")
+    args = parser.parse_args()
+    if args.trace:
+        tracing.set_level(args.trace)
+    if args.size is not None and not 2 <= args.size <= viewport.MAX_SIZE:
+        parser.error(f"--size must be between 2 and {viewport.MAX_SIZE}")
+    if args.headless:
+        if args.size is None:
+            parser.error("--headless needs --size")
+        out = open(args.output, "w") if args.output else sys.stdout
+        try:
+            for g in range(args.games):
+                result = play_headless(args.size, args.white, args.black, args.seed + g)
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+        finally:
+            if args.output:
+                out.close()
+        tracing.dump(with_events=tracing.level >= tracing.DEBUG)
+        return
+    if tk is None:
+        parser.error("tkinter is not installed; use --headless")
     root = tk.Tk()
-    game = StackingGame(root)
+    game = StackingGame(root, args.size)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,159 @@
+"""Symmetry-reduced position keys.
+
+The board and its thresholds are invariant under the 8 symmetries of the
+square, and swapping White and Black (and the player to move) maps a game to
+its negative. canonical_key() maps a BitBoard to the smallest key over all of
+these images, so caches keyed on it store one entry per symmetry class.
+
+Bit permutations use per-byte lookup tables built once per board size, so
+transforming a mask costs one table lookup per 8 cells.
+"""
+from functools import lru_cache
+
+from bitboard import MAX_HEIGHT
+
+# (i, j) -> image of (i, j) on an n x n board, for each symmetry
+TRANSFORMS = (
+    lambda i, j, n: (i, j),
+    lambda i, j, n: (j, n - 1 - i),
+    lambda i, j, n: (n - 1 - i, n - 1 - j),
+    lambda i, j, n: (n - 1 - j, i),
+    lambda i, j, n: (i, n - 1 - j),
+    lambda i, j, n: (n - 1 - i, j),
+    lambda i, j, n: (j, i),
+    lambda i, j, n: (n - 1 - j, n - 1 - i),
+)
+
+# Index of the inverse of each transform (rotations by 90 and 270 swap)
+INVERSE = (0, 3, 2, 1, 4, 5, 6, 7)
+
+
+@lru_cache(maxsize=None)
+def cell_permutations(n):
+    """Return, per transform, the tuple mapping cell index b to its image."""
+    return tuple(
+        tuple(t(b // n, b % n, n)[0] * n + t(b // n, b % n, n)[1] for b in range(n * n))
+        for t in TRANSFORMS)
+
+
+@lru_cache(maxsize=None)
+def byte_tables(n):
+    """Return, per transform, per byte position, the 256 permuted masks of that byte."""
+    size = n * n
+    tables = []
+    for perm in cell_permutations(n):
+        chunks = []
+        for start in range(0, size, 8):
+            table = [0] * 256
+            for value in range(1, 256):
+                mask = 0
+                for bit in range(8):
+                    if value >> bit & 1 and start + bit < size:
+                        mask |= 1 << perm[start + bit]
+                table[value] = mask
+            chunks.append(table)
+        tables.append(tuple(chunks))
+    return tuple(tables)
+
+
+def transform_mask(mask, chunks):
+    """Apply one transform, given as its byte_tables entry, to a cell mask."""
+    result = 0
+    shift = 0
+    for table in chunks:
+        result |= table[(mask >> shift) & 255]
+        shift += 8
+    return result
+
+
+def key_masks(board):
+    """Return the masks BitBoard.key() packs: saturated, then live stacks per height and color."""
+    live = board.live_mask()
+    masks = [board.saturated]
+    for h in range(1, MAX_HEIGHT):
+        masks.append(board.white[h] & live)
+        masks.append(board.black[h] & live)
+    return masks
+
+
+def pack(masks, size):
+    key = 0
+    for mask in masks:
+        key = (key << size) | mask
+    return key
+
+
+def mask_images(masks, n, color_swap=True):
+    """Yield (key, transform, swapped) for every symmetric image of a mask list.
+
+    masks[0] is any color-neutral mask and masks[1:] are (white, black)
+    pairs, the layout used by key_masks.
+    """
+    size = n * n
+    for t, chunks in enumerate(byte_tables(n)):
+        image = [transform_mask(mask, chunks) for mask in masks]
+        yield pack(image, size), t, False
+        if color_swap:
+            # Swap each (white, black) pair of height masks
+            for h in range(1, len(image), 2):
+                image[h], image[h + 1] = image[h + 1], image[h]
+            yield pack(image, size), t, True
+
+
+def images(board, color_swap=True):
+    """Yield (key, transform, swapped) for every symmetric image of board."""
+    return mask_images(key_masks(board), board.tables.n, color_swap)
+
+
+def canonical_key(board, color_swap=True):
+    """Return (key, transform, swapped) for the smallest symmetric image of board.
+
+    key is comparable with BitBoard.key() of the representative. swapped is
+    True when that representative has White and Black exchanged, in which
+    case its game value is the negative of board's.
+    """
+    return min(images(board, color_swap), key=lambda image: image[0])
+
+
+def canonical_position_key(board, player, color_swap=True):
+    """Return a key for (board, player) shared by all 8 (or 16) symmetric images.
+
+    Swapping colors also swaps the player to move, so the outcome for the
+    player to move is the same for every position with this key.
+    """
+    black = player == "Black"
+    return min((key << 1) | (black != swapped) for key, _, swapped in images(board, color_swap))
+
+
+def transform_grid(pieces, t):
+    """Return the image of a grid under transform index t."""
+    n = len(pieces)
+    grid = [[0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(n):
+            ti, tj = TRANSFORMS[t](i, j, n)
+            grid[ti][tj] = pieces[i][j]
+    return grid
+
+
+def canonical_grid(pieces, color_swap=True):
+    """Return (grid, transform, swapped): the lexicographically smallest symmetric image of a grid.
+
+    Unlike canonical_key this keeps stacks on dead cells, so it is a
+    representative of the exact grid rather than of its game value.
+    """
+    best = None
+    for t in range(len(TRANSFORMS)):
+        image = tuple(tuple(row) for row in transform_grid(pieces, t))
+        if best is None or image < best[0]:
+            best = (image, t, False)
+        if color_swap:
+            swapped = tuple(tuple(-c for c in row) for row in image)
+            if swapped < best[0]:
+                best = (swapped, t, True)
+    return best
+
+
+def transform_move(move, t, n):
+    """Map a cell (i,j) through transform index t."""
+    return TRANSFORMS[t](move[0], move[1], n)
@@ -0,0 +1,267 @@
+"""Memory-mapped ruleset-1 tablebases for small boards.
+
+generate() enumerates every position reachable from the empty n x n board
+(n <= 4), solves all of them and writes one record per position to a
+fixed-layout binary file. Tablebase maps the file with mmap, so opening it
+reads nothing up front and processes probing the same file share its pages.
+
+Positions are reduced before ranking: stacks on blocked cells can never be
+played and attacker colors never matter, so every attacker is stored as
++k and every blocked cell as -k, and live cells keep their signed counts
+(|count| < k). A reduced position is a valid grid, and its key is its
+ranking.rank(). Only the smallest rank over the 16 images under the
+symmetries of the square and color swapping is stored.
+
+File layout (little-endian):
+    header   magic b"CGTB", version (u8), n (u8), 2 pad bytes, count (u64)
+    ranks    count x u64, sorted ascending
+    records  count x u8: bit 7 set if the player to move wins, bits 0-6
+             the best move's cell in the stored image (NO_MOVE if none)
+
+Example:
+    python3 tablebase.py --size 3
+"""
+import mmap
+import os
+import struct
+import sys
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+import engine
+import ranking
+from bitboard import BitBoard, MAX_HEIGHT, iter_bits
+from symmetry import cell_permutations
+
+MAGIC = b"CGTB"
+VERSION = 1
+HEADER = struct.Struct("<4sBBxxQ")
+MAX_SIZE = 4
+NO_MOVE = 127
+WIN_FLAG = 128
+
+# Tablebase files are looked up here unless a path is given; the directory is git-ignored
+TABLEBASE_DIR = os.environ.get("CGT_TABLEBASE_DIR",
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), "tablebases"))
+
+ProbeResult = namedtuple("ProbeResult", ["move", "winner", "seconds"])
+
+
+def default_path(n):
+    return os.path.join(TABLEBASE_DIR, f"ruleset1_{n}x{n}.tb")
+
+
+def _reduced_cells(board):
+    """Return the reduced cell values of a BitBoard: live counts, +k attackers, -k blocked cells."""
+    tables = board.tables
+    saturated = board.saturated
+    live = board.live_mask()
+    cells = [0] * tables.size
+    for h in range(1, MAX_HEIGHT):
+        for b in iter_bits(board.white[h] & live):
+            cells[b] = h
+        for b in iter_bits(board.black[h] & live):
+            cells[b] = -h
+    for b in iter_bits(saturated):
+        cells[b] = tables.k[b]
+    for b in iter_bits(tables.spread(saturated) & ~saturated):
+        cells[b] = -tables.k[b]
+    return cells
+
+
+@lru_cache(maxsize=None)
+def rank_weights(n):
+    """Return, per transform, the place value in the image's rank of each source cell's digit."""
+    places = ranking.place_values(n)
+    return tuple(tuple(places[perm[b]] for b in range(n * n)) for perm in cell_permutations(n))
+
+
+def canonical_rank(board, player):
+    """Return (rank, transform) of the smallest of the 16 images of (board, player).
+
+    Swapping colors negates the live cells and the side to move; the player
+    to move wins in every image or in none.
+    """
+    ks = board.tables.k
+    cells = _reduced_cells(board)
+    digits = [value + k for value, k in zip(cells, ks)]
+    swapped = [value + k if abs(value) == k else k - value for value, k in zip(cells, ks)]
+    black = player == "Black"
+    best = None
+    for t, weights in enumerate(rank_weights(board.tables.n)):
+        rank = min(sum(d * w for d, w in zip(digits, weights)) + black,
+                   sum(d * w for d, w in zip(swapped, weights)) + (not black))
+        if best is None or rank < best[0]:
+            best = (rank, t)
+    return best
+
+
+def generate(n, path=None, progress=True):
+    """Solve every position reachable from the empty n x n board and write the tablebase file.
+
+    Returns the number of records written.
+    """
+    if not 2 <= n <= MAX_SIZE:
+        raise ValueError(f"Tablebases are only generated for 2 <= n <= {MAX_SIZE}")
+    path = path or default_path(n)
+    board = BitBoard(n)
+    records = {}
+    # Outcomes by the cheap BitBoard key, so that transpositions skip canonical_rank
+    seen = {}
+    start = time.perf_counter()
+
+    def solve(player):
+        """Return True if player, to move, wins. Fills records for every reachable position."""
+        key = (board.key() << 1) | (player == "Black")
+        wins = seen.get(key)
+        if wins is not None:
+            return wins
+        rank, t = canonical_rank(board, player)
+        record = records.get(rank)
+        if record is not None:
+            seen[key] = record & WIN_FLAG != 0
+            return seen[key]
+        opponent = engine.other_player(player)
+        best = None
+        # Every child is visited, not just up to the first win, so that
+        # the file covers all reachable positions
+        for b in iter_bits(board.legal_mask(player)):
+            board.make_move(b, player)
+            opponent_wins = solve(opponent)
+            board.unmake_move()
+            if not opponent_wins and best is None:
+                best = b
+        if best is None:
+            record = NO_MOVE
+        else:
+            # Store the move in the coordinates of the stored image
+            record = WIN_FLAG | cell_permutations(n)[t][best]
+        records[rank] = record
+        seen[key] = best is not None
+        if progress and len(records) % 100000 == 0:
+            print(f"{len(records)} positions, {time.perf_counter() - start:.0f}s", file=sys.stderr)
+        return best is not None
+
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, 10000))
+    try:
+        solve("White")
+    finally:
+        sys.setrecursionlimit(limit)
+    ranks = sorted(records)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, n, len(ranks)))
+        f.write(struct.pack(f"<{len(ranks)}Q", *ranks))
+        f.write(bytes(records[rank] for rank in ranks))
+    return len(ranks)
+
+
+class Tablebase:
+    """Read-only view of a tablebase file through mmap.
+
+    hits and misses count the probes that found or missed their position.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.n, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} tablebase")
+        self.ranks_offset = HEADER.size
+        self.records_offset = HEADER.size + 8 * self.count
+        self.inverse = [[perm.index(b) for b in range(self.n * self.n)]
+                        for perm in cell_permutations(self.n)]
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        self.data.close()
+
+    def find(self, rank):
+        """Return the record byte stored for rank, or None."""
+        low, high = 0, self.count
+        data = self.data
+        offset = self.ranks_offset
+        while low < high:
+            mid = (low + high) // 2
+            value = struct.unpack_from("<Q", data, offset + 8 * mid)[0]
+            if value < rank:
+                low = mid + 1
+            elif value > rank:
+                high = mid
+            else:
+                return data[self.records_offset + mid]
+        return None
+
+    def probe_board(self, board, player):
+        """Return (player to move wins, best cell index or None), or None if board is not in the table."""
+        rank, t = canonical_rank(board, player)
+        record = self.find(rank)
+        if record is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        move = record & NO_MOVE
+        return (record & WIN_FLAG != 0, None if move == NO_MOVE else self.inverse[t][move])
+
+    def probe(self, pieces, player):
+        """Return (winner, winning (i,j) or None) for a grid, or None if it is not in the table."""
+        result = self.probe_board(BitBoard.from_grid(pieces), player)
+        if result is None:
+            return None
+        wins, b = result
+        winner = player if wins else engine.other_player(player)
+        return (winner, None if b is None else (b // self.n, b % self.n))
+
+
+_open_tables = {}
+
+
+def load(n, path=None):
+    """Return the Tablebase for n x n boards, or None if there is no file for it.
+
+    Tables are opened once per process and shared.
+    """
+    path = path or default_path(n)
+    if path not in _open_tables:
+        _open_tables[path] = Tablebase(path) if os.path.exists(path) else None
+    return _open_tables[path]
+
+
+class TablebasePlayer:
+    """Player that plays tablebase moves and defers to fallback elsewhere.
+
+    fallback is any player with search(pieces, player); it is used for
+    positions missing from the table and to pick a move in lost positions.
+    """
+
+    def __init__(self, n, fallback, path=None):
+        self.table = load(n, path)
+        self.fallback = fallback
+
+    def search(self, pieces, player):
+        start = time.perf_counter()
+        result = self.table.probe(pieces, player) if self.table else None
+        if result is None or result[1] is None:
+            return self.fallback.search(pieces, player)
+        winner, move = result
+        return ProbeResult(move, winner, time.perf_counter() - start)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate a ruleset-1 tablebase.")
+    parser.add_argument("--size", type=int, default=3, help=f"board size n (2-{MAX_SIZE})")
+    parser.add_argument("--output", help="output file (default: tablebases/ruleset1_NxN.tb next to this module)")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    count = generate(args.size, args.output)
+    print(f"{args.size}x{args.size}: {count} positions written to "
+          f"{args.output or default_path(args.size)} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
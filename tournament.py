@@ -0,0 +1,229 @@
+"""Round-robin tournaments between ruleset-1 players.
+
+Every ordered pair of players (so each plays both colors) meets on every
+board size for a number of seeds. Games run in a process pool with one
+worker per core and each finished game is written to CSV and/or JSONL
+right away. At the end the table reports per-pairing win rates with 95%
+Wilson intervals, Elo ratings fitted to all results, the average game
+length per size and each player's per-move latency percentiles.
+
+Players come from the strategies.PLAYERS registry. --module imports extra
+modules (in every worker) that call strategies.register_player.
+
+Example:
+    python3 tournament.py --players heuristic random --sizes 2-6 --games 50 --csv games.csv
+"""
+import argparse
+import csv
+import importlib
+import json
+import math
+import os
+import random
+import time
+from collections import defaultdict
+from multiprocessing import Pool
+
+import engine
+from bitboard import BitBoard
+from strategies import PLAYERS, make_player
+
+FIELDS = ["white", "black", "size", "seed", "winner", "length",
+          "white_ms_mean", "white_ms_max", "black_ms_mean", "black_ms_max"]
+
+
+def import_modules(modules):
+    """Import modules that register custom players."""
+    for name in modules:
+        importlib.import_module(name)
+
+
+def play_game(task):
+    """Play one game. task is (white, black, size, seed); returns a result dict.
+
+    The dict also carries the per-move latencies of both players in
+    milliseconds under "latencies".
+    """
+    white, black, n, seed = task
+    players = {
+        "White": make_player(white, random.Random(f"{seed}-White")),
+        "Black": make_player(black, random.Random(f"{seed}-Black")),
+    }
+    board = BitBoard(n)
+    latencies = {"White": [], "Black": []}
+    player = "White"
+    length = 0
+    while board.legal_mask(player):
+        start = time.perf_counter()
+        b = players[player](board, player)
+        latencies[player].append((time.perf_counter() - start) * 1000)
+        if b is None or not board.legal_mask(player) >> b & 1:
+            raise ValueError(f"{white if player == 'White' else black} made an illegal move {b}")
+        board.place(b, player)
+        player = engine.other_player(player)
+        length += 1
+    result = {"white": white, "black": black, "size": n, "seed": seed,
+              "winner": engine.other_player(player), "length": length}
+    for color in ("White", "Black"):
+        times = latencies[color]
+        result[f"{color.lower()}_ms_mean"] = round(sum(times) / len(times), 4) if times else 0.0
+        result[f"{color.lower()}_ms_max"] = round(max(times), 4) if times else 0.0
+    result["latencies"] = latencies
+    return result
+
+
+def wilson_interval(wins, games, z=1.96):
+    """Return the 95% Wilson score interval of a win rate."""
+    if games == 0:
+        return (0.0, 1.0)
+    p = wins / games
+    denominator = 1 + z * z / games
+    center = (p + z * z / (2 * games)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / denominator
+    return (max(0.0, center - margin), min(1.0, center + margin))
+
+
+def elo_ratings(results, iterations=200):
+    """Fit Bradley-Terry strengths to (winner, loser) pairs and return Elo ratings (mean 1500).
+
+    Every pair of players gets one virtual win each way so that unbeaten
+    or winless players keep finite ratings.
+    """
+    players = sorted({name for pair in results for name in pair})
+    if not players:
+        return {}
+    wins = defaultdict(float)
+    games = defaultdict(float)
+    for winner, loser in results:
+        wins[winner] += 1
+        games[frozenset((winner, loser))] += 1
+    for a in players:
+        for b in players:
+            if a < b:
+                wins[a] += 1
+                wins[b] += 1
+                games[frozenset((a, b))] += 2
+    strength = {name: 1.0 for name in players}
+    for _ in range(iterations):
+        for a in players:
+            denominator = sum(games[frozenset((a, b))] / (strength[a] + strength[b])
+                              for b in players if b != a)
+            if denominator:
+                strength[a] = wins[a] / denominator
+        # Normalize by the geometric mean
+        scale = math.exp(sum(math.log(s) for s in strength.values()) / len(players))
+        strength = {name: s / scale for name, s in strength.items()}
+    return {name: 1500 + 400 * math.log10(s) for name, s in strength.items()}
+
+
+def percentile(values, q):
+    """Return the q-th percentile (0-100) of values by linear interpolation."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    position = (len(values) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def parse_sizes(text):
+    """Parse "2-10" or "3,5,7" (or a mix) into a sorted list of board sizes."""
+    sizes = set()
+    for part in text.split(","):
+        if "-" in part:
+            low, high = part.split("-")
+            sizes.update(range(int(low), int(high) + 1))
+        else:
+            sizes.add(int(part))
+    return sorted(sizes)
+
+
+def report(results):
+    """Print win rates, Elo, game lengths and latency percentiles for finished games."""
+    pairings = defaultdict(lambda: [0, 0])
+    pairs = []
+    lengths = defaultdict(list)
+    latencies = defaultdict(list)
+    for result in results:
+        white, black = result["white"], result["black"]
+        white_won = result["winner"] == "White"
+        pairings[(white, black)][0] += white_won
+        pairings[(white, black)][1] += 1
+        pairs.append((white, black) if white_won else (black, white))
+        lengths[result["size"]].append(result["length"])
+        latencies[white].extend(result["latencies"]["White"])
+        latencies[black].extend(result["latencies"]["Black"])
+    print("Win rates of White (95% CI):")
+    for (white, black), (wins, games) in sorted(pairings.items()):
+        low, high = wilson_interval(wins, games)
+        print(f"  {white:>12} vs {black:<12} {wins / games:6.3f} [{low:.3f}, {high:.3f}] over {games} games")
+    print("Elo:")
+    for name, rating in sorted(elo_ratings(pairs).items(), key=lambda item: -item[1]):
+        print(f"  {name:>12} {rating:7.1f}")
+    print("Average game length:")
+    for size, values in sorted(lengths.items()):
+        print(f"  {size}x{size}: {sum(values) / len(values):.1f} moves over {len(values)} games")
+    print("Move latency (ms) p50 / p90 / p99:")
+    for name, values in sorted(latencies.items()):
+        print(f"  {name:>12} {percentile(values, 50):.3f} / {percentile(values, 90):.3f} / "
+              f"{percentile(values, 99):.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a round-robin tournament between ruleset-1 players.")
+    parser.add_argument("--players", nargs="+", default=["heuristic", "random"],
+                        help="registered player names")
+    parser.add_argument("--sizes", default="2-6", help='board sizes, e.g. "2-10" or "3,5"')
+    parser.add_argument("--games", type=int, default=20, help="seeds per pairing and size")
+    parser.add_argument("--seed", type=int, default=0, help="first seed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--module", action="append", default=[],
+                        help="module registering custom players (repeatable)")
+    parser.add_argument("--csv", help="stream game results to this CSV file")
+    parser.add_argument("--jsonl", help="stream game results to this JSON-lines file")
+    args = parser.parse_args()
+    import_modules(args.module)
+    unknown = [name for name in args.players if name not in PLAYERS]
+    if unknown:
+        parser.error(f"unknown players {unknown}, registered: {sorted(PLAYERS)}")
+    args.players = list(dict.fromkeys(args.players))
+    if len(args.players) < 2:
+        parser.error("a tournament needs at least two distinct players")
+    sizes = parse_sizes(args.sizes)
+    if not all(2 <= n <= 10 for n in sizes):
+        parser.error("board sizes must be between 2 and 10")
+    tasks = [(white, black, n, args.seed + g)
+             for n in sizes
+             for white in args.players
+             for black in args.players if black != white
+             for g in range(args.games)]
+    csv_file = open(args.csv, "w", newline="") if args.csv else None
+    jsonl_file = open(args.jsonl, "w") if args.jsonl else None
+    writer = csv.DictWriter(csv_file, FIELDS, extrasaction="ignore") if csv_file else None
+    if writer:
+        writer.writeheader()
+    results = []
+    start = time.perf_counter()
+    try:
+        with Pool(args.workers, initializer=import_modules, initargs=(args.module,)) as pool:
+            for result in pool.imap_unordered(play_game, tasks):
+                results.append(result)
+                if writer:
+                    writer.writerow(result)
+                    csv_file.flush()
+                if jsonl_file:
+                    row = {field: result[field] for field in FIELDS}
+                    jsonl_file.write(json.dumps(row) + "\n")
+                    jsonl_file.flush()
+    finally:
+        for f in (csv_file, jsonl_file):
+            if f:
+                f.close()
+    elapsed = time.perf_counter() - start
+    print(f"{len(results)} games in {elapsed:.1f}s with {args.workers} workers")
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Structured tracing and counters for the demos.
+
+Tracing has one module-level level:
+    OFF     nothing is recorded
+    COUNTS  counters only (the default)
+    INFO    counters and per-turn events
+    DEBUG   also per-call events, such as every move generation with its board
+
+count() and event() return at once when their level is off, and event()
+keeps its fields as given, so nothing is formatted on the hot path.
+Callers that would have to build an expensive field (a board copy) check
+`tracing.level >= tracing.DEBUG` first. summary() formats the counters and the
+number of recorded events per name, for printing at the end of a game.
+
+The starting level comes from the CGT_TRACE environment variable (off,
+counts, info or debug).
+"""
+import os
+import sys
+import time
+from collections import Counter, deque
+
+OFF, COUNTS, INFO, DEBUG = range(4)
+LEVELS = {"off": OFF, "counts": COUNTS, "info": INFO, "debug": DEBUG}
+
+# Recent events kept for dump(); older ones are dropped
+MAX_EVENTS = 10000
+
+level = LEVELS.get(os.environ.get("CGT_TRACE", "counts").lower(), COUNTS)
+counters = Counter()
+events = deque(maxlen=MAX_EVENTS)
+start = time.perf_counter()
+
+
+def set_level(value):
+    """Set the level from a name ("info") or one of the level constants."""
+    global level
+    level = LEVELS[value.lower()] if isinstance(value, str) else value
+
+
+def count(name, n=1):
+    """Add n to the counter name."""
+    if level >= COUNTS:
+        counters[name] += n
+
+
+def event(name, event_level=INFO, **fields):
+    """Record an event with its fields if event_level is enabled."""
+    if level >= event_level:
+        events.append((time.perf_counter() - start, name, fields))
+
+
+def reset():
+    """Clear the counters and events, e.g. when a new game starts."""
+    global start
+    counters.clear()
+    events.clear()
+    start = time.perf_counter()
+
+
+def summary():
+    """Return the counters and event counts as text, one "name value" per line."""
+    lines = [f"{name:<24} {value:g}" for name, value in sorted(counters.items())]
+    by_name = Counter(name for _, name, _ in events)
+    lines += [f"{name + ' events':<24} {number}" for name, number in sorted(by_name.items())]
+    return "\n".join(lines)
+
+
+def dump(file=None, with_events=False):
+    """Print the summary (and, with with_events, every recorded event) unless tracing is off."""
+    if level == OFF:
+        return
+    file = file or sys.stderr
+    if with_events:
+        for seconds, name, fields in events:
+            details = " ".join(f"{key}={value}" for key, value in fields.items())
+            print(f"{seconds:10.4f} {name} {details}", file=file)
+    print(summary(), file=file)
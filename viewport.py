@@ -0,0 +1,171 @@
+"""Zoomable, pannable board canvas for boards up to MAX_SIZE x MAX_SIZE.
+
+Canvas coordinates are board coordinates at the current zoom: cell (i,j)
+covers x in [j * cell_size, (j + 1) * cell_size) and y likewise, and the
+scroll region is the whole board. Only the cells in the visible window
+(plus a margin of one cell) have tiles: Viewport asks the game to create a
+tile when its cell scrolls into view and to delete it when it scrolls out,
+so the number of canvas items depends on the window, not on the board.
+
+Zooming changes cell_size and rebuilds the visible tiles around the point
+under the mouse. Pan by dragging with the right or middle mouse button, with
+the arrow keys or with the scrollbars; zoom with Ctrl + mouse wheel, the
++/- keys or the zoom buttons. Boards that fit at full size get neither
+scrollbars nor buttons, and look as they did before.
+
+Only Viewport needs tkinter.
+"""
+MAX_SIZE = 200
+CELL_SIZE = 100  # Cell size at full zoom
+VIEW_SIZE = 1000  # Largest side of the board canvas in pixels
+MIN_CELL_SIZE = 8
+START_MIN_CELL_SIZE = 20  # Smallest starting zoom, so a big board opens with few tiles
+DETAIL_CELL_SIZE = 50  # Smaller tiles drop their k labels and pieces
+ZOOM_STEP = 1.25
+MARGIN = 1  # Cells kept beyond each edge of the window
+
+
+def initial_cell_size(n):
+    """Return the starting cell size: full size if the board fits, else the board fills the view."""
+    return max(START_MIN_CELL_SIZE, min(CELL_SIZE, VIEW_SIZE // n))
+
+
+class Viewport:
+    """Board canvas that keeps tiles only for the visible cells.
+
+    create_tile(i, j) must create the items of the tile at (i,j) at the
+    current cell_size and return its dict, delete_tile(tile) delete them,
+    and draw(cells) draw the current state of new tiles. before_change()
+    runs before the tiles are rebuilt or moved out of view, e.g. to finish
+    animations that hold tile items. The game calls refresh() once it is
+    ready to create the first tiles.
+    """
+
+    def __init__(self, parent, n, create_tile, delete_tile, draw, before_change=None):
+        import tkinter as tk
+        self.n = n
+        self.cell_size = initial_cell_size(n)
+        self.create_tile = create_tile
+        self.delete_tile = delete_tile
+        self.draw = draw
+        self.before_change = before_change
+        self.tiles = {}  # (i,j) -> tile dict of every visible cell
+        self.frame = tk.Frame(parent)
+        side = min(n * self.cell_size, VIEW_SIZE)
+        self.canvas = tk.Canvas(self.frame, width=side, height=side)
+        self.canvas.grid(row=0, column=0)
+        canvas = self.canvas
+        if n * CELL_SIZE > VIEW_SIZE:
+            xbar = tk.Scrollbar(self.frame, orient="horizontal", command=self.xview)
+            ybar = tk.Scrollbar(self.frame, orient="vertical", command=self.yview)
+            xbar.grid(row=1, column=0, sticky="ew")
+            ybar.grid(row=0, column=1, sticky="ns")
+            canvas.configure(xscrollcommand=xbar.set, yscrollcommand=ybar.set)
+            buttons = tk.Frame(self.frame)
+            buttons.grid(row=2, column=0)
+            tk.Button(buttons, text="Zoom Out", command=lambda: self.zoom(1 / ZOOM_STEP)).pack(side=tk.LEFT)
+            tk.Button(buttons, text="Zoom In", command=lambda: self.zoom(ZOOM_STEP)).pack(side=tk.LEFT)
+        for button in (2, 3):
+            canvas.bind(f"<ButtonPress-{button}>", lambda event: canvas.scan_mark(event.x, event.y))
+            canvas.bind(f"<B{button}-Motion>", self.drag)
+        canvas.bind("<Control-Button-4>", lambda event: self.zoom(ZOOM_STEP, event.x, event.y) or "break")
+        canvas.bind("<Control-Button-5>", lambda event: self.zoom(1 / ZOOM_STEP, event.x, event.y) or "break")
+        canvas.bind("<Control-MouseWheel>",
+                    lambda event: self.zoom(ZOOM_STEP if event.delta > 0 else 1 / ZOOM_STEP,
+                                            event.x, event.y) or "break")
+        for key, factor in (("plus", ZOOM_STEP), ("equal", ZOOM_STEP), ("minus", 1 / ZOOM_STEP)):
+            canvas.bind(f"<KeyPress-{key}>", lambda event, factor=factor: self.zoom(factor))
+        for key, dx, dy in (("Left", -1, 0), ("Right", 1, 0), ("Up", 0, -1), ("Down", 0, 1)):
+            canvas.bind(f"<KeyPress-{key}>", lambda event, dx=dx, dy=dy: self.scroll(dx, dy))
+        canvas.bind("<Enter>", lambda event: canvas.focus_set())
+        canvas.bind("<Configure>", lambda event: self.refresh())
+        self.configure_region()
+
+    @property
+    def detailed(self):
+        """True if tiles are big enough for k labels and pieces."""
+        return self.cell_size >= DETAIL_CELL_SIZE
+
+    def configure_region(self):
+        side = self.n * self.cell_size
+        self.canvas.configure(scrollregion=(0, 0, side, side),
+                              xscrollincrement=self.cell_size, yscrollincrement=self.cell_size)
+
+    def view_size(self):
+        """Return the canvas window's (width, height), also before it is mapped."""
+        canvas = self.canvas
+        return (max(canvas.winfo_width(), int(canvas.cget("width"))),
+                max(canvas.winfo_height(), int(canvas.cget("height"))))
+
+    def visible_range(self):
+        """Return the (rows, cols) ranges of the cells in the window plus the margin."""
+        size = self.cell_size
+        width, height = self.view_size()
+        x0 = self.canvas.canvasx(0)
+        y0 = self.canvas.canvasy(0)
+        rows = range(max(0, int(y0 // size) - MARGIN), min(self.n, int((y0 + height) // size) + 1 + MARGIN))
+        cols = range(max(0, int(x0 // size) - MARGIN), min(self.n, int((x0 + width) // size) + 1 + MARGIN))
+        return rows, cols
+
+    def is_visible(self, i, j):
+        return (i, j) in self.tiles
+
+    def refresh(self):
+        """Create the tiles that scrolled into view and delete those that left it."""
+        rows, cols = self.visible_range()
+        gone = [cell for cell in self.tiles if cell[0] not in rows or cell[1] not in cols]
+        if gone and self.before_change:
+            self.before_change()
+        for cell in gone:
+            self.delete_tile(self.tiles.pop(cell))
+        new = [(i, j) for i in rows for j in cols if (i, j) not in self.tiles]
+        for i, j in new:
+            self.tiles[(i, j)] = self.create_tile(i, j)
+        if new:
+            self.draw(new)
+
+    def xview(self, *args):
+        self.canvas.xview(*args)
+        self.refresh()
+
+    def yview(self, *args):
+        self.canvas.yview(*args)
+        self.refresh()
+
+    def scroll(self, dx, dy):
+        """Scroll by dx columns and dy rows."""
+        if dx:
+            self.canvas.xview_scroll(dx, "units")
+        if dy:
+            self.canvas.yview_scroll(dy, "units")
+        self.refresh()
+
+    def drag(self, event):
+        self.canvas.scan_dragto(event.x, event.y, gain=1)
+        self.refresh()
+
+    def zoom(self, factor, x=None, y=None):
+        """Scale cell_size by factor, keeping the board point under window pixel (x, y) in place.
+
+        The point defaults to the center of the window.
+        """
+        size = max(MIN_CELL_SIZE, min(CELL_SIZE, round(self.cell_size * factor)))
+        if size == self.cell_size:
+            return
+        if self.before_change:
+            self.before_change()
+        width, height = self.view_size()
+        x = width / 2 if x is None else x
+        y = height / 2 if y is None else y
+        # The point in cells, which zooming keeps fixed
+        bx = self.canvas.canvasx(x) / self.cell_size
+        by = self.canvas.canvasy(y) / self.cell_size
+        for tile in self.tiles.values():
+            self.delete_tile(tile)
+        self.tiles.clear()
+        self.cell_size = size
+        self.configure_region()
+        side = self.n * size
+        self.canvas.xview_moveto(max(0.0, bx * size - x) / side)
+        self.canvas.yview_moveto(max(0.0, by * size - y) / side)
+        self.refresh()
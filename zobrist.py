@@ -0,0 +1,59 @@
+"""Zobrist hashing of positions.
+
+A position's key is the XOR of one random 64-bit value per (cell, signed
+count) of every non-empty cell, one per (cell, green count) of every cell
+holding green pieces (ruleset 2), and one more if Black is to move. A move
+changes the key by XORing out the old values of the cells it touches and
+XORing in the new ones, so engine.Board keeps its key up to date in
+O(changed cells) per move and per candidate successor.
+
+Values are drawn from a fixed seed, so keys agree between processes and
+runs.
+"""
+import random
+from functools import lru_cache
+
+SEED = 20240501
+MAX_COUNT = 4
+MAX_GREEN = 3
+
+
+class ZobristKeys:
+    """Random values for one board size."""
+
+    def __init__(self, n, seed=SEED):
+        rng = random.Random(f"{seed}-{n}")
+        # counts[i][j][count + MAX_COUNT]; an empty cell contributes 0
+        self.counts = [[[0 if count == 0 else rng.getrandbits(64)
+                         for count in range(-MAX_COUNT, MAX_COUNT + 1)]
+                        for _ in range(n)] for _ in range(n)]
+        self.greens = [[[0] + [rng.getrandbits(64) for _ in range(MAX_GREEN)]
+                        for _ in range(n)] for _ in range(n)]
+        self.black = rng.getrandbits(64)
+
+    def cell(self, i, j, count):
+        """Return the value of signed count at (i,j)."""
+        return self.counts[i][j][count + MAX_COUNT]
+
+    def green(self, i, j, green):
+        """Return the value of a green count at (i,j)."""
+        return self.greens[i][j][green]
+
+
+@lru_cache(maxsize=None)
+def get_keys(n):
+    """Return the shared ZobristKeys for an n x n board."""
+    return ZobristKeys(n)
+
+
+def hash_grid(pieces, player="White", green_pieces=None):
+    """Return the key of a grid from scratch (O(n^2)); green_pieces is for ruleset 2."""
+    n = len(pieces)
+    keys = get_keys(n)
+    key = keys.black if player == "Black" else 0
+    for i in range(n):
+        for j in range(n):
+            key ^= keys.cell(i, j, pieces[i][j])
+            if green_pieces is not None:
+                key ^= keys.green(i, j, green_pieces[i][j])
+    return key